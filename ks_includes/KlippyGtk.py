@@ -2,6 +2,7 @@
 import logging
 import os
 import pathlib
+import weakref
 
 import gi
 
@@ -35,6 +36,7 @@ class KlippyGtk:
 
     def __init__(self, screen):
         self.screen = screen
+        self.themed_images = weakref.WeakSet()
         self.themedir = os.path.join(pathlib.Path(__file__).parent.resolve().parent, "styles", screen.theme, "images")
         self.font_size_type = screen._config.get_main_config().get("font_size", "medium")
         self.width = screen.width
@@ -118,7 +120,22 @@ class KlippyGtk:
         if image_name is None:
             return Gtk.Image()
         pixbuf = self.PixbufFromIcon(image_name, width, height)
-        return Gtk.Image.new_from_pixbuf(pixbuf) if pixbuf is not None else Gtk.Image()
+        image = Gtk.Image.new_from_pixbuf(pixbuf) if pixbuf is not None else Gtk.Image()
+        # Remembered to reload it in place when the theme changes
+        image.theme_icon = (image_name, width, height)
+        image.theme_pixbuf = pixbuf
+        self.themed_images.add(image)
+        return image
+
+    def reload_images(self):
+        for image in list(self.themed_images):
+            if image.get_pixbuf() is not image.theme_pixbuf:
+                # The panel replaced the icon, it's no longer a theme image
+                continue
+            pixbuf = self.PixbufFromIcon(*image.theme_icon)
+            if pixbuf is not None:
+                image.set_from_pixbuf(pixbuf)
+                image.theme_pixbuf = pixbuf
 
     def update_themedir(self, theme):
         self.themedir = os.path.join(pathlib.Path(__file__).parent.resolve().parent, "styles", theme, "images")
@@ -5,6 +5,9 @@ import requests
 
 
 class KlippyRest:
+    # SessionRecorder shared by all the clients, see screen.py --capture
+    recorder = None
+
     def __init__(self, ip, port=7125, api_key=False, path='', ssl=None):
         self.ip = ip
         self.port = port
@@ -45,7 +48,12 @@ class KlippyRest:
             response = callee(url, json=json, data=data, headers=headers, timeout=timeout)
             response.raise_for_status()
             self.status = ''
-            return response.json() if json_response else response.content
+            if not json_response:
+                return response.content
+            result = response.json()
+            if self.recorder is not None and request_method == "get":
+                self.recorder.record_rest(f"{self.ip}:{self.port}{self.path}", method, result)
+            return result
         except Exception as e:
             self.status = self.format_status(e)
             logging.error(self.status.replace('\n', '>>'))
@@ -13,18 +13,21 @@ from ks_includes.KlippyGcodes import KlippyGcodes
 
 
 class KlippyWebsocket(threading.Thread):
-    _req_id = 0
     connected = False
     connecting = True
-    callback_table = {}
     reconnect_count = 0
     max_retries = 4
+    # SessionRecorder shared by all the connections, see screen.py --capture
+    recorder = None
 
     def __init__(self, callback, host, port, api_key, path='', ssl=None):
         threading.Thread.__init__(self)
         self._wst = None
         self.ws_url = None
         self._callback = callback
+        # Per connection, ids are only unique within one websocket
+        self._req_id = 0
+        self.callback_table = {}
         self.klippy = MoonrakerApi(self)
         self.ws = None
         self.closing = False
@@ -71,6 +74,8 @@ class KlippyWebsocket(threading.Thread):
             on_open=self.on_open,
             header=self.header
         )
+        if self.recorder is not None:
+            self.recorder.record("open", self._url)
         self._wst = threading.Thread(target=self.ws.run_forever, daemon=True)
         try:
             logging.debug("Starting websocket thread")
@@ -90,6 +95,8 @@ class KlippyWebsocket(threading.Thread):
 
     def on_message(self, *args):
         message = args[1] if len(args) == 2 else args[0]
+        if self.recorder is not None:
+            self.recorder.record("in", self._url, message)
         response = json.loads(message)
         if "id" in response and response['id'] in self.callback_table:
             args = (response,
@@ -124,7 +131,10 @@ class KlippyWebsocket(threading.Thread):
             "params": params,
             "id": self._req_id
         }
-        self.ws.send(json.dumps(data))
+        message = json.dumps(data)
+        if self.recorder is not None:
+            self.recorder.record("out", self._url, message)
+        self.ws.send(message)
         return True
 
     def on_open(self, *args):
@@ -146,6 +156,8 @@ class KlippyWebsocket(threading.Thread):
             message = args[1]
         if message is not None:
             logging.info(f"{status} {message}")
+        if self.recorder is not None:
+            self.recorder.record("close", self._url)
         if not self.connected:
             logging.debug("Connection already closed")
             return
@@ -0,0 +1,273 @@
+import json
+import logging
+import os
+from array import array
+from datetime import date, datetime, timedelta
+
+HISTORY_RETENTION_DAYS = 30
+
+
+def _month_key(day: date):
+    return day.year * 12 + day.month - 1
+
+
+def _week_key(ordinal: int):
+    # Ordinal of the monday of that week, 0001-01-01 was a monday
+    return ordinal - (ordinal - 1) % 7
+
+
+def _parse_day(date_str):
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_minutes(hhmm):
+    try:
+        hours, minutes = hhmm.split(":", 1)
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class ProductRollup:
+    """Good/bad cycle counters of one product, bucketed by day, week and month"""
+    __slots__ = ("name", "daily", "weekly", "monthly", "total")
+
+    def __init__(self, name):
+        self.name = name
+        self.daily = {}
+        self.weekly = {}
+        self.monthly = {}
+        self.total = array('L', (0, 0))
+
+    def add(self, day: date, good, bad):
+        ordinal = day.toordinal()
+        for buckets, key in (
+            (self.daily, ordinal),
+            (self.weekly, _week_key(ordinal)),
+            (self.monthly, _month_key(day)),
+        ):
+            counts = buckets.get(key)
+            if counts is None:
+                counts = buckets[key] = array('L', (0, 0))
+            counts[0] += good
+            counts[1] += bad
+        self.total[0] += good
+        self.total[1] += bad
+
+    def remove_day(self, day: date):
+        ordinal = day.toordinal()
+        counts = self.daily.pop(ordinal, None)
+        if counts is None:
+            return
+        for buckets, key in ((self.weekly, _week_key(ordinal)), (self.monthly, _month_key(day))):
+            bucket = buckets[key]
+            bucket[0] -= counts[0]
+            bucket[1] -= counts[1]
+            if not bucket[0] and not bucket[1]:
+                del buckets[key]
+        self.total[0] -= counts[0]
+        self.total[1] -= counts[1]
+
+
+class PrintAnalytics:
+    """
+    Production history shared by the data and print_times panels
+
+    history.json and print_times.json are parsed once and kept as per product rollups,
+    recording a cycle updates the rollups in place and persists the file.
+    """
+    empty = (0, 0)
+
+    def __init__(self, config_dir):
+        self.history_file = os.path.join(config_dir, 'history.json')
+        self.print_times_file = os.path.join(config_dir, 'print_times.json')
+        self.history = {}
+        self.products = {}
+        self.days = {}
+        self.times = {}
+        self._mtimes = {}
+        self.reload(force=True)
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def _read_json(path):
+        try:
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f) or {}
+        except Exception as e:
+            logging.error(f"Error loading {path}: {e}")
+        return {}
+
+    def _write_json(self, path, data):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            logging.error(f"Error writing {path}: {e}")
+            return False
+        self._mtimes[path] = self._mtime(path)
+        return True
+
+    def reload(self, force=False):
+        """Re-read the files only if they were modified outside of this instance"""
+        changed = False
+        mtime = self._mtime(self.history_file)
+        if force or mtime != self._mtimes.get(self.history_file):
+            self._mtimes[self.history_file] = mtime
+            self._load_history(self._read_json(self.history_file))
+            changed = True
+        mtime = self._mtime(self.print_times_file)
+        if force or mtime != self._mtimes.get(self.print_times_file):
+            self._mtimes[self.print_times_file] = mtime
+            self._load_times(self._read_json(self.print_times_file))
+            changed = True
+        return changed
+
+    def _load_history(self, data):
+        self.history = {}
+        self.products.clear()
+        self.days.clear()
+        for key, entries in data.items():
+            if not isinstance(entries, dict):
+                continue
+            day = _parse_day(key)
+            if day is not None:
+                # {date: {filename: {"good": n, "bad": n}}}
+                self.history[key] = entries
+                for name, counts in entries.items():
+                    if isinstance(counts, dict):
+                        self._add(name, day, int(counts.get('good', 0)), int(counts.get('bad', 0)))
+                continue
+            # Legacy layout {filename: {date: count}}
+            for date_str, count in entries.items():
+                day = _parse_day(date_str)
+                if day is None or not isinstance(count, int):
+                    logging.warning(f"Invalid date format in history: {date_str}")
+                    continue
+                self.history.setdefault(date_str, {}).setdefault(key, {"good": 0, "bad": 0})
+                self.history[date_str][key]["good"] += count
+                self._add(key, day, count, 0)
+
+    def _load_times(self, data):
+        self.times.clear()
+        for date_str, entry in data.items():
+            day = _parse_day(date_str)
+            if day is None or not isinstance(entry, dict):
+                continue
+            first = _parse_minutes(entry.get('first'))
+            last = _parse_minutes(entry.get('last'))
+            if first is None or last is None:
+                continue
+            self.times[day.toordinal()] = array('H', (first, last))
+
+    def _add(self, name, day: date, good, bad):
+        rollup = self.products.get(name)
+        if rollup is None:
+            rollup = self.products[name] = ProductRollup(name)
+        rollup.add(day, good, bad)
+        self.days.setdefault(day.toordinal(), {})
+        self.days[day.toordinal()][name] = rollup.daily[day.toordinal()]
+
+    def record_quality(self, name, good, bad, day=None):
+        day = day or date.today()
+        date_str = day.strftime("%Y-%m-%d")
+        self.reload()
+        if date_str not in self.history:
+            self.history[date_str] = {}
+            self._clean_old_entries(day)
+        entry = self.history[date_str].setdefault(name, {"good": 0, "bad": 0})
+        entry["good"] += good
+        entry["bad"] += bad
+        self._add(name, day, good, bad)
+        return self._write_json(self.history_file, self.history)
+
+    def _clean_old_entries(self, today: date):
+        cutoff = today - timedelta(days=HISTORY_RETENTION_DAYS)
+        old = [d for d in self.history if (_parse_day(d) or today) < cutoff]
+        for date_str in old:
+            day = _parse_day(date_str)
+            del self.history[date_str]
+            for name in self.days.pop(day.toordinal(), {}):
+                self.products[name].remove_day(day)
+                if not any(self.products[name].total):
+                    del self.products[name]
+        if old:
+            logging.info(f"Cleaned {len(old)} history entries older than {HISTORY_RETENTION_DAYS} days: {old}")
+
+    def record_cycle_start(self, now=None):
+        now = now or datetime.now()
+        ordinal = now.date().toordinal()
+        minutes = now.hour * 60 + now.minute
+        self.reload()
+        if ordinal in self.times:
+            self.times[ordinal][1] = minutes
+        else:
+            self.times[ordinal] = array('H', (minutes, minutes))
+        data = {
+            date.fromordinal(day).strftime("%Y-%m-%d"): {
+                "first": _format_minutes(first_last[0]),
+                "last": _format_minutes(first_last[1]),
+            }
+            for day, first_last in sorted(self.times.items())
+        }
+        return self._write_json(self.print_times_file, data)
+
+    def reset_history(self):
+        self.history = {}
+        self.products.clear()
+        self.days.clear()
+        return self._write_json(self.history_file, {})
+
+    def reset_times(self):
+        self.times.clear()
+        return self._write_json(self.print_times_file, {})
+
+    def has_history(self):
+        return bool(self.products)
+
+    def product_counts(self, name, period, day=None):
+        """Returns (good, bad) of a product for 'day', 'week', 'month' or 'total'"""
+        rollup = self.products.get(name)
+        if rollup is None:
+            return self.empty
+        if period == "total":
+            return tuple(rollup.total)
+        day = day or date.today()
+        if period == "day":
+            counts = rollup.daily.get(day.toordinal())
+        elif period == "week":
+            counts = rollup.weekly.get(_week_key(day.toordinal()))
+        elif period == "month":
+            counts = rollup.monthly.get(_month_key(day))
+        else:
+            raise ValueError(f"Unknown period {period}")
+        return tuple(counts) if counts is not None else self.empty
+
+    def products_by_total(self):
+        return sorted(self.products, key=lambda name: sum(self.products[name].total), reverse=True)
+
+    def jobs_on(self, day: date):
+        """Returns {product: (good, bad)} of the products made that day"""
+        return {name: tuple(counts) for name, counts in self.days.get(day.toordinal(), {}).items()}
+
+    def cycle_times(self, day: date):
+        """Returns ('HH:MM', 'HH:MM') of the first and last cycle started that day or None"""
+        first_last = self.times.get(day.toordinal())
+        if first_last is None:
+            return None
+        return _format_minutes(first_last[0]), _format_minutes(first_last[1])
@@ -21,6 +21,8 @@ SCREEN_BLANKING_OPTIONS = [
 ]
 
 klipperscreendir = pathlib.Path(__file__).parent.resolve().parent
+# Parsed translation catalogs kept in memory, enough to switch back and forth between languages
+LANG_CACHE_SIZE = 3
 home = os.path.expanduser("~/")
 printer_data_config = os.path.join(home, "printer_data", "config")
 xdg_config = os.path.join(home, ".config", "KlipperScreen")
@@ -45,6 +47,7 @@ class KlipperScreenConfig:
         logging.debug(f"Config path location: {self.config_path}")
         self.defined_config = None
         self.lang = None
+        self.lang_path = None
         self.langs = {}
 
         try:
@@ -115,11 +118,11 @@ class KlipperScreenConfig:
         self._create_configurable_options(screen)
 
     def create_translations(self):
-        lang_path = os.path.join(klipperscreendir, "ks_includes", "locales")
-        self.lang_list = [d for d in os.listdir(lang_path) if not os.path.isfile(os.path.join(lang_path, d))]
+        self.lang_path = os.path.join(klipperscreendir, "ks_includes", "locales")
+        self.lang_list = [
+            d for d in os.listdir(self.lang_path) if not os.path.isfile(os.path.join(self.lang_path, d))
+        ]
         self.lang_list.sort()
-        for lng in self.lang_list:
-            self.langs[lng] = gettext.translation('KlipperScreen', localedir=lang_path, languages=[lng], fallback=True)
 
         lang = self.get_main_config().get("language", "system_lang")
         logging.debug(f"Selected lang: {lang} OS lang: {locale.getlocale()[0]}")
@@ -141,9 +144,21 @@ class KlipperScreenConfig:
         if lang not in self.lang_list:
             lang = self.find_language(lang)
         logging.info(f"Using lang {lang}")
-        self.lang = self.langs[lang]
+        self.lang = self.get_translation(lang)
         self.lang.install(names=['gettext', 'ngettext'])
 
+    def get_translation(self, lang):
+        # Catalogs are parsed when first used, the least recently used is dropped from the cache
+        if lang in self.langs:
+            self.langs[lang] = self.langs.pop(lang)
+        else:
+            self.langs[lang] = gettext.translation(
+                'KlipperScreen', localedir=self.lang_path, languages=[lang], fallback=True
+            )
+            while len(self.langs) > LANG_CACHE_SIZE:
+                del self.langs[next(iter(self.langs))]
+        return self.langs[lang]
+
     def validate_config(self, config, string="", remove=False):
         valid = True
         if string:
@@ -162,7 +177,8 @@ class KlipperScreenConfig:
                 bools = (
                     'invert_x', 'invert_y', 'invert_z', '24htime', 'only_heaters', 'show_cursor', 'confirm_estop',
                     'autoclose_popups', 'use_dpms', 'use_default_menu', 'side_macro_shortcut', 'use-matchbox-keyboard',
-                    'show_heater_power', "show_scroll_steppers", "auto_open_extrude"
+                    'show_heater_power', "show_scroll_steppers", "auto_open_extrude", "warm_printers",
+                    "profile_main_loop", "camera_use_mpv"
                 )
                 strs = (
                     'default_printer', 'language', 'print_sort_dir', 'theme', 'screen_blanking_printing', 'font_size',
@@ -171,7 +187,8 @@ class KlipperScreenConfig:
                 )
                 numbers = (
                     'job_complete_timeout', 'job_error_timeout', 'move_speed_xy', 'move_speed_z',
-                    'print_estimate_compensation', 'width', 'height',
+                    'print_estimate_compensation', 'width', 'height', 'warm_printers_max', 'profile_stall_ms',
+                    'update_status_interval', 'camera_max_fps',
                 )
             elif section.startswith('printer '):
                 bools = (
@@ -0,0 +1,189 @@
+import logging
+from collections import deque
+from statistics import median
+
+from ks_includes.gcode_analyzer import product_from_name
+
+HISTORY_JOBS = 200
+DURATIONS_KEPT = 5
+
+
+class ProgressModel:
+    """
+    Least squares fit of progress = a + b * print_duration
+
+    The sums decay on every sample so the rate follows speed changes,
+    updating is O(1) and nothing but the sums is stored.
+    """
+
+    def __init__(self, decay=0.97):
+        self.decay = decay
+        self.reset()
+
+    def reset(self):
+        self.n = self.st = self.sp = self.stt = self.stp = 0.0
+        self.samples = 0
+        self.last_t = None
+
+    def add(self, t, progress):
+        if self.last_t is not None and t <= self.last_t:
+            return
+        self.last_t = t
+        d = self.decay
+        self.n = self.n * d + 1
+        self.st = self.st * d + t
+        self.sp = self.sp * d + progress
+        self.stt = self.stt * d + t * t
+        self.stp = self.stp * d + t * progress
+        self.samples += 1
+
+    @property
+    def rate(self):
+        """Progress per second of print_duration, None until it can be trusted"""
+        if self.samples < 3:
+            return None
+        denominator = self.n * self.stt - self.st * self.st
+        if denominator <= 0:
+            return None
+        rate = (self.n * self.stp - self.st * self.sp) / denominator
+        return rate if rate > 0 else None
+
+
+class EtaService:
+    """
+    Estimated remaining time of the current print, shared by the panels
+
+    Durations of previous prints come from the Moonraker job history, loaded once and kept up to date
+    with notify_history_changed. During a print progress is sampled at a low fixed rate into
+    a ProgressModel and the result is published to the panels as notify_eta_update.
+    """
+
+    def __init__(self, screen, interval=5):
+        self._screen = screen
+        self.interval = interval
+        self.durations = {}
+        self.product_durations = {}
+        self.model = ProgressModel()
+        self.state = None
+        self.filename = None
+        self.prior = None
+        self.result = {}
+
+    def reset(self):
+        self.stop()
+        self.durations.clear()
+        self.product_durations.clear()
+        self.model.reset()
+        self.state = None
+        self.filename = None
+        self.prior = None
+        self.result = {}
+
+    def load_history(self):
+        self._screen._ws.send_method(
+            "server.history.list", {"limit": HISTORY_JOBS, "order": "desc"}, self._history_loaded
+        )
+
+    def _history_loaded(self, result, method, params):
+        if not isinstance(result.get("result"), dict):
+            logging.debug(f"Unable to load job history: {result}")
+            return
+        jobs = result["result"].get("jobs", [])
+        for job in reversed(jobs):
+            self._add_job(job)
+        logging.info(f"Job history: durations of {len(self.durations)} files")
+
+    def process_history(self, data):
+        if data.get("action") == "finished" and "job" in data:
+            self._add_job(data["job"])
+
+    def _add_job(self, job):
+        if job.get("status") != "completed" or not job.get("print_duration") or not job.get("filename"):
+            return
+        duration = job["print_duration"]
+        filename = job["filename"]
+        if filename not in self.durations:
+            self.durations[filename] = deque(maxlen=DURATIONS_KEPT)
+        self.durations[filename].append(duration)
+        product = self._product(filename)
+        if product not in self.product_durations:
+            self.product_durations[product] = deque(maxlen=DURATIONS_KEPT * 4)
+        self.product_durations[product].append(duration)
+
+    def _product(self, filename):
+        files = self._screen.files
+        return files.get_product(filename) if files is not None else product_from_name(filename)
+
+    def last_duration(self, filename):
+        return self.durations[filename][-1] if filename in self.durations else None
+
+    def expected_duration(self, filename):
+        """Median of the last prints of the file, or of the same product if it was never printed"""
+        if filename in self.durations:
+            return median(self.durations[filename])
+        durations = self.product_durations.get(self._product(filename))
+        return median(durations) if durations else None
+
+    def process_update(self, data, printer):
+        if 'print_stats' not in data or 'state' not in data['print_stats']:
+            return
+        state = data['print_stats']['state']
+        printing = self.state in ("printing", "paused")
+        if state in ("printing", "paused") and not printing:
+            self.start(printer)
+        elif state not in ("printing", "paused") and printing:
+            self.stop()
+        self.state = state
+
+    def start(self, printer):
+        self.filename = printer.get_stat("print_stats", "filename")
+        self.model.reset()
+        self.prior = self.expected_duration(self.filename)
+        if self.prior is None:
+            metadata = self._screen.files.get_file_info(self.filename) if self._screen.files else {}
+            self.prior = metadata.get("estimated_time")
+        self.result = {}
+        self._screen.scheduler.add("eta", self.interval, self._update)
+        self._update()
+
+    def stop(self):
+        self._screen.scheduler.remove("eta")
+
+    def get_progress(self):
+        printer = self._screen.printer
+        metadata = self._screen.files.get_file_info(self.filename) if self._screen.files else {}
+        if "gcode_start_byte" in metadata and "gcode_end_byte" in metadata:
+            start = metadata['gcode_start_byte']
+            length = metadata['gcode_end_byte'] - start
+            if length > 0:
+                position = printer.get_stat('virtual_sdcard', 'file_position') or 0
+                return min(max(position - start, 0) / length, 1.0)
+        return printer.get_stat('virtual_sdcard', 'progress') or 0.0
+
+    def _update(self):
+        printer = self._screen.printer
+        elapsed = printer.get_stat('print_stats', 'print_duration') or 0.0
+        progress = self.get_progress()
+        if progress > 0:
+            self.model.add(elapsed, progress)
+
+        remaining = None
+        rate = self.model.rate
+        if rate is not None:
+            remaining = (1 - progress) / rate
+        if self.prior:
+            speed_factor = printer.get_stat('gcode_move', 'speed_factor') or 1.0
+            prior_remaining = max(self.prior / speed_factor - elapsed, 0)
+            # Trust the measured rate more as the print advances
+            weight = min(progress / 0.3, 1.0) if remaining is not None else 0.0
+            remaining = weight * remaining + (1 - weight) * prior_remaining if weight else prior_remaining
+
+        self.result = {
+            'filename': self.filename,
+            'progress': progress,
+            'elapsed': elapsed,
+            'remaining': remaining,
+            'total': elapsed + remaining if remaining is not None else None,
+        }
+        self._screen.process_update("notify_eta_update", self.result)
+        return True
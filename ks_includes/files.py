@@ -4,6 +4,7 @@ import os
 import gi
 
 gi.require_version("Gtk", "3.0")
+from ks_includes.gcode_analyzer import GcodeAnalyzer
 
 
 class KlippyFiles:
@@ -13,27 +14,50 @@ class KlippyFiles:
         self.files = {}
         self.directories = []
         self.gcodes_path = None
+        self.analyzer = GcodeAnalyzer(self)
 
     def reinit(self):
         self.callbacks.clear()
         self.files.clear()
         self.directories.clear()
         self.gcodes_path = None
+        self.analyzer.reinit()
+
+    def save_index(self):
+        """Hands over the file index and starts an empty one"""
+        index = (self.files, self.directories)
+        self.files = {}
+        self.directories = []
+        return index
+
+    def load_index(self, index):
+        """Replaces the file index with one from save_index, refresh_files only fetches what changed since"""
+        self.reinit()
+        if index is not None:
+            self.files, self.directories = index
 
     def set_gcodes_path(self):
         virtual_sdcard = self._screen.printer.get_config_section("virtual_sdcard")
         if virtual_sdcard and "path" in virtual_sdcard:
             self.gcodes_path = os.path.expanduser(virtual_sdcard['path'])
         logging.info(f"Gcodes path: {self.gcodes_path}")
+        self.analyzer.set_root(self.gcodes_path)
 
     def _callback(self, result, method, params):
         if "error" in result:
             logging.debug(result["error"])
             return
         if method == "server.files.list":
+            if not params:
+                for path in set(self.files).difference(item["path"] for item in result["result"]):
+                    self.remove_file(path)
             for item in result["result"]:
+                known = self.files.get(item["path"])
+                if known is not None and known.get("modified") == item.get("modified") and "slicer" in known:
+                    continue
                 self.files[item["path"]] = item
                 self.request_metadata(item["path"])
+                self.analyzer.request(item["path"])
         elif method == "server.files.metadata":
             for x in result['result']:
                 if params['filename'] not in self.files:
@@ -69,10 +93,12 @@ class KlippyFiles:
             return
         self.files[item['path']] = item
         self.request_metadata(item['path'])
+        self.analyzer.request(item['path'])
 
     def remove_file(self, filename):
         if filename in self.files:
             self.files.pop(filename)
+        self.analyzer.remove(filename)
 
     def add_callback(self, callback):
         self.callbacks.append(callback)
@@ -95,7 +121,9 @@ class KlippyFiles:
             self.remove_file(data['item']['path'])
         elif data['action'] == "modify_file":
             self.request_metadata(data['item']['path'])
+            self.analyzer.request(data['item']['path'], force=True)
         elif data['action'] == "move_file":
+            self.analyzer.move(data['source_item']['path'], data['item']['path'])
             self.files[data['item']['path']] = self.files.pop(data['source_item']['path'])
             self.files[data['item']['path']].update(data['item'])
         self.run_callbacks(data['action'], data)
@@ -140,5 +168,14 @@ class KlippyFiles:
             return {}
         return self.files[path]
 
+    def get_analysis(self, filename):
+        return self.analyzer.get(filename)
+
+    def get_product(self, filename):
+        return self.analyzer.get_product(filename)
+
+    def analysis_ready(self, filename, result):
+        self._screen.process_update("notify_gcode_analysis", {'filename': filename, 'analysis': result})
+
     def get_dir_info(self, directory):
         self._screen._ws.klippy.get_dir_info(self._callback, directory=directory)
@@ -0,0 +1,363 @@
+import csv
+import heapq
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from math import fsum, pi, sqrt
+from time import monotonic
+
+EXPORT_KEEP = 100
+# Klipper's status interval, the rolling window gets a sample per interval even without updates
+HOLD_INTERVAL = .25
+
+
+class RollingMedian:
+    """Median of a sliding window with two heaps, evicted values are discarded lazily"""
+
+    def __init__(self):
+        self.low = []  # max-heap, stored negated
+        self.high = []  # min-heap
+        self.low_size = 0
+        self.high_size = 0
+        self.delayed = {}
+
+    def _prune(self, heap, negated):
+        while heap:
+            value = -heap[0] if negated else heap[0]
+            count = self.delayed.get(value)
+            if not count:
+                return
+            if count == 1:
+                del self.delayed[value]
+            else:
+                self.delayed[value] = count - 1
+            heapq.heappop(heap)
+
+    def _balance(self):
+        if self.low_size > self.high_size + 1:
+            heapq.heappush(self.high, -heapq.heappop(self.low))
+            self.low_size -= 1
+            self.high_size += 1
+            self._prune(self.low, True)
+        elif self.low_size < self.high_size:
+            heapq.heappush(self.low, -heapq.heappop(self.high))
+            self.high_size -= 1
+            self.low_size += 1
+            self._prune(self.high, False)
+
+    def add(self, value):
+        if not self.low or value <= -self.low[0]:
+            heapq.heappush(self.low, -value)
+            self.low_size += 1
+        else:
+            heapq.heappush(self.high, value)
+            self.high_size += 1
+        self._balance()
+
+    def remove(self, value):
+        self.delayed[value] = self.delayed.get(value, 0) + 1
+        if value <= -self.low[0]:
+            self.low_size -= 1
+            if value == -self.low[0]:
+                self._prune(self.low, True)
+        else:
+            self.high_size -= 1
+            if self.high and value == self.high[0]:
+                self._prune(self.high, False)
+        self._balance()
+
+    def median(self):
+        if self.low_size == 0:
+            return 0.0
+        if self.low_size > self.high_size:
+            return -self.low[0]
+        return (-self.low[0] + self.high[0]) / 2
+
+
+class RollingWindow:
+    """Mean, median, min and max of the last 'size' samples"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self.pushed = 0
+        self._median = RollingMedian()
+        self._min = deque()  # (index, value) increasing values
+        self._max = deque()  # (index, value) decreasing values
+
+    def push(self, value):
+        if len(self.values) == self.size:
+            old = self.values.popleft()
+            self.total -= old
+            self._median.remove(old)
+        index = self.pushed
+        self.pushed += 1
+        self.values.append(value)
+        self.total += value
+        self._median.add(value)
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((index, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((index, value))
+        oldest = index - self.size
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+        if self.pushed % self.size == 0:
+            # Keep the running sum from drifting
+            self.total = fsum(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def mean(self):
+        return self.total / len(self.values) if self.values else 0.0
+
+    @property
+    def median(self):
+        return self._median.median()
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else 0.0
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else 0.0
+
+
+class FlowHistory:
+    """
+    Downsampled flow of one extruder during a print
+
+    Samples are accumulated in buckets, when there are too many buckets adjacent pairs are merged
+    and the bucket length doubles, so a print of any length fits in 'max_buckets'.
+    """
+
+    def __init__(self, interval=2.0, max_buckets=720):
+        self.interval = interval
+        self.max_buckets = max_buckets
+        # [start, samples, sum, min, max, median]
+        self.buckets = []
+        # Welford accumulators of the whole print
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, elapsed, value, median):
+        self.count += 1
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+
+        start = elapsed - elapsed % self.interval
+        if self.buckets and self.buckets[-1][0] == start:
+            bucket = self.buckets[-1]
+            bucket[1] += 1
+            bucket[2] += value
+            bucket[3] = min(bucket[3], value)
+            bucket[4] = max(bucket[4], value)
+            bucket[5] = median
+            return
+        self.buckets.append([start, 1, value, value, value, median])
+        if len(self.buckets) > self.max_buckets:
+            self._compact()
+
+    def _compact(self):
+        self.interval *= 2
+        merged = []
+        for bucket in self.buckets:
+            start = bucket[0] - bucket[0] % self.interval
+            if merged and merged[-1][0] == start:
+                last = merged[-1]
+                last[5] = (last[5] * last[1] + bucket[5] * bucket[1]) / (last[1] + bucket[1])
+                last[1] += bucket[1]
+                last[2] += bucket[2]
+                last[3] = min(last[3], bucket[3])
+                last[4] = max(last[4], bucket[4])
+            else:
+                merged.append([start, *bucket[1:]])
+        self.buckets = merged
+
+    @property
+    def mean(self):
+        return self._mean
+
+    @property
+    def stdev(self):
+        return sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def rows(self):
+        for start, samples, total, low, high, median in self.buckets:
+            yield start, total / samples, median, low, high, samples
+
+
+class FlowTelemetry:
+    """
+    Volumetric flow of each extruder computed from motion_report live_extruder_velocity
+
+    Keeps a rolling window per extruder for the live values, a per second series for the graphs,
+    and a downsampled history of the current print that is exported as csv when the print ends.
+    Moonraker only reports changes, so the last value is held: it's pushed again to the window for
+    every HOLD_INTERVAL without an update, and the window follows time when extrusion stops.
+    """
+
+    def __init__(self, export_dir, window=50, live_size=1200):
+        self.export_dir = export_dir
+        self.window_size = window
+        self.live_size = live_size
+        self.windows = {}
+        self.held = {}
+        self.live = {}
+        self.sections = {}
+        self.extruder = None
+        self.print_state = None
+        self.print_file = None
+        self.print_start = None
+        self.history = {}
+
+    def reset(self):
+        self.windows.clear()
+        self.held.clear()
+        self.live.clear()
+        self.sections.clear()
+        self.extruder = None
+        self.print_state = None
+        self.print_file = None
+        self.print_start = None
+        self.history.clear()
+
+    def _section(self, printer, extruder):
+        if extruder not in self.sections:
+            try:
+                diameter = float(printer.get_config_section(extruder).get('filament_diameter', 1.75))
+            except (AttributeError, TypeError, ValueError):
+                diameter = 1.75
+            self.sections[extruder] = pi * ((diameter / 2) ** 2)
+        return self.sections[extruder]
+
+    def process_update(self, data, printer):
+        now = monotonic()
+        if 'toolhead' in data and 'extruder' in data['toolhead']:
+            extruder = data['toolhead']['extruder']
+            if self.extruder is not None and extruder != self.extruder:
+                # Only the active extruder is reported, the previous one stopped
+                self.feed(self.extruder, 0.0, now)
+            self.extruder = extruder
+        if 'print_stats' in data and 'state' in data['print_stats']:
+            self._print_state_changed(data['print_stats']['state'], printer, now)
+        if 'motion_report' in data and 'live_extruder_velocity' in data['motion_report']:
+            if self.extruder is None:
+                self.extruder = printer.get_stat("toolhead", "extruder") or "extruder"
+            velocity = float(data['motion_report']['live_extruder_velocity'])
+            self.feed(self.extruder, self._section(printer, self.extruder) * velocity, now)
+
+    def _print_state_changed(self, state, printer, now):
+        printing = self.print_state in ("printing", "paused")
+        if state == "printing" and not printing:
+            self.print_file = printer.get_stat("print_stats", "filename")
+            self.print_start = now
+            self.history.clear()
+        elif state not in ("printing", "paused") and printing:
+            self.export(state)
+            self.print_start = None
+        self.print_state = state
+
+    def feed(self, extruder, flow, now=None):
+        now = monotonic() if now is None else now
+        window = self.windows.get(extruder)
+        if window is None:
+            window = self.windows[extruder] = RollingWindow(self.window_size)
+        else:
+            self._hold(extruder, now)
+        window.push(flow)
+        self.held[extruder] = [flow, now]
+        self._update_live(extruder, window.mean, now)
+        if self.print_start is not None and self.print_state == "printing":
+            history = self.history.get(extruder)
+            if history is None:
+                history = self.history[extruder] = FlowHistory()
+            history.add(now - self.print_start, flow, window.median)
+
+    def _hold(self, extruder, now):
+        held = self.held[extruder]
+        count = int((now - held[1]) / HOLD_INTERVAL)
+        if count <= 0:
+            return
+        window = self.windows[extruder]
+        for i in range(min(count, self.window_size)):
+            window.push(held[0])
+        held[1] += count * HOLD_INTERVAL
+
+    def _update_live(self, extruder, value, now):
+        second = int(now)
+        live = self.live.get(extruder)
+        if live is None:
+            live = self.live[extruder] = [deque(maxlen=self.live_size), second, value]
+        # Moonraker only reports changes, the previous value held until now
+        for _ in range(min(second - live[1], self.live_size)):
+            live[0].append(live[2])
+        live[1] = second
+        live[2] = value
+
+    def recent(self, extruder, results=0):
+        """Per second mean flow ending now, left padded with None to 'results' values"""
+        if extruder not in self.live:
+            return None
+        self._update_live(extruder, self.live[extruder][2], monotonic())
+        values = list(self.live[extruder][0])
+        if results:
+            values = values[-results:]
+            values[:0] = [None] * (results - len(values))
+        return values
+
+    def get_window(self, extruder=None):
+        return self.windows.get(extruder or self.extruder)
+
+    def get_flow(self, extruder=None):
+        """Returns the rolling median flow in mm³/s"""
+        extruder = extruder or self.extruder
+        window = self.windows.get(extruder)
+        if window is None:
+            return 0.0
+        self._hold(extruder, monotonic())
+        return window.median
+
+    def summary(self):
+        """Returns {extruder: (mean, stdev)} of the current or last print"""
+        return {extruder: (history.mean, history.stdev) for extruder, history in self.history.items()}
+
+    def export(self, state=""):
+        if not self.history:
+            return None
+        name = os.path.splitext(os.path.basename(self.print_file or "print"))[0]
+        path = os.path.join(self.export_dir, f"{datetime.now():%Y%m%d-%H%M%S}_{name}.csv")
+        try:
+            os.makedirs(self.export_dir, exist_ok=True)
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(("extruder", "elapsed", "mean", "median", "min", "max", "samples"))
+                for extruder, history in sorted(self.history.items()):
+                    for row in history.rows():
+                        writer.writerow((extruder, *(round(v, 3) for v in row[:-1]), row[-1]))
+            self._prune_exports()
+        except OSError as e:
+            logging.error(f"Unable to export flow history: {e}")
+            return None
+        for extruder, (mean, stdev) in self.summary().items():
+            logging.info(
+                f"Flow {extruder} {state}: mean {mean:.2f} mm³/s stdev {stdev:.2f}"
+                f"{f' cv {stdev / mean:.1%}' if mean > 0 else ''}"
+            )
+        return path
+
+    def _prune_exports(self):
+        exports = sorted(f for f in os.listdir(self.export_dir) if f.endswith(".csv"))
+        for old in exports[:-EXPORT_KEEP]:
+            os.remove(os.path.join(self.export_dir, old))
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+INDEX_NAME = ".ks_gcode_index.json"
+INDEX_VERSION = 2
+
+# (product key, filename keywords, icon)
+PRODUCTS = (
+    ("Salmon", ("salmon",), "salmon"),
+    ("EL BLANCO", ("blanco",), "elblanco"),
+    ("VEGANVITA", ("veganvita",), "file"),
+    ("PRIME CUT", ("prime", "cut"), "primecut"),
+)
+UNKNOWN_PRODUCT = "UNKNOWN"
+TOOL_NAMES = {"T0": "Orange", "T1": "White"}
+
+# ; product: Salmon  |  ;PRODUCT=Salmon  |  PRINT_START PRODUCT="EL BLANCO"
+PRODUCT_TAG = re.compile(rb'\bproduct\s*[:=]\s*"?([^";\r\n]+)', re.IGNORECASE)
+LAYER_COMMENTS = (b";LAYER_CHANGE", b";LAYER:", b"; LAYER:", b";Z:")
+
+
+def product_from_name(filename):
+    name = (filename or "").lower()
+    for product, keywords, _ in PRODUCTS:
+        if any(keyword in name for keyword in keywords):
+            return product
+    return UNKNOWN_PRODUCT
+
+
+def normalize_product(tag):
+    tag = tag.strip()
+    for product, _, _ in PRODUCTS:
+        if tag.casefold() == product.casefold():
+            return product
+    product = product_from_name(tag)
+    return product if product != UNKNOWN_PRODUCT else tag
+
+
+def product_icon(product):
+    return next((icon for key, _, icon in PRODUCTS if key == product), "file")
+
+
+def analyze_gcode(path):
+    """
+    Stream a gcode file and collect what the UI needs before printing it
+
+    Runs in a worker process, it must not touch Gtk or the screen.
+    """
+    extrusion = {}
+    tool = 0
+    tool_changes = 0
+    # E is relative after either G91 or M83, like in Klipper
+    absolute_coord = absolute_extrude = absolute_e = True
+    last_e = 0.0
+    layers = 0
+    z_levels = set()
+    last_z = None
+    product = None
+    fingerprint = hashlib.blake2b(digest_size=8)
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for raw in iter(mm.readline, b""):
+                line = raw.strip()
+                if not line:
+                    continue
+                if line[0] == 59:  # ';'
+                    if line.startswith(LAYER_COMMENTS):
+                        layers += 1
+                    elif product is None and (match := PRODUCT_TAG.search(line)):
+                        product = normalize_product(match.group(1).decode(errors='ignore'))
+                    continue
+                code, _, comment = line.partition(b";")
+                code = code.strip().upper()
+                if not code:
+                    continue
+                fingerprint.update(code)
+                fingerprint.update(b"\n")
+                cmd, _, args = code.partition(b" ")
+                if cmd in (b"G0", b"G1", b"G2", b"G3"):
+                    e = z = None
+                    try:
+                        for arg in args.split():
+                            if arg[:1] == b"E":
+                                e = float(arg[1:] or 0)
+                            elif arg[:1] == b"Z":
+                                z = float(arg[1:] or 0)
+                    except ValueError:
+                        continue
+                    if e is not None:
+                        delta = e - last_e if absolute_e else e
+                        last_e += delta
+                        extrusion[tool] = extrusion.get(tool, 0.0) + delta
+                        if delta > 0 and last_z is not None:
+                            z_levels.add(round(last_z, 3))
+                    if z is not None:
+                        last_z = z
+                elif cmd == b"G92":
+                    for arg in args.split():
+                        if arg[:1] == b"E":
+                            try:
+                                last_e = float(arg[1:] or 0)
+                            except ValueError:
+                                pass
+                elif cmd in (b"G90", b"G91"):
+                    absolute_coord = cmd == b"G90"
+                    absolute_e = absolute_coord and absolute_extrude
+                elif cmd in (b"M82", b"M83"):
+                    absolute_extrude = cmd == b"M82"
+                    absolute_e = absolute_coord and absolute_extrude
+                elif cmd[:1] == b"T" and cmd[1:].isdigit():
+                    new_tool = int(cmd[1:])
+                    if new_tool != tool:
+                        tool_changes += 1
+                        tool = new_tool
+                elif cmd == b"ACTIVATE_EXTRUDER":
+                    match = re.search(rb"EXTRUDER=EXTRUDER(\d*)", args)
+                    new_tool = int(match.group(1) or 0) if match else tool
+                    if new_tool != tool:
+                        tool_changes += 1
+                        tool = new_tool
+                elif product is None and (match := PRODUCT_TAG.search(code)):
+                    product = normalize_product(match.group(1).decode(errors='ignore'))
+
+    return {
+        "extrusion": {f"T{t}": round(mm_used, 2) for t, mm_used in sorted(extrusion.items())},
+        "tool_changes": tool_changes,
+        "layers": layers or len(z_levels),
+        "product": product,
+        "fingerprint": fingerprint.hexdigest(),
+    }
+
+
+class GcodeAnalyzer:
+    def __init__(self, files):
+        self._files = files
+        self.root = None
+        self.index = {}
+        self.products_by_fingerprint = {}
+        self.pending = set()
+        self.executor = None
+        self.save_timeout = None
+
+    def reinit(self):
+        self.save_index()
+        self.root = None
+        self.index.clear()
+        self.products_by_fingerprint.clear()
+        self.pending.clear()
+
+    def set_root(self, path):
+        if path == self.root:
+            return
+        self.reinit()
+        self.root = path
+        if path is None:
+            return
+        try:
+            with open(os.path.join(path, INDEX_NAME), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.index = data.get("files", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"Unable to load gcode index: {e}")
+        for result in self.index.values():
+            self._learn(result)
+        logging.info(f"Gcode index: {len(self.index)} files")
+
+    def _learn(self, result):
+        if result.get("product") and result["product"] != UNKNOWN_PRODUCT:
+            self.products_by_fingerprint[result["fingerprint"]] = result["product"]
+
+    def _stat(self, filename):
+        try:
+            return os.stat(os.path.join(self.root, filename)).st_mtime
+        except OSError:
+            return None
+
+    def get(self, filename):
+        """Returns the cached analysis if it matches the file on disk"""
+        if self.root is None or filename not in self.index:
+            return None
+        result = self.index[filename]
+        if result.get("mtime") != self._stat(filename):
+            return None
+        return result
+
+    def request(self, filename, force=False):
+        if self.root is None or filename in self.pending:
+            return
+        mtime = self._stat(filename)
+        if mtime is None:
+            return
+        if not force and filename in self.index and self.index[filename].get("mtime") == mtime:
+            return
+        if self.executor is None:
+            # spawn: the parent holds the Gtk main loop and the websocket thread
+            self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self.pending.add(filename)
+        root = self.root
+        future = self.executor.submit(analyze_gcode, os.path.join(root, filename))
+        future.add_done_callback(
+            lambda fut: GLib.idle_add(self._done, filename, mtime, root, fut)
+        )
+
+    def _done(self, filename, mtime, root, future):
+        self.pending.discard(filename)
+        if root != self.root:
+            return False
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"Error analyzing {filename}: {e}")
+            return False
+        if result is None:
+            return False
+        result["mtime"] = mtime
+        if result["product"] is None:
+            name_product = product_from_name(filename)
+            if name_product == UNKNOWN_PRODUCT:
+                name_product = self.products_by_fingerprint.get(result["fingerprint"], UNKNOWN_PRODUCT)
+            result["product"] = name_product
+        self.index[filename] = result
+        self._learn(result)
+        logging.debug(f"Analyzed {filename}: {result}")
+        if self.save_timeout is None:
+            self.save_timeout = GLib.timeout_add_seconds(5, self._save_timeout_cb)
+        self._files.analysis_ready(filename, result)
+        return False
+
+    def remove(self, filename):
+        if self.index.pop(filename, None) is not None and self.save_timeout is None:
+            self.save_timeout = GLib.timeout_add_seconds(5, self._save_timeout_cb)
+
+    def move(self, source, dest):
+        if source in self.index:
+            self.index[dest] = self.index.pop(source)
+
+    def _save_timeout_cb(self):
+        self.save_timeout = None
+        return self.save_index()
+
+    def save_index(self):
+        if self.save_timeout is not None:
+            GLib.source_remove(self.save_timeout)
+            self.save_timeout = None
+        if self.root is None:
+            return False
+        try:
+            with open(os.path.join(self.root, INDEX_NAME), 'w', encoding='utf-8') as f:
+                json.dump({"version": INDEX_VERSION, "files": self.index}, f)
+        except OSError as e:
+            logging.error(f"Unable to save gcode index: {e}")
+        return False
+
+    def get_product(self, filename):
+        result = self.get(filename)
+        if result is not None:
+            return result["product"]
+        return product_from_name(filename)
+
+    def shutdown(self):
+        self.save_index()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
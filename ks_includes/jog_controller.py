@@ -0,0 +1,131 @@
+import logging
+from math import copysign
+from time import monotonic
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+from ks_includes.KlippyGcodes import KlippyGcodes
+
+COALESCE_MS = 120
+HOLD_MS = 400
+HOLD_TICK_MS = 50
+LATENCY_BUDGET = .5
+
+
+class JogController:
+    """
+    Turns jog button taps and holds into few relative moves
+
+    Taps arriving within COALESCE_MS of each other are summed per axis and sent as one script.
+    Holding a button for HOLD_MS jogs continuously until it's released, in moves of half the latency budget.
+    The motion queued on the printer is estimated from the moves sent and the toolhead status,
+    new moves wait while it's above the latency budget, so the machine never lags further behind the screen
+    and stops within that time after the button is released.
+    """
+
+    def __init__(self, screen, latency_budget=LATENCY_BUDGET):
+        self._screen = screen
+        self.latency_budget = latency_budget
+        self.taps = {}
+        self.pressed = None
+        self.holding = False
+        self.flush_timeout = None
+        self.hold_timeout = None
+        self.in_flight = 0
+        self.busy_until = 0.0
+
+    def queued_time(self):
+        return max(0.0, self.busy_until - monotonic())
+
+    def press(self, axis, distance, speed):
+        """speed in mm/s, a release within HOLD_MS is a tap of distance, after that it jogs until released"""
+        self.release()
+        self.pressed = (axis, distance, speed)
+        self.hold_timeout = GLib.timeout_add(HOLD_MS, self._start_hold)
+
+    def release(self):
+        if self.pressed is None:
+            return
+        if not self.holding:
+            self.tap(*self.pressed)
+        self._stop_hold()
+
+    def tap(self, axis, distance, speed):
+        total = self.taps.setdefault(axis, [0.0, speed])
+        total[0] += distance
+        total[1] = speed
+        if self.flush_timeout is None:
+            self.flush_timeout = GLib.timeout_add(COALESCE_MS, self._flush_taps)
+
+    def stop(self):
+        """Drops the taps not sent yet and ends a hold"""
+        self._stop_hold()
+        self.taps.clear()
+        # A reply lost with the connection would block holding for good
+        self.in_flight = 0
+        if self.flush_timeout is not None:
+            GLib.source_remove(self.flush_timeout)
+            self.flush_timeout = None
+
+    def _stop_hold(self):
+        if self.hold_timeout is not None:
+            GLib.source_remove(self.hold_timeout)
+            self.hold_timeout = None
+        self.pressed = None
+        self.holding = False
+
+    def _flush_taps(self):
+        if self.queued_time() > self.latency_budget:
+            # More taps can join while the printer catches up
+            return True
+        self.flush_timeout = None
+        moves = [(axis, distance, speed) for axis, (distance, speed) in self.taps.items() if round(distance, 3)]
+        self.taps.clear()
+        if moves:
+            self._send(moves)
+        return False
+
+    def _start_hold(self):
+        self.holding = True
+        self.hold_timeout = GLib.timeout_add(HOLD_TICK_MS, self._hold_tick)
+        self._hold_tick()
+        return False
+
+    def _hold_tick(self):
+        axis, distance, speed = self.pressed
+        if self.in_flight == 0 and self.queued_time() < self.latency_budget / 2:
+            self._send([(axis, copysign(speed * self.latency_budget / 2, distance), speed)])
+        return True
+
+    def _send(self, moves):
+        script = [KlippyGcodes.MOVE_RELATIVE]
+        duration = 0.0
+        for axis, distance, speed in moves:
+            script.append(f"G0 {axis.upper()}{round(distance, 3):g} F{round(speed * 60)}")
+            duration += abs(distance) / speed
+        if self._screen.printer.get_stat("gcode_move", "absolute_coordinates"):
+            script.append(KlippyGcodes.MOVE_ABSOLUTE)
+        if not self._screen._ws.klippy.gcode_script("\n".join(script), self._sent):
+            logging.debug("Jog not sent, not connected")
+            return
+        self.busy_until = max(monotonic(), self.busy_until) + duration
+        self.in_flight += 1
+
+    def _sent(self, result, method, params):
+        self.in_flight = max(0, self.in_flight - 1)
+        if "error" in result:
+            # Out of range or not homed, Klipper reports it in the console
+            logging.info(f"Jog failed: {result['error']}")
+            self.stop()
+            self.busy_until = 0.0
+
+    def process_update(self, data):
+        if "toolhead" not in data or "estimated_print_time" not in data["toolhead"]:
+            return
+        toolhead = self._screen.printer.get_stat("toolhead")
+        queued = toolhead.get("print_time", 0) - toolhead.get("estimated_print_time", 0)
+        if queued > 0:
+            self.busy_until = max(self.busy_until, monotonic() + queued)
@@ -0,0 +1,83 @@
+from time import monotonic
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib, Gtk
+
+from ks_includes.KlippyGtk import find_widget
+
+
+class LabelBinding:
+    __slots__ = ("source", "label", "rate", "value", "last", "pending", "timeout")
+
+    def __init__(self, source, label, rate=None):
+        self.source = source
+        self.label = label
+        self.rate = rate
+        self.value = None
+        self.last = 0.0
+        self.pending = None
+        self.timeout = None
+
+
+class LabelBindings:
+    """
+    Labels fed from status updates, each bound to a key
+
+    The Gtk.Label inside the bound widget is looked up once, and again only if the widget is replaced.
+    The last displayed value is kept: callers pass the value as it is shown (already rounded)
+    and the label is only formatted and set when it changed, sparing GTK a relayout.
+    With max_rate a label is refreshed at most that many times per second,
+    a value arriving too early is shown when the interval ends.
+    """
+
+    def __init__(self):
+        self.bindings = {}
+
+    def bind(self, key, widget, max_rate=None):
+        self.unbind(key)
+        binding = self.bindings[key] = LabelBinding(widget, find_widget(widget, Gtk.Label), max_rate)
+        return binding
+
+    def unbind(self, key):
+        binding = self.bindings.pop(key, None)
+        if binding is not None and binding.timeout is not None:
+            GLib.source_remove(binding.timeout)
+
+    def clear(self):
+        for key in list(self.bindings):
+            self.unbind(key)
+
+    def update(self, key, widget, value, render=str):
+        """Shows render(value) in the label of 'widget', returns True if the label was changed"""
+        binding = self.bindings.get(key)
+        if binding is None or binding.source is not widget:
+            binding = self.bind(key, widget, binding.rate if binding is not None else None)
+        if binding.label is None:
+            return False
+        if value == binding.value:
+            binding.pending = None
+            return False
+        if binding.rate:
+            wait = binding.last + 1 / binding.rate - monotonic()
+            if wait > 0:
+                binding.pending = (value, render)
+                if binding.timeout is None:
+                    binding.timeout = GLib.timeout_add(int(wait * 1000) + 1, self._flush, binding)
+                return False
+        self._render(binding, value, render)
+        return True
+
+    @staticmethod
+    def _render(binding, value, render):
+        binding.value = value
+        binding.last = monotonic()
+        binding.label.set_text(render(value))
+
+    def _flush(self, binding):
+        binding.timeout = None
+        if binding.pending is not None:
+            self._render(binding, *binding.pending)
+            binding.pending = None
+        return False
@@ -0,0 +1,73 @@
+import re
+
+PARAM_PATTERN = re.compile(r'params\.(?P<param>[a-zA-Z0-9_]+)'
+                           r'(?:\s*\|\s*default\(\s*(?P<default>[^\)]+)\s*\))?'
+                           r'(?:\s*\|\s*(?P<type_hint>[a-zA-Z]+))?')
+HIDDEN_MACROS = ('LOAD_FILAMENT', 'UNLOAD_FILAMENT')
+
+
+class MacroParam:
+    __slots__ = ("name", "default", "type_hint")
+
+    def __init__(self, name, default=None, type_hint=None):
+        self.name = name
+        self.default = default
+        self.type_hint = type_hint
+
+
+class Macro:
+    __slots__ = ("name", "section", "hidden", "renamed", "params", "key")
+
+    def __init__(self, name, section):
+        self.name = name
+        self.section = section
+        self.hidden = name.startswith("_") or name.upper() in HIDDEN_MACROS
+        self.renamed = "rename_existing" in section
+        self.params = parse_params(section.get("gcode", ""))
+        self.key = name.casefold()
+
+    @property
+    def listed(self):
+        return not (self.hidden or self.renamed)
+
+    def matches(self, text):
+        """text is expected casefolded"""
+        return text in self.key
+
+
+def parse_params(gcode):
+    params = {}
+    for line in gcode.split("\n"):
+        if line.startswith("{") and "params." in line:
+            result = PARAM_PATTERN.search(line)
+            if result and result["param"] not in params:
+                params[result["param"]] = MacroParam(result["param"], result["default"], result["type_hint"])
+    return list(params.values())
+
+
+class MacroCatalog:
+    """
+    The gcode macros of the Klipper config, parsed once per config load
+
+    macros holds every macro by name, order the names of the macros shown in the interface sorted by name.
+    """
+
+    def __init__(self, config=None):
+        self.macros = {}
+        for section_name, section in (config or {}).items():
+            if section_name.startswith("gcode_macro "):
+                name = section_name[12:].strip()
+                self.macros[name] = Macro(name, section)
+        self.order = sorted((macro.name for macro in self.macros.values() if macro.listed), key=str.casefold)
+
+    def __contains__(self, name):
+        return name in self.macros
+
+    def __len__(self):
+        return len(self.order)
+
+    def get(self, name):
+        return self.macros.get(name)
+
+    def listed(self, reverse=False):
+        return reversed(self.order) if reverse else iter(self.order)
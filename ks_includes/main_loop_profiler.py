@@ -0,0 +1,250 @@
+import logging
+import sys
+import threading
+import traceback
+from bisect import bisect_left
+from collections import deque
+from functools import partial
+from time import perf_counter, sleep, time
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib, GObject
+
+# Upper bounds in milliseconds, the last bucket is everything above
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+STALLS_KEPT = 50
+STACK_LINES = 12
+LOG_INTERVAL = 300
+
+
+class Histogram:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the percentile, capped by the max"""
+        wanted = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= wanted and count:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return 0.0
+
+
+class Stall:
+    __slots__ = ("source", "ms", "time", "stack")
+
+    def __init__(self, source, ms, stack):
+        self.source = source
+        self.ms = ms
+        self.time = time()
+        self.stack = stack
+
+
+class _Timed:
+    """
+    Wraps a callback to time it. Compares equal to the callback,
+    so disconnect_by_func and handler_block_by_func still find it
+    """
+    __slots__ = ("profiler", "func", "source")
+
+    def __init__(self, profiler, func, source):
+        self.profiler = profiler
+        self.func = func
+        self.source = source
+
+    def __call__(self, *args, **kwargs):
+        return self.profiler.call(self.source, self.func, *args, **kwargs)
+
+    def __eq__(self, other):
+        return other is self or self.func == other
+
+    def __hash__(self):
+        return hash(self.func)
+
+
+def source_name(func):
+    while isinstance(func, (partial, _Timed)):
+        func = func.func
+    module = getattr(func, "__module__", None) or ""
+    name = getattr(func, "__qualname__", None) or type(func).__name__
+    return f"{module}.{name}" if module else name
+
+
+class MainLoopProfiler:
+    """
+    Opt-in instrumentation of the GTK main loop, enabled with profile_main_loop in [main]
+
+    GLib idle and timeout callbacks and signal handlers are wrapped once installed, and their durations kept
+    in histograms by source. Frame times (from before-paint to after-paint of the frame clock)
+    are kept by panel. When a callback runs longer than the stall threshold a watchdog thread samples
+    the stack of the main thread. A summary is logged periodically and shown by the profiler panel.
+    """
+
+    def __init__(self, screen, stall_ms=100):
+        self._screen = screen
+        self.stall_ms = stall_ms
+        self.callbacks = {}
+        self.frames = {}
+        self.stalls = deque(maxlen=STALLS_KEPT)
+        self.started = time()
+        self._depth = 0
+        self._current = None
+        self._sample = None
+        self._frame_start = None
+        self._main_thread = threading.get_ident()
+        self._originals = {}
+
+    def install(self):
+        if self._originals:
+            return
+        for name in ("idle_add", "timeout_add", "timeout_add_seconds"):
+            self._originals[name] = getattr(GLib, name)
+        self._originals["connect"] = GObject.Object.connect
+        self._originals["connect_after"] = GObject.Object.connect_after
+
+        def idle_add(function, *args, **kwargs):
+            return self._originals["idle_add"](self._wrap(function, source_name(function)), *args, **kwargs)
+
+        def timeout_add(interval, function, *args, **kwargs):
+            return self._originals["timeout_add"](
+                interval, self._wrap(function, source_name(function)), *args, **kwargs
+            )
+
+        def timeout_add_seconds(interval, function, *args, **kwargs):
+            return self._originals["timeout_add_seconds"](
+                interval, self._wrap(function, source_name(function)), *args, **kwargs
+            )
+
+        def connect(obj, signal, handler, *args):
+            return self._originals["connect"](
+                obj, signal, self._wrap(handler, f"{signal} {source_name(handler)}"), *args
+            )
+
+        def connect_after(obj, signal, handler, *args):
+            return self._originals["connect_after"](
+                obj, signal, self._wrap(handler, f"{signal} {source_name(handler)}"), *args
+            )
+
+        GLib.idle_add = idle_add
+        GLib.timeout_add = timeout_add
+        GLib.timeout_add_seconds = timeout_add_seconds
+        GObject.Object.connect = connect
+        GObject.Object.connect_after = connect_after
+        self._originals["connect"](self._screen, "realize", self._hook_frame_clock)
+        threading.Thread(target=self._watchdog, daemon=True).start()
+        self._originals["timeout_add_seconds"](LOG_INTERVAL, self.log_summary)
+        logging.info(f"Main loop profiler installed, stalls over {self.stall_ms} ms are reported")
+
+    def _wrap(self, func, source):
+        if not callable(func) or isinstance(func, _Timed):
+            return func
+        return _Timed(self, func, source)
+
+    def call(self, source, func, *args, **kwargs):
+        """Runs 'func' timing it under 'source', nested calls are timed but stalls are checked on the outer one"""
+        outer = self._depth == 0
+        self._depth += 1
+        start = perf_counter()
+        current = (source, start)
+        if outer:
+            self._current = current
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._depth -= 1
+            ms = (perf_counter() - start) * 1000
+            histogram = self.callbacks.get(source)
+            if histogram is None:
+                histogram = self.callbacks[source] = Histogram()
+            histogram.add(ms)
+            if outer:
+                self._current = None
+                sample, self._sample = self._sample, None
+                if ms > self.stall_ms:
+                    self._stall(source, ms, sample[1] if sample and sample[0] is current else None)
+
+    def _stall(self, source, ms, stack):
+        self.stalls.append(Stall(source, ms, stack))
+        logging.warning(f"Main loop stalled {ms:.0f} ms in {source}")
+        if stack:
+            logging.debug("Stack sample:\n" + "".join(stack))
+
+    def _watchdog(self):
+        period = self.stall_ms / 2000
+        while True:
+            sleep(period)
+            current = self._current
+            if current is None or self._sample is not None:
+                continue
+            if (perf_counter() - current[1]) * 1000 > self.stall_ms:
+                frame = sys._current_frames().get(self._main_thread)
+                if frame is not None and self._current is current:
+                    self._sample = (current, traceback.format_stack(frame)[-STACK_LINES:])
+
+    def _hook_frame_clock(self, widget):
+        clock = widget.get_frame_clock()
+        if clock is None:
+            return
+        self._originals["connect"](clock, "before-paint", self._frame_begin)
+        self._originals["connect"](clock, "after-paint", self._frame_end)
+
+    def _frame_begin(self, clock):
+        self._frame_start = perf_counter()
+
+    def _frame_end(self, clock):
+        if self._frame_start is None:
+            return
+        ms = (perf_counter() - self._frame_start) * 1000
+        self._frame_start = None
+        panels = self._screen._cur_panels
+        panel = panels[-1] if panels else "splash_screen"
+        histogram = self.frames.get(panel)
+        if histogram is None:
+            histogram = self.frames[panel] = Histogram()
+        histogram.add(ms)
+        if ms > self.stall_ms:
+            self.stalls.append(Stall(f"frame {panel}", ms, None))
+
+    def reset(self):
+        self.callbacks.clear()
+        self.frames.clear()
+        self.stalls.clear()
+        self.started = time()
+
+    def top(self, histograms, count=10):
+        return sorted(histograms.items(), key=lambda item: item[1].total, reverse=True)[:count]
+
+    def log_summary(self):
+        lines = [f"Main loop profile over {(time() - self.started) / 60:.0f} min, {len(self.stalls)} stalls"]
+        for source, histogram in self.top(self.callbacks):
+            lines.append(
+                f"  {source}: {histogram.count} calls, total {histogram.total:.0f} ms, "
+                f"mean {histogram.mean:.1f} ms, p95 {histogram.percentile(.95):.0f} ms, max {histogram.max:.0f} ms"
+            )
+        for panel, histogram in self.top(self.frames):
+            lines.append(
+                f"  frames {panel}: {histogram.count}, mean {histogram.mean:.1f} ms, "
+                f"p95 {histogram.percentile(.95):.0f} ms, max {histogram.max:.0f} ms"
+            )
+        logging.info("\n".join(lines))
+        self._screen.scheduler.log_summary()
+        return True
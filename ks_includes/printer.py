@@ -5,11 +5,16 @@ import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import GLib
 
+from ks_includes.macro_catalog import MacroCatalog
+from ks_includes.printer_state import PrinterState
+from ks_includes.scheduler import Scheduler
+
 
 class Printer:
-    def __init__(self, state_cb, state_callbacks):
+    def __init__(self, state_cb, state_callbacks, scheduler=None, name="printer"):
         self.config = {}
-        self.data = {}
+        self.macro_catalog = MacroCatalog()
+        self.data = PrinterState()
         self.state = "disconnected"
         self.state_cb = state_cb
         self.state_callbacks = state_callbacks
@@ -21,7 +26,8 @@ class Printer:
         self.ledcount = 0
         self.pwm_tools_count = 0
         self.output_pin_count = 0
-        self.store_timeout = None
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.store_task = f"temperature store {name}"
         self.tempstore = {}
         self.tempstore_size = 1200
         self.cameras = []
@@ -33,7 +39,8 @@ class Printer:
 
     def reinit(self, printer_info, data):
         self.config = data['configfile']['config']
-        self.data = data
+        self.macro_catalog = MacroCatalog(self.config)
+        self.data = PrinterState(data)
         self.tools.clear()
         self.extrudercount = 0
         self.tempdevcount = 0
@@ -105,23 +112,19 @@ class Printer:
         logging.info(f"# Leds: {self.ledcount}")
 
     def stop_tempstore_updates(self):
-        if self.store_timeout is not None:
-            GLib.source_remove(self.store_timeout)
-            self.store_timeout = None
+        self.scheduler.remove(self.store_task)
 
     def process_update(self, data):
         if self.data is None:
             return
 
-        for x in data:
-            if x == "configfile":
-                if 'config' in data[x]:
-                    self.config.update(data[x]['config'])
-                if 'warnings' in data[x]:
-                    self.warnings = data[x]['warnings']
-            if x not in self.data:
-                self.data[x] = {}
-            self.data[x].update(data[x])
+        if "configfile" in data:
+            if 'config' in data["configfile"]:
+                self.config.update(data["configfile"]['config'])
+                self.macro_catalog = MacroCatalog(self.config)
+            if 'warnings' in data["configfile"]:
+                self.warnings = data["configfile"]['warnings']
+        self.data.update(data)
 
         if "webhooks" in data or "print_stats" in data or "idle_timeout" in data:
             self.process_status_update()
@@ -181,14 +184,8 @@ class Printer:
         return self.config[section] if section in self.config else False
 
     def get_macro(self, macro):
-        return next(
-            (
-                self.config[key]
-                for key in self.config.keys()
-                if key.find(macro) > -1
-            ),
-            False,
-        )
+        macro = self.macro_catalog.get(macro)
+        return macro.section if macro else False
 
     def get_fans(self):
         fans = []
@@ -205,15 +202,7 @@ class Printer:
         return self.get_config_section_list("output_pin ")
 
     def get_gcode_macros(self):
-        macros = []
-        for macro in self.get_config_section_list("gcode_macro "):
-            macro = macro[12:].strip()
-            if macro.startswith("_") or macro.upper() in ('LOAD_FILAMENT', 'UNLOAD_FILAMENT'):
-                continue
-            if self.get_macro(macro) and "rename_existing" in self.get_macro(macro):
-                continue
-            macros.append(macro)
-        return macros
+        return list(self.macro_catalog.listed())
 
     def get_heaters(self):
         heaters = self.get_config_section_list("heater_generic ")
@@ -298,12 +287,16 @@ class Printer:
         return self.power_devices[device]['status']
 
     def get_stat(self, stat, substat=None):
-        if self.data is None or stat not in self.data:
+        record = self.data.records.get(stat)
+        if record is None:
             return {}
         if substat is not None:
-            return self.data.get(stat, {}).get(substat, {})
-        else:
-            return self.data.get(stat, {})
+            return record.get(substat, {})
+        return record
+
+    def changed_since(self, version):
+        """Returns {object: {fields}} changed after 'version', compare with data.version to redraw"""
+        return self.data.changed_since(version)
 
     def set_stat(self, stat, data):
         if self.data is None:
@@ -398,8 +391,8 @@ class Printer:
                     for _ in range(1, self.tempstore_size - length):
                         self.tempstore[device][x].insert(0, 0)
         logging.info(f"Temp store: {list(self.tempstore)}")
-        if not self.store_timeout:
-            self.store_timeout = GLib.timeout_add_seconds(1, self._update_temp_store)
+        if self.store_task not in self.scheduler:
+            self.scheduler.add(self.store_task, 1, self._update_temp_store)
 
     def config_section_exists(self, section):
         return section in self.get_config_section_list()
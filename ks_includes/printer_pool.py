@@ -0,0 +1,264 @@
+import logging
+from collections import OrderedDict
+from functools import partial
+
+from ks_includes import functions
+from ks_includes.KlippyRest import KlippyRest
+from ks_includes.KlippyWebsocket import KlippyWebsocket
+from ks_includes.printer_state import PrinterState
+
+MAINTAIN_INTERVAL = 30
+
+
+class PrinterSession:
+    """Connection and state of one configured printer"""
+
+    def __init__(self, name, config, printer):
+        self.name = name
+        self.config = config
+        self.printer = printer
+        self.apiclient = None
+        self.ws = None
+        self.server_info = None
+        self.files = None
+        self.ready = False
+
+    @property
+    def connected(self):
+        return self.ws is not None and self.ws.connected and not self.ws.closing
+
+
+class PrinterPool:
+    """
+    Keeps the websockets of the configured printers open so switching between them is instant
+
+    The active printer is driven by the screen as usual. The others stay subscribed in the background
+    and only keep their lightweight state: Printer.data, the temperature store and the file index,
+    nothing is dispatched to the panels. At most 'max_warm' printers are kept connected,
+    the least recently used ones are closed and their state dropped.
+    """
+
+    def __init__(self, screen, printers, max_warm=4):
+        self._screen = screen
+        self.max_warm = max(1, max_warm)
+        # Least recently used first, the first configured printers are the last to be evicted
+        self.sessions = OrderedDict()
+        for entry in reversed(printers):
+            name = list(entry)[0]
+            session = PrinterSession(name, entry[name], entry["data"])
+            session.printer.state_cb = partial(self._state_execute, session)
+            self.sessions[name] = session
+        self.active = None
+
+    def start(self):
+        if "printer pool" not in self._screen.scheduler:
+            self._screen.scheduler.add("printer pool", MAINTAIN_INTERVAL, self._maintain)
+        self._maintain()
+
+    def open(self, session):
+        """Opens a new connection to the printer of 'session', returns the printer, rest and websocket clients"""
+        self._close(session)
+        cfg = session.config
+        args = (
+            cfg["moonraker_host"],
+            cfg["moonraker_port"],
+            cfg["moonraker_api_key"],
+            cfg["moonraker_path"],
+            cfg["moonraker_ssl"],
+        )
+        callbacks = {}
+        ws = KlippyWebsocket(callbacks, *args)
+        callbacks.update({
+            "on_connect": partial(self._on_connect, session, ws),
+            "on_message": partial(self._on_message, session, ws),
+            "on_close": partial(self._on_close, session, ws),
+            "on_cancel": partial(self._on_cancel, session, ws),
+        })
+        session.apiclient = KlippyRest(*args)
+        session.ws = ws
+        session.ready = False
+        return session.printer, session.apiclient, session.ws
+
+    def _close(self, session):
+        ws, session.ws = session.ws, None
+        session.ready = False
+        if ws is not None:
+            ws.close()
+
+    def activate(self, name):
+        """Makes 'name' the active printer, returns its session"""
+        session = self.sessions.get(name)
+        if session is None:
+            session = next(reversed(self.sessions.values()))
+        if session is not self.active:
+            self.deactivate()
+        self.active = session
+        self.sessions.move_to_end(session.name)
+        session.ready = session.ready and session.connected
+        return session
+
+    def deactivate(self):
+        """The active printer goes to the background, keeping its connection"""
+        session = self.active
+        if session is None:
+            return
+        self.active = None
+        session.ready = self._screen.initialized and session.connected
+        session.files = self._screen.files.save_index() if session.ready else None
+        self._screen.connected_printer = None
+        logging.info(f"Keeping {session.name} in the background")
+
+    def _state_execute(self, session, state, callback):
+        if session is not self.active:
+            return False
+        return self._screen.state_execute(state, callback)
+
+    def _maintain(self):
+        warm = list(self.sessions.values())[-self.max_warm:]
+        for session in self.sessions.values():
+            if session is self.active:
+                continue
+            if session not in warm:
+                if session.ws is not None:
+                    self._evict(session)
+            elif not session.connected:
+                logging.debug(f"Connecting to {session.name} in the background")
+                self.open(session)
+                session.ws.initial_connect()
+            elif not session.ready:
+                self._warm_up(session)
+        return True
+
+    def _evict(self, session):
+        logging.info(f"Closing the background connection to {session.name}")
+        self._close(session)
+        printer = session.printer
+        printer.stop_tempstore_updates()
+        printer.data = PrinterState()
+        printer.tempstore = {}
+        printer.state = "disconnected"
+        session.files = None
+        session.server_info = None
+
+    def _on_connect(self, session, ws):
+        if ws is not session.ws:
+            return
+        if session is self.active:
+            self._screen.websocket_connected()
+            return
+        ws.klippy.identify_client(functions.get_software_version(), ws.api_key)
+        self._warm_up(session)
+
+    def _on_message(self, session, ws, action, data):
+        if ws is not session.ws:
+            return
+        if session is self.active:
+            self._screen._websocket_callback(action, data)
+        elif action == "notify_status_update":
+            session.printer.process_update(data)
+        elif action in ("notify_klippy_disconnected", "notify_klippy_shutdown"):
+            session.ready = False
+            session.printer.stop_tempstore_updates()
+            session.printer.process_update({'webhooks': {'state': action[len("notify_klippy_"):]}})
+        elif action == "notify_klippy_ready" and not session.ready:
+            self._warm_up(session)
+        elif action == "notify_power_changed":
+            session.printer.process_power_update(data)
+
+    def _on_close(self, session, ws):
+        if ws is not session.ws:
+            return
+        session.ready = False
+        if session is self.active:
+            self._screen.websocket_disconnected()
+            return
+        # Reconnected by _maintain
+        session.printer.stop_tempstore_updates()
+        session.printer.state = "disconnected"
+
+    def _on_cancel(self, session, ws):
+        if ws is session.ws and session is self.active:
+            self._screen.websocket_connection_cancel()
+
+    def _background(self, session, result, method):
+        """Checks that a response still belongs to a background session"""
+        if session is self.active or not session.connected:
+            return False
+        if "result" not in result:
+            logging.debug(f"{session.name} {method}: {result.get('error', result)}")
+            return False
+        return True
+
+    # The same sequence as KlipperScreen.init_klipper over the websocket, so nothing blocks the screen
+    def _warm_up(self, session):
+        session.ws.send_method("server.info", {}, self._server_info, session)
+
+    def _server_info(self, result, method, params, session):
+        if not self._background(session, result, method):
+            return
+        session.server_info = result["result"]
+        if not session.server_info.get("klippy_connected") or session.server_info.get("klippy_state") != "ready":
+            logging.debug(f"{session.name}: Klipper is {session.server_info.get('klippy_state')}")
+            return
+        components = session.server_info.get("components", [])
+        if "power" in components:
+            session.ws.send_method("machine.device_power.devices", {}, self._power_devices, session)
+        if "webcam" in components:
+            session.ws.send_method("server.webcams.list", {}, self._cameras, session)
+        if "spoolman" in components:
+            session.printer.enable_spoolman()
+        session.ws.send_method("printer.info", {}, self._printer_info, session)
+
+    def _power_devices(self, result, method, params, session):
+        if self._background(session, result, method):
+            session.printer.configure_power_devices(result["result"])
+
+    def _cameras(self, result, method, params, session):
+        if self._background(session, result, method):
+            session.printer.configure_cameras(result["result"]["webcams"])
+
+    def _printer_info(self, result, method, params, session):
+        if self._background(session, result, method):
+            session.ws.send_method(
+                "printer.objects.query", {"objects": {"configfile": None}}, self._configfile, session, result["result"]
+            )
+
+    def _configfile(self, result, method, params, session, printer_info):
+        if not self._background(session, result, method):
+            return
+        session.printer.reinit(printer_info, result["result"]["status"])
+        session.ws.send_method("printer.gcode.help", {}, self._gcode_help, session)
+        session.ws.send_method("machine.system_info", {}, self._system_info, session)
+        session.ws.send_method(
+            "printer.objects.subscribe", self._screen.subscriptions(session.printer), self._subscribed, session
+        )
+
+    def _gcode_help(self, result, method, params, session):
+        if self._background(session, result, method):
+            session.printer.available_commands = result["result"]
+
+    def _system_info(self, result, method, params, session):
+        if self._background(session, result, method) and "system_info" in result["result"]:
+            session.printer.system_info = result["result"]["system_info"]
+
+    def _subscribed(self, result, method, params, session):
+        if not self._background(session, result, method):
+            return
+        session.printer.process_update(result["result"]["status"])
+        session.ready = True
+        logging.info(f"{session.name} ready in the background")
+        if session.printer.get_temp_devices():
+            session.ws.send_method("server.config", {}, self._server_config, session)
+
+    def _server_config(self, result, method, params, session):
+        if not self._background(session, result, method):
+            return
+        try:
+            session.printer.tempstore_size = result["result"]["config"]["data_store"]["temperature_store_size"]
+        except KeyError:
+            logging.error("Couldn't get the temperature store size")
+        session.ws.send_method("server.temperature_store", {}, self._tempstore, session)
+
+    def _tempstore(self, result, method, params, session):
+        if self._background(session, result, method):
+            session.printer.init_temp_store(result["result"])
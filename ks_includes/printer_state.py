@@ -0,0 +1,302 @@
+import abc
+from collections.abc import MutableMapping
+
+_UNSET = object()
+
+# Objects updated on almost every websocket message, and the fields Klipper reports for them
+HOT_OBJECTS = {
+    "extruder": (
+        "temperature", "target", "power", "can_extrude", "pressure_advance", "smooth_time",
+    ),
+    "heater_bed": ("temperature", "target", "power"),
+    "toolhead": (
+        "homed_axes", "axis_minimum", "axis_maximum", "print_time", "stalls", "estimated_print_time",
+        "extruder", "position", "max_velocity", "max_accel", "minimum_cruise_ratio", "max_accel_to_decel",
+        "square_corner_velocity",
+    ),
+    "gcode_move": (
+        "speed_factor", "speed", "extrude_factor", "absolute_coordinates", "absolute_extrude",
+        "homing_origin", "position", "gcode_position",
+    ),
+    "motion_report": ("live_position", "live_velocity", "live_extruder_velocity", "steppers", "trapq"),
+    "print_stats": ("filename", "total_duration", "print_duration", "filament_used", "state", "message", "info"),
+    "virtual_sdcard": ("file_path", "progress", "is_active", "file_position", "file_size"),
+}
+
+
+class StateRecord(MutableMapping, abc.ABC):
+    """
+    Status of one Klipper object, read like the dict Moonraker sends
+
+    Every field keeps the version of the store when it last changed,
+    so readers can check what changed since the version they last saw.
+    """
+    __slots__ = ("_store",)
+
+    def __init__(self, store):
+        self._store = store
+
+    @abc.abstractmethod
+    def changed_since(self, version):
+        """Returns the fields that changed after 'version'"""
+
+    @abc.abstractmethod
+    def version_of(self, field):
+        pass
+
+    @abc.abstractmethod
+    def _set(self, field, value):
+        """Sets a field, returns True if its value changed"""
+
+    def update(self, data=(), **kwargs):
+        """Update from a status delta, returns the fields whose value changed"""
+        changed = []
+        for field, value in (data.items() if hasattr(data, "items") else data):
+            if self._set(field, value):
+                changed.append(field)
+        for field, value in kwargs.items():
+            if self._set(field, value):
+                changed.append(field)
+        return changed
+
+    def __setitem__(self, field, value):
+        self._set(field, value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())})"
+
+
+class SlotsRecord(StateRecord):
+    """Record of a hot object, known fields live in slots, unknown ones in 'extra'"""
+    __slots__ = ("_versions", "_extra", "_extra_versions")
+    fields = ()
+    index = {}
+
+    def __init__(self, store):
+        super().__init__(store)
+        for field in self.fields:
+            object.__setattr__(self, field, _UNSET)
+        self._versions = [0] * len(self.fields)
+        self._extra = None
+        self._extra_versions = None
+
+    def _set(self, field, value):
+        i = self.index.get(field)
+        if i is None:
+            if self._extra is None:
+                self._extra = {}
+                self._extra_versions = {}
+            if self._extra.get(field, _UNSET) == value:
+                return False
+            self._extra[field] = value
+            self._extra_versions[field] = self._store.bump()
+            return True
+        if getattr(self, field) == value:
+            return False
+        object.__setattr__(self, field, value)
+        self._versions[i] = self._store.bump()
+        return True
+
+    def __getitem__(self, field):
+        if field in self.index:
+            value = getattr(self, field)
+        elif self._extra is not None:
+            value = self._extra.get(field, _UNSET)
+        else:
+            value = _UNSET
+        if value is _UNSET:
+            raise KeyError(field)
+        return value
+
+    def get(self, field, default=None):
+        if field in self.index:
+            value = getattr(self, field)
+        elif self._extra is not None:
+            value = self._extra.get(field, _UNSET)
+        else:
+            return default
+        return default if value is _UNSET else value
+
+    def __contains__(self, field):
+        if field in self.index:
+            return getattr(self, field) is not _UNSET
+        return self._extra is not None and field in self._extra
+
+    def __delitem__(self, field):
+        if field not in self:
+            raise KeyError(field)
+        if field in self.index:
+            object.__setattr__(self, field, _UNSET)
+            self._versions[self.index[field]] = self._store.bump()
+        else:
+            del self._extra[field]
+            self._extra_versions[field] = self._store.bump()
+
+    def __iter__(self):
+        for field in self.fields:
+            if getattr(self, field) is not _UNSET:
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for field in self)
+
+    def version_of(self, field):
+        if field in self.index:
+            return self._versions[self.index[field]]
+        return self._extra_versions.get(field, 0) if self._extra_versions else 0
+
+    def changed_since(self, version):
+        changed = {field for field, v in zip(self.fields, self._versions) if v > version}
+        if self._extra_versions:
+            changed.update(field for field, v in self._extra_versions.items() if v > version)
+        return changed
+
+    @property
+    def version(self):
+        latest = max(self._versions, default=0)
+        if self._extra_versions:
+            latest = max(latest, *self._extra_versions.values())
+        return latest
+
+
+class GenericRecord(StateRecord):
+    """Record of any other object, fields are kept in a dict"""
+    __slots__ = ("_values", "_versions")
+
+    def __init__(self, store):
+        super().__init__(store)
+        self._values = {}
+        self._versions = {}
+
+    def _set(self, field, value):
+        if self._values.get(field, _UNSET) == value:
+            return False
+        self._values[field] = value
+        self._versions[field] = self._store.bump()
+        return True
+
+    def __getitem__(self, field):
+        return self._values[field]
+
+    def get(self, field, default=None):
+        return self._values.get(field, default)
+
+    def __contains__(self, field):
+        return field in self._values
+
+    def __delitem__(self, field):
+        del self._values[field]
+        self._versions[field] = self._store.bump()
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def version_of(self, field):
+        return self._versions.get(field, 0)
+
+    def changed_since(self, version):
+        return {field for field, v in self._versions.items() if v > version}
+
+    @property
+    def version(self):
+        return max(self._versions.values(), default=0)
+
+
+def _slots_record(name, fields):
+    return type(name, (SlotsRecord,), {
+        "__slots__": fields,
+        "fields": fields,
+        "index": {field: i for i, field in enumerate(fields)},
+    })
+
+
+RECORD_TYPES = {
+    obj: _slots_record(f"{''.join(part.title() for part in obj.split('_'))}Record", fields)
+    for obj, fields in HOT_OBJECTS.items()
+}
+
+
+def record_type(name):
+    if name.startswith("extruder") and not name.startswith("extruder_stepper"):
+        return RECORD_TYPES["extruder"]
+    return RECORD_TYPES.get(name, GenericRecord)
+
+
+class PrinterState(MutableMapping):
+    """
+    Status of all the Klipper objects, {object name: record}
+
+    'version' increases on every field change, a consumer keeps the version it last rendered
+    and asks changed_since(version) or record.changed_since(version) on the next frame.
+    """
+
+    def __init__(self, data=None):
+        self.records = {}
+        self.version = 0
+        if data:
+            self.update(data)
+
+    def bump(self):
+        self.version += 1
+        return self.version
+
+    def record(self, name):
+        record = self.records.get(name)
+        if record is None:
+            record = self.records[name] = record_type(name)(self)
+        return record
+
+    def update(self, data=(), **kwargs):
+        """Apply a status delta, returns {object name: [changed fields]}"""
+        changed = {}
+        for name, values in (data.items() if hasattr(data, "items") else data):
+            record = self.record(name)
+            if fields := record.update(values):
+                changed[name] = fields
+        for name, values in kwargs.items():
+            if fields := self.record(name).update(values):
+                changed[name] = fields
+        return changed
+
+    def get_value(self, name, field, default=None):
+        record = self.records.get(name)
+        return default if record is None else record.get(field, default)
+
+    def changed_since(self, version):
+        """Returns {object name: {fields}} of everything that changed after 'version'"""
+        if version >= self.version:
+            return {}
+        changed = {}
+        for name, record in self.records.items():
+            if record.version > version:
+                changed[name] = record.changed_since(version)
+        return changed
+
+    def __getitem__(self, name):
+        return self.records[name]
+
+    def __setitem__(self, name, values):
+        record = self.records.get(name)
+        if record is None or values is not record:
+            record = self.records[name] = record_type(name)(self)
+            record.update(values)
+
+    def __delitem__(self, name):
+        del self.records[name]
+
+    def __contains__(self, name):
+        return name in self.records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, name, default=None):
+        return self.records.get(name, default)
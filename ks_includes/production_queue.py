@@ -0,0 +1,301 @@
+import copy
+import json
+import logging
+import os
+from collections import deque
+from datetime import date
+from time import monotonic
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+from ks_includes.KlippyGcodes import KlippyGcodes
+from ks_includes.gcode_analyzer import product_icon
+
+IDLE_KEPT = 200
+DEFAULT_RATE = 100
+# Extrusion rate key of each tool in extrusion_rates.json
+RATE_KEYS = (("extruder", "orange"), ("extruder1", "white"))
+
+
+class Recipe:
+    """A gcode file planned for a number of cycles"""
+    __slots__ = ("filename", "cycles", "done")
+
+    def __init__(self, filename, cycles, done=0):
+        self.filename = filename
+        self.cycles = max(1, int(cycles))
+        self.done = max(0, int(done))
+
+    @property
+    def finished(self):
+        return self.done >= self.cycles
+
+    def as_dict(self):
+        return {"filename": self.filename, "cycles": self.cycles, "done": self.done}
+
+
+class PreparedJob:
+    """Everything the changeover to a file needs, resolved ahead of time"""
+    __slots__ = ("filename", "product", "metadata", "rates", "targets")
+
+    def __init__(self, filename, product, metadata, rates, targets):
+        self.filename = filename
+        self.product = product
+        self.metadata = metadata
+        self.rates = rates
+        self.targets = targets
+
+
+class ProductionQueue:
+    """
+    Planned production: a list of recipes, each a gcode file with a number of cycles
+
+    During the last part of a cycle the next job is prepared: metadata requested, product icon loaded,
+    saved extrusion rates and target temperatures resolved. The changeover is then a single gcode script
+    that sets the rates, preheats and starts the file. The idle time between cycles is tracked.
+    Without a plan the finished file is repeated, like restarting it by hand.
+    """
+
+    def __init__(self, screen, config_dir, prefetch_at=0.85):
+        self._screen = screen
+        self.queue_file = os.path.join(config_dir, "production_queue.json")
+        self.rates_file = os.path.join(config_dir, "extrusion_rates.json")
+        self.prefetch_at = prefetch_at
+        self.recipes = []
+        self.prepared = None
+        self.state = None
+        self.idle_since = None
+        self.idle_times = deque(maxlen=IDLE_KEPT)
+        self.idle_day = date.today()
+        self.idle_today = 0.0
+        self.icons = {}
+        self._rates = {}
+        self._rates_mtime = None
+        self._save_timeout = None
+        self.load()
+
+    def reset(self):
+        self.prepared = None
+        self.state = None
+        self.idle_since = None
+
+    # Plan
+
+    def load(self):
+        self.recipes.clear()
+        try:
+            with open(self.queue_file, 'r', encoding='utf-8') as f:
+                data = json.load(f) or []
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.error(f"Unable to load the production queue: {e}")
+            return
+        for entry in data:
+            try:
+                self.recipes.append(Recipe(entry["filename"], entry.get("cycles", 1), entry.get("done", 0)))
+            except (KeyError, TypeError, ValueError):
+                logging.warning(f"Invalid production queue entry: {entry}")
+
+    def save(self):
+        """Persists the plan shortly after, so a changeover never waits for the disk"""
+        if self._save_timeout is None:
+            self._save_timeout = GLib.timeout_add_seconds(2, self._save_timeout_cb)
+
+    def _save_timeout_cb(self):
+        self._save_timeout = None
+        try:
+            os.makedirs(os.path.dirname(self.queue_file), exist_ok=True)
+            with open(self.queue_file, 'w', encoding='utf-8') as f:
+                json.dump([recipe.as_dict() for recipe in self.recipes], f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            logging.error(f"Unable to save the production queue: {e}")
+        return False
+
+    def add(self, filename, cycles=1):
+        self.recipes.append(Recipe(filename, cycles))
+        self.prepared = None
+        self.save()
+
+    def remove(self, index):
+        del self.recipes[index]
+        self.prepared = None
+        self.save()
+
+    def set_cycles(self, index, cycles):
+        recipe = self.recipes[index]
+        recipe.cycles = max(1, int(cycles), recipe.done)
+        self.prepared = None
+        self.save()
+
+    def clear(self):
+        self.recipes.clear()
+        self.prepared = None
+        self.save()
+
+    def current(self):
+        return next((recipe for recipe in self.recipes if not recipe.finished), None)
+
+    def remaining(self):
+        return sum(recipe.cycles - recipe.done for recipe in self.recipes if not recipe.finished)
+
+    def next_filename(self, filename):
+        """The file that follows a cycle of 'filename', None when the plan is complete"""
+        if not self.recipes:
+            return filename
+        recipe = self.current()
+        if recipe is None:
+            return None
+        if recipe.filename == filename and recipe.done + 1 >= recipe.cycles:
+            following = self.recipes.index(recipe) + 1
+            recipe = next((r for r in self.recipes[following:] if not r.finished), None)
+        return recipe.filename if recipe else None
+
+    def cycle_done(self, filename):
+        recipe = self.current()
+        if recipe is not None and recipe.filename == filename:
+            recipe.done += 1
+            self.save()
+
+    # Preparation
+
+    def saved_rates(self):
+        """Contents of extrusion_rates.json, read again only when the file changes"""
+        try:
+            mtime = os.stat(self.rates_file).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._rates_mtime:
+            self._rates_mtime = mtime
+            self._rates = {}
+            if mtime is not None:
+                try:
+                    with open(self.rates_file, 'r', encoding='utf-8') as f:
+                        self._rates = json.load(f) or {}
+                except (OSError, ValueError):
+                    logging.debug("Failed to read extrusion rates file; proceeding with empty data")
+        return copy.deepcopy(self._rates)
+
+    def rates_for(self, product, overrides=None):
+        """Per product saved rates, falling back to the global ones, with the session 'overrides' on top"""
+        data = self.saved_rates()
+        saved = data.get(product) if isinstance(data.get(product), dict) else {}
+        rates = {key: saved.get(key, data.get(key, DEFAULT_RATE)) for tool, key in RATE_KEYS}
+        if overrides and product in overrides:
+            rates.update(overrides[product])
+        return rates
+
+    def icon(self, name, size):
+        """Product icons are loaded once per theme and size"""
+        gtk = self._screen.gtk
+        key = (gtk.themedir, name, int(size))
+        if key not in self.icons:
+            self.icons[key] = gtk.PixbufFromIcon(name, size)
+        return self.icons[key]
+
+    def prepare(self, filename):
+        files = self._screen.files
+        product = files.get_product(filename)
+        if not files.file_metadata_exists(filename):
+            # The listing has no slicer metadata, the targets are resolved again at the changeover
+            files.request_metadata(filename)
+        metadata = files.files.get(filename, {})
+        self.icon(product_icon(product), self._screen.gtk.font_size * 12)
+        return PreparedJob(filename, product, metadata, self.rates_for(product), self._targets(filename, metadata))
+
+    def _targets(self, filename, metadata):
+        targets = {}
+        printer = self._screen.printer
+        if metadata.get("first_layer_extr_temp"):
+            analysis = self._screen.files.get_analysis(filename) or {}
+            used = [int(tool[1:]) for tool in analysis.get("extrusion", {})] or [0]
+            tools = [tool for tool in printer.get_tools() if not tool.startswith("extruder_stepper")]
+            for number in used:
+                if number < len(tools):
+                    targets[tools[number]] = metadata["first_layer_extr_temp"]
+        if metadata.get("first_layer_bed_temp") and printer.config_section_exists("heater_bed"):
+            targets["heater_bed"] = metadata["first_layer_bed_temp"]
+        return targets
+
+    def process_update(self, data, printer):
+        if 'print_stats' in data and 'state' in data['print_stats']:
+            self._state_changed(data['print_stats']['state'])
+        if (
+            self.state == "printing"
+            and self.prepared is None
+            and 'virtual_sdcard' in data
+            and (data['virtual_sdcard'].get('progress') or 0) >= self.prefetch_at
+        ):
+            filename = self.next_filename(printer.get_stat("print_stats", "filename"))
+            if filename:
+                logging.info(f"Preparing the next cycle: {filename}")
+                self.prepared = self.prepare(filename)
+
+    def _state_changed(self, state):
+        now = monotonic()
+        if state == "printing" and self.idle_since is not None:
+            self._add_idle(now - self.idle_since)
+            self.idle_since = None
+        elif state not in ("printing", "paused") and self.state in ("printing", "paused"):
+            self.idle_since = now
+        self.state = state
+
+    def _add_idle(self, seconds):
+        today = date.today()
+        if today != self.idle_day:
+            self.idle_day = today
+            self.idle_today = 0.0
+        self.idle_times.append(seconds)
+        self.idle_today += seconds
+        logging.info(f"Idle between cycles: {seconds:.1f}s, today {self.idle_today / 60:.1f} min")
+
+    def idle_stats(self):
+        """Returns (last, mean, today) idle seconds between cycles"""
+        if not self.idle_times:
+            return None
+        return self.idle_times[-1], sum(self.idle_times) / len(self.idle_times), self.idle_today
+
+    # Changeover
+
+    def changeover(self, filename, overrides=None, reset=False):
+        """Counts a cycle of 'filename' and starts the next job in one script, returns it or None"""
+        following = self.next_filename(filename)
+        self.cycle_done(filename)
+        if following is None:
+            logging.info("Production queue complete")
+            self.prepared = None
+            return None
+        job = self.prepared
+        if job is None or job.filename != following:
+            job = self.prepare(following)
+        elif not job.targets and self._screen.files.file_metadata_exists(job.filename):
+            # The metadata requested while preparing has arrived since
+            job.metadata = self._screen.files.get_file_info(job.filename)
+            job.targets = self._targets(job.filename, job.metadata)
+        self.prepared = None
+        if overrides and job.product in overrides:
+            job.rates.update(overrides[job.product])
+
+        tools = self._screen.printer.get_tools()
+        script = ["SDCARD_RESET_FILE"] if reset else []
+        for tool, key in RATE_KEYS:
+            if tool in tools:
+                script.append(f"ACTIVATE_EXTRUDER EXTRUDER={tool}")
+                script.append(f"M221 S{job.rates[key]}")
+        for heater, target in job.targets.items():
+            if heater == "heater_bed":
+                script.append(KlippyGcodes.set_bed_temp(target))
+            else:
+                script.append(KlippyGcodes.set_ext_temp(target, tools.index(heater)))
+        script.append(f'SDCARD_PRINT_FILE FILENAME="{job.filename}"')
+        logging.info(f"Changeover to {job.filename} rates {job.rates} targets {job.targets}")
+        self._screen._ws.klippy.gcode_script("\n".join(script))
+        GLib.idle_add(self._record_cycle_start, priority=GLib.PRIORITY_LOW)
+        return job
+
+    def _record_cycle_start(self):
+        self._screen.analytics.record_cycle_start()
+        return False
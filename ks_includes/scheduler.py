@@ -0,0 +1,131 @@
+import logging
+from math import floor
+from time import monotonic, perf_counter
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+from ks_includes.main_loop_profiler import Histogram
+
+# Tasks due within this of the wakeup run in it
+SLACK = .05
+
+
+class Task:
+    __slots__ = ("name", "interval", "callback", "args", "owner", "map_handler", "due", "histogram")
+
+    def __init__(self, name, interval, callback, args, owner, histogram):
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.owner = owner
+        self.map_handler = None
+        self.due = 0.0
+        self.histogram = histogram
+
+    def runnable(self):
+        return self.owner is None or self.owner.get_mapped()
+
+    def align(self, now):
+        # Due on multiples of the interval, so tasks with related intervals share their wakeups,
+        # a wakeup up to SLACK early counts as the due one
+        self.due = (floor((now + SLACK) / self.interval) + 1) * self.interval
+
+
+class Scheduler:
+    """
+    Runs the periodic tasks of the screen and the panels from a single GLib timeout
+
+    Tasks are named, adding a task with the name of another replaces it. Like a GLib timeout the callback
+    keeps running every 'interval' seconds while it returns True. A task with an owner widget is paused
+    while the owner is not mapped: when its panel is not shown, or the screensaver is up, and resumes once
+    it's mapped again. The timeout sleeps until the next runnable task is due, and due times are aligned to
+    the intervals so tasks of 1, 2 and 5 seconds wake up the main loop together.
+    Runs and durations are kept by task name, also after the task is removed.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+        self.stats = {}
+        self.timeout = None
+        self.wakeup = None
+        self.wakeups = 0
+
+    def add(self, name, interval, callback, *args, owner=None):
+        self.remove(name)
+        task = Task(name, interval, callback, args, owner, self.stats.setdefault(name, Histogram()))
+        task.align(monotonic())
+        if owner is not None:
+            task.map_handler = owner.connect("map", self._owner_mapped)
+        self.tasks[name] = task
+        self._arm()
+        return name
+
+    def remove(self, name):
+        task = self.tasks.pop(name, None)
+        if task is None:
+            return
+        if task.map_handler is not None:
+            task.owner.disconnect(task.map_handler)
+        if not self.tasks:
+            self._disarm()
+
+    def __contains__(self, name):
+        return name in self.tasks
+
+    def owner_of(self, name):
+        task = self.tasks.get(name)
+        return task.owner if task is not None else None
+
+    def _owner_mapped(self, widget):
+        self._arm()
+
+    def _disarm(self):
+        if self.timeout is not None:
+            GLib.source_remove(self.timeout)
+            self.timeout = None
+            self.wakeup = None
+
+    def _arm(self):
+        now = monotonic()
+        due = [task.due for task in self.tasks.values() if task.runnable()]
+        if not due:
+            self._disarm()
+            return
+        wakeup = max(min(due), now)
+        if self.wakeup is not None and self.wakeup <= wakeup + SLACK:
+            return
+        self._disarm()
+        self.wakeup = wakeup
+        self.timeout = GLib.timeout_add(max(int((wakeup - now) * 1000), 0), self._tick)
+
+    def _tick(self):
+        self.timeout = self.wakeup = None
+        self.wakeups += 1
+        now = monotonic()
+        for task in list(self.tasks.values()):
+            if task.due > now + SLACK or self.tasks.get(task.name) is not task:
+                continue
+            task.align(now)
+            if not task.runnable():
+                continue
+            start = perf_counter()
+            try:
+                keep = task.callback(*task.args)
+            except Exception as e:
+                logging.exception(f"Task {task.name} failed: {e}")
+                keep = False
+            task.histogram.add((perf_counter() - start) * 1000)
+            if not keep and self.tasks.get(task.name) is task:
+                self.remove(task.name)
+        self._arm()
+        return False
+
+    def log_summary(self):
+        lines = [f"Scheduler: {len(self.tasks)} tasks, {self.wakeups} wakeups"]
+        for name, histogram in sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True):
+            lines.append(f"  {name}: {histogram.count} runs, mean {histogram.mean:.1f} ms, max {histogram.max:.0f} ms")
+        logging.info("\n".join(lines))
@@ -1,41 +1,23 @@
 import datetime
 import logging
+from bisect import bisect
 
 import gi
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Pango
-from ks_includes.KlippyGtk import find_widget
+from ks_includes.label_bindings import LabelBindings
 
 
 class ScreenPanel:
-    def record_print_start_time(self):
-        import os, json
-        from datetime import datetime
-        print_times_file = os.path.join(os.path.dirname(__file__), '..', 'config', 'print_times.json')
-        today = datetime.now().strftime("%Y-%m-%d")
-        now_time = datetime.now().strftime("%H:%M")
-        try:
-            if os.path.exists(print_times_file) and os.path.getsize(print_times_file) > 0:
-                with open(print_times_file, 'r', encoding='utf-8') as f:
-                    times_data = json.load(f)
-            else:
-                times_data = {}
-            if today not in times_data:
-                times_data[today] = {"first": now_time, "last": now_time}
-            else:
-                times_data[today]["last"] = now_time
-            with open(print_times_file, 'w', encoding='utf-8') as f:
-                json.dump(times_data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            import logging
-            logging.error(f"Error while saving print times: {e}")
     _screen = None
     _config = None
     _files = None
     _printer = None
     _gtk = None
     ks_printer_cfg = None
+    # The panel is kept when the language changes if all its text is translated again by retranslate
+    retranslatable = False
 
     def __init__(self, screen, title, **kwargs):
         self.menu = []
@@ -49,6 +31,10 @@ class ScreenPanel:
         self.title = title
         self.devices = {}
         self.active_heaters = []
+        self.label_bindings = LabelBindings()
+        self.option_order = {}
+        self.menu_builders = {}
+        self.translatables = []
         self.content = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, hexpand=True, vexpand=True)
         self.content.get_style_context().add_class("content")
         self._show_heater_power = self._config.get_main_config().getboolean('show_heater_power', False)
@@ -56,6 +42,22 @@ class ScreenPanel:
 
         self.update_dialog = None
 
+    def translatable(self, widget, msgid, setter=None):
+        """Shows the translation of msgid in the widget, and the new translation when the language changes"""
+        setter = setter or type(widget).set_label
+        self.translatables.append((widget, msgid, setter))
+        setter(widget, _(msgid))
+        return widget
+
+    def retranslate(self):
+        """Called when the language changes, returns False if the panel has to be rebuilt"""
+        for widget, msgid, setter in self.translatables:
+            setter(widget, _(msgid))
+        return self.retranslatable
+
+    def record_print_start_time(self):
+        self._screen.analytics.record_cycle_start()
+
     def _autoscroll(self, scroll, *args):
         adj = scroll.get_vadjustment()
         adj.set_value(adj.get_upper() - adj.get_page_size())
@@ -91,6 +93,8 @@ class ScreenPanel:
 
     def load_menu(self, widget, name, title=None):
         logging.info(f"loading menu {name}")
+        if f"{name}_menu" not in self.labels and name in self.menu_builders:
+            self.menu_builders.pop(name)()
         if f"{name}_menu" not in self.labels:
             logging.error(f"{name} not in labels")
             return
@@ -211,26 +215,87 @@ class ScreenPanel:
         return name
 
     def update_temp(self, dev, temp, target, power, lines=1, digits=1):
-        new_label_text = f"{temp or 0:.{digits}f}"
-        if self._printer.device_has_target(dev) and target:
-            new_label_text += f"/{target:.0f}"
-        if dev not in self.devices:
-            new_label_text += "°"
-
-        show_power = self._show_heater_power and power
-        if show_power:
-            new_label_text += f" {power * 100:3.0f}%"
-
         if dev in self.labels:
             # Job_Status
-            find_widget(self.labels[dev], Gtk.Label).set_text(new_label_text)
+            widget = self.labels[dev]
         elif dev in self.devices:
             # Temperature and Main_Menu
-            find_widget(self.devices[dev]["temp"], Gtk.Label).set_text(new_label_text)
+            widget = self.devices[dev]["temp"]
+        else:
+            return
+        value = (
+            round(temp or 0, digits),
+            digits,
+            round(target) if target and self._printer.device_has_target(dev) else None,
+            round(power * 100) if self._show_heater_power and power else None,
+            dev not in self.devices,
+        )
+        self.label_bindings.update(dev, widget, value, self.format_temp)
+
+    @staticmethod
+    def format_temp(value):
+        temp, digits, target, power, degrees = value
+        text = f"{temp:.{digits}f}"
+        if target is not None:
+            text += f"/{target}"
+        if degrees:
+            text += "°"
+        if power is not None:
+            text += f" {power:3d}%"
+        return text
 
     def add_option(self, boxname, opt_array, opt_name, option):
         if option['type'] is None:
             return
+        row_box, setting = self.option_row(opt_name, option)
+        opt_array[opt_name] = {
+            "name": option['name'],
+            "row": row_box
+        }
+        self._attach_option(boxname, (option['name'].casefold(), opt_name), row_box)
+        self.labels[boxname].show_all()
+        return setting
+
+    def add_options(self, boxname, opt_array, options):
+        """
+        Adds many settings at once, options is an iterable of (opt_name, option)
+
+        The rows are sorted once and attached in one pass, the box is shown once at the end.
+        Returns the widgets of the settings by option name.
+        """
+        settings = {}
+        rows = []
+        for opt_name, option in options:
+            if option['type'] is None:
+                continue
+            row_box, setting = self.option_row(opt_name, option)
+            opt_array[opt_name] = {
+                "name": option['name'],
+                "row": row_box
+            }
+            settings.update(setting)
+            rows.append(((option['name'].casefold(), opt_name), row_box))
+        rows.sort(key=lambda row: row[0])
+        for key, row_box in rows:
+            self._attach_option(boxname, key, row_box)
+        if rows:
+            self.labels[boxname].show_all()
+        return settings
+
+    def _attach_option(self, boxname, key, row_box):
+        order = self.option_order.setdefault(boxname, [])
+        pos = bisect(order, key)
+        order.insert(pos, key)
+        if pos < len(order) - 1:
+            self.labels[boxname].insert_row(pos)
+        self.labels[boxname].attach(row_box, 0, pos, 1, 1)
+
+    def clear_options(self, boxname):
+        self.labels[boxname].remove_column(0)
+        self.option_order.pop(boxname, None)
+
+    def option_row(self, opt_name, option):
+        """Builds the row of a setting, returns it with the widget of the setting by option name"""
         name = Gtk.Label(
             hexpand=True, vexpand=True, halign=Gtk.Align.START, valign=Gtk.Align.CENTER,
             wrap=True, wrap_mode=Pango.WrapMode.WORD_CHAR, xalign=0)
@@ -297,16 +362,4 @@ class ScreenPanel:
             select.set_hexpand(False)
             select.set_halign(Gtk.Align.END)
             row_box.add(select)
-
-        opt_array[opt_name] = {
-            "name": option['name'],
-            "row": row_box
-        }
-
-        opts = sorted(list(opt_array), key=lambda x: opt_array[x]['name'].casefold())
-        pos = opts.index(opt_name)
-
-        self.labels[boxname].insert_row(pos)
-        self.labels[boxname].attach(opt_array[opt_name]['row'], 0, pos, 1, 1)
-        self.labels[boxname].show_all()
-        return setting
+        return row_box, setting
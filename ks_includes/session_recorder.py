@@ -0,0 +1,91 @@
+import gzip
+import json
+import logging
+import os
+import threading
+from time import monotonic, time
+
+CAPTURE_VERSION = 1
+# Uncompressed size after which the capture is rotated, the previous part is kept as <file>.1
+ROTATE_BYTES = 256 * 1024 * 1024
+FLUSH_INTERVAL = 1
+
+
+class SessionRecorder:
+    """
+    Records the Moonraker traffic to a gzip compressed json lines file, to be replayed by scripts/replay_session.py
+
+    The first line is a header, then one line per event: [seconds, kind, url, data]
+    kind is "open" or "close" for the websocket, "out" for a sent request, "in" for a received message
+    and "rest" for a {"path", "response"} http request. The file is flushed every second so a capture
+    survives the process being killed. When rotating, the last REST responses are written again at
+    the start of the new part, so each part can be replayed alone.
+    """
+
+    def __init__(self, path, rotate_bytes=ROTATE_BYTES):
+        self.path = os.path.normpath(os.path.expanduser(path))
+        self.rotate_bytes = rotate_bytes
+        self.lock = threading.Lock()
+        self.rest = {}
+        self.file = None
+        self.size = 0
+        self.start = monotonic()
+        self.last_flush = self.start
+        self._open()
+        logging.info(f"Recording the Moonraker traffic to {self.path}")
+
+    def _open(self):
+        self.file = gzip.open(self.path, "wt", encoding="utf-8")
+        self.size = 0
+        self._write({"version": CAPTURE_VERSION, "started": time()})
+        for (url, path), response in self.rest.items():
+            self._write([0, "rest", url, {"path": path, "response": response}])
+
+    def _write(self, event):
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+        self.file.write(line)
+        self.size += len(line)
+
+    def record(self, kind, url, data=None):
+        with self.lock:
+            if self.file is None:
+                return
+            now = monotonic()
+            try:
+                self._write([round(now - self.start, 4), kind, url, data])
+                if self.size > self.rotate_bytes:
+                    self.file.close()
+                    os.replace(self.path, f"{self.path}.1")
+                    self._open()
+                elif now - self.last_flush > FLUSH_INTERVAL:
+                    self.file.flush()
+                    self.last_flush = now
+            except (OSError, TypeError, ValueError) as e:
+                logging.error(f"Stopping the capture: {e}")
+                self.file = None
+
+    def record_rest(self, url, path, response):
+        self.rest[(url, path)] = response
+        self.record("rest", url, {"path": path, "response": response})
+
+    def close(self, *args):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_capture(path):
+    """Yields the events of a capture, a truncated file ends at the last complete line"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+            if not isinstance(header, dict) or header.get("version") != CAPTURE_VERSION:
+                raise ValueError(f"Unsupported capture: {path}")
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+        except EOFError:
+            logging.warning(f"{path} is truncated")
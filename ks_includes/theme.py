@@ -0,0 +1,141 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import traceback
+from collections import OrderedDict
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gdk, GLib, Gtk
+
+PROVIDERS_KEPT = 3
+
+
+class ThemeManager:
+    """
+    Loads the base and theme styles and applies them to the screen
+
+    The css of a theme expanded for the font size is cached on disk, keyed by the theme, the font size
+    and the modification times of the sources, so it is only rebuilt when something changed.
+    Parsed providers of the last used themes are kept so switching back does not parse again.
+
+    Themes redefine the named colors (@define-color) used by base.css and GTK scopes those names
+    to a provider, so base and theme css share the theme provider.
+    The graph colors only depend on the color set and go to their own small provider.
+    """
+
+    def __init__(self, screen, styles_dir):
+        self._screen = screen
+        self.styles_dir = styles_dir
+        self.cache_dir = os.path.join(GLib.get_user_cache_dir(), "KlipperScreen", "css")
+        with open(os.path.join(styles_dir, "base.conf")) as f:
+            self.base_options = json.load(f)
+        self.style_options = copy.deepcopy(self.base_options)
+        self.providers = OrderedDict()
+        self.theme_provider = None
+        self.colors_provider = None
+        self.colors = None
+
+    def _sources(self, theme):
+        theme_dir = os.path.join(self.styles_dir, theme)
+        return (
+            os.path.join(self.styles_dir, "base.css"),
+            os.path.join(theme_dir, "style.css"),
+            os.path.join(theme_dir, "style.conf"),
+        )
+
+    def _key(self, theme, font_size):
+        key = hashlib.sha1(f"{theme}:{font_size}".encode())
+        for path in self._sources(theme):
+            try:
+                key.update(str(os.stat(path).st_mtime_ns).encode())
+            except OSError:
+                key.update(b"-")
+        return key.hexdigest()[:16]
+
+    def load_theme_options(self, theme):
+        theme_conf_path = self._sources(theme)[2]
+        if not os.path.exists(theme_conf_path):
+            return {}
+        try:
+            with open(theme_conf_path) as f:
+                return json.load(f)
+        except Exception as e:
+            logging.error(
+                f"Unable to parse custom template conf file:\n"
+                f"{e}\n\n"
+                f"{traceback.format_exc()}"
+            )
+        return {}
+
+    def expanded_css(self, theme, font_size):
+        key = self._key(theme, font_size)
+        cache_file = os.path.join(self.cache_dir, f"{theme}-{key}.css")
+        try:
+            return pathlib.Path(cache_file).read_text(), key
+        except OSError:
+            pass
+        base_css_path, theme_css_path = self._sources(theme)[:2]
+        css = pathlib.Path(base_css_path).read_text().replace("KS_FONT_SIZE", f"{font_size}")
+        if os.path.exists(theme_css_path):
+            css += "\n" + pathlib.Path(theme_css_path).read_text()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for old in os.listdir(self.cache_dir):
+                if old.startswith(f"{theme}-"):
+                    os.remove(os.path.join(self.cache_dir, old))
+            pathlib.Path(cache_file).write_text(css)
+        except OSError as e:
+            logging.debug(f"Unable to cache css: {e}")
+        return css, key
+
+    @staticmethod
+    def graph_colors_css(graph_colors):
+        rules = []
+        for category, category_data in graph_colors.items():
+            for i, color in enumerate(category_data['colors'], start=0):
+                if category == "extruder":
+                    class_name = f".graph_label_{category}{i}" if i > 0 else f".graph_label_{category}"
+                elif category == "bed":
+                    class_name = f".graph_label_heater_{category}"
+                else:
+                    class_name = f".graph_label_{category}_{i + 1}"
+                rules.append(f"{class_name} {{ border-left-color: #{color} }}")
+        return "\n".join(rules)
+
+    def _swap(self, old, new, priority):
+        screen = Gdk.Screen.get_default()
+        if old is new:
+            return
+        if old is not None:
+            Gtk.StyleContext.remove_provider_for_screen(screen, old)
+        Gtk.StyleContext.add_provider_for_screen(screen, new, priority)
+
+    def apply(self, theme, font_size):
+        options = copy.deepcopy(self.base_options)
+        options.update(self.load_theme_options(theme))
+        self.style_options = options
+
+        css, key = self.expanded_css(theme, font_size)
+        provider = self.providers.pop(key, None)
+        if provider is None:
+            provider = Gtk.CssProvider()
+            provider.load_from_data(css.encode())
+        self.providers[key] = provider
+        while len(self.providers) > PROVIDERS_KEPT:
+            self.providers.popitem(last=False)
+        self._swap(self.theme_provider, provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION)
+        self.theme_provider = provider
+
+        colors = {category: list(data['colors']) for category, data in options['graph_colors'].items()}
+        if colors != self.colors:
+            colors_provider = Gtk.CssProvider()
+            colors_provider.load_from_data(self.graph_colors_css(options['graph_colors']).encode())
+            self._swap(self.colors_provider, colors_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION + 1)
+            self.colors_provider = colors_provider
+            self.colors = colors
+        return options
@@ -0,0 +1,90 @@
+import logging
+from time import time
+
+CHECK_SECONDS = 60
+
+
+class UpdateStatusService:
+    """
+    Cached machine.update.status of the connected printer, shared by the panels
+
+    Moonraker asks git and the package manager for every status request, so the last result is kept
+    with the time it was received and the updater panel shows it right away. In the background it's requested again
+    once older than 'interval' seconds (0 disables it) while the printer is not printing,
+    and after an update completes.
+    Every new result is published to the panels as notify_update_status.
+    """
+
+    def __init__(self, screen, interval=3600):
+        self._screen = screen
+        self.interval = interval
+        self.pending = False
+        self.state = None
+        self.reset()
+
+    def reset(self):
+        self.stop()
+        self.version_info = None
+        self.error = None
+        self.time = None
+        self.pending = False
+        self.state = None
+
+    def start(self):
+        if self.interval > 0 and "update status" not in self._screen.scheduler:
+            self._screen.scheduler.add("update status", CHECK_SECONDS, self._refresh)
+
+    def stop(self):
+        self._screen.scheduler.remove("update status")
+
+    def age(self):
+        return time() - self.time if self.time is not None else None
+
+    def is_stale(self):
+        return self.time is None or 0 < self.interval < self.age()
+
+    def request(self, refresh=False):
+        """refresh makes Moonraker fetch the remotes first, returns False if a request is already pending"""
+        if self.pending or self._screen._ws is None:
+            return False
+        method = "machine.update.refresh" if refresh else "machine.update.status"
+        logging.info(f"Sending {method}")
+        self.pending = self._screen._ws.send_method(method, callback=self._received)
+        return self.pending
+
+    def _received(self, response, method, params):
+        self.pending = False
+        if not response or "result" not in response:
+            self.error = response.get("error", {}).get("message") if response else None
+            logging.info(f"Update status unavailable: {response}")
+        else:
+            self.error = None
+            self.version_info = response["result"].get("version_info", {})
+            self.time = time()
+        self._publish()
+
+    def _publish(self):
+        self._screen.process_update("notify_update_status", {
+            "version_info": self.version_info, "error": self.error, "time": self.time
+        })
+
+    def _refresh(self):
+        if self.state not in ("printing", "paused") and not self._screen.updating and self.is_stale():
+            self.request()
+        return True
+
+    def process_refreshed(self, data):
+        # notify_update_refreshed carries the same status as machine.update.status
+        if "version_info" in data:
+            self.error = None
+            self.version_info = data["version_info"]
+            self.time = time()
+            self._publish()
+
+    def process_response(self, data):
+        if data.get("complete"):
+            self.request()
+
+    def process_update(self, data):
+        if 'print_stats' in data and 'state' in data['print_stats']:
+            self.state = data['print_stats']['state']
@@ -5,7 +5,7 @@ import math
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gdk, Gtk, GLib
+from gi.repository import Gdk, Gtk
 from cairo import Context as cairoContext
 
 
@@ -19,6 +19,7 @@ class HeaterGraph(Gtk.DrawingArea):
         self._screen = screen
         self.printer = printer
         self.store = {} if store is None else store
+        self.flow = {}
         self.connect('draw', self.draw_graph)
         self.add_events(Gdk.EventMask.TOUCH_MASK)
         self.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
@@ -27,7 +28,7 @@ class HeaterGraph(Gtk.DrawingArea):
         self.font_size = round(font_size * 0.75)
         self.fullscreen = fullscreen
         if fullscreen:
-            GLib.timeout_add_seconds(1, self.update_graph)
+            screen.scheduler.add("fullscreen graph", 1, self.update_graph, owner=self)
         self.fs_graph = None
         self.max_temp = 0
         for section in self.printer.config:
@@ -41,6 +42,7 @@ class HeaterGraph(Gtk.DrawingArea):
 
     def show_fullscreen_graph(self):
         self.fs_graph = HeaterGraph(self._screen, self.printer, self.font_size * 2, fullscreen=True, store=self.store)
+        self.fs_graph.flow = self.flow
         self._gtk.Dialog(_("Temperature"), None, self.fs_graph, self.close_fullscreen_graph)
 
     def close_fullscreen_graph(self, dialog, response_id):
@@ -65,8 +67,22 @@ class HeaterGraph(Gtk.DrawingArea):
             "rgb": rgb
         }})
 
+    def add_flow(self, extruder, rgb=None):
+        """Plot the volumetric flow of the extruder (mm³/s) on the same scale, in a lighter color"""
+        rgb = [0, 0, 0] if rgb is None else rgb
+        self.flow[extruder] = [(c + 1) / 2 for c in rgb]
+
+    def get_flow(self, extruder, data_points=0):
+        if extruder in self.store and not self.store[extruder]['show']:
+            return None
+        return self._screen.flow_telemetry.recent(extruder, data_points)
+
     def get_max_num(self, data_points=0):
         mnum = [0]
+        for extruder in self.flow:
+            flow = self.get_flow(extruder, data_points)
+            if flow and any(v is not None for v in flow):
+                mnum.append(max(v for v in flow if v is not None))
         for device in self.store:
             if self.store[device]['show']:
                 temp = self.printer.get_temp_store(device, "temperatures", data_points)
@@ -115,6 +131,9 @@ class HeaterGraph(Gtk.DrawingArea):
                         ctx, d, gsize, d_height_scale, d_width, self.store[name][dev_type]["rgb"],
                         self.store[name][dev_type]["dashed"], self.store[name][dev_type]["fill"]
                     )
+        for extruder, rgb in self.flow.items():
+            if d := self.get_flow(extruder, data_points):
+                self.graph_data(ctx, d, gsize, d_height_scale, d_width, rgb)
 
     @staticmethod
     def graph_data(ctx: cairoContext, data, gsize, hscale, swidth, rgb, dashed=False, fill=False):
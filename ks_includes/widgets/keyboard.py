@@ -1,4 +1,7 @@
+import logging
 import os
+import subprocess
+from signal import SIGTERM
 
 import gi
 
@@ -9,7 +12,7 @@ from gi.repository import Gtk, GLib
 class Keyboard(Gtk.Box):
     langs = ["de", "en", "fr", "es"]
 
-    def __init__(self, screen, close_cb, entry=None, box=None):
+    def __init__(self, screen, close_cb, entry=None, box=None, purpose=None):
         super().__init__(orientation=Gtk.Orientation.VERTICAL)
         self.shift = []
         self.shift_active = False
@@ -18,7 +21,7 @@ class Keyboard(Gtk.Box):
         self.keyboard.set_direction(Gtk.TextDirection.LTR)
         self.timeout = self.clear_timeout = None
         self.entry = entry
-        self.purpose = self.entry.get_input_purpose()
+        self.purpose = purpose if purpose is not None else self.entry.get_input_purpose()
         self.box = box or None
 
         language = self.detect_language(screen._config.get_main_config().get("language", None))
@@ -148,6 +151,17 @@ class Keyboard(Gtk.Box):
         self.set_pallet(self.pallet_nr)
         self.add(self.keyboard)
 
+    def set_entry(self, entry, close_cb, box=None):
+        """Re-target the keyboard to another entry, starting again from the first pallet"""
+        self.release(None, None)
+        self.entry = entry
+        self.close_cb = close_cb
+        self.box = box
+        if self.shift_active:
+            self.toggle_shift()
+        if self.pallet_nr != 0:
+            self.set_pallet(0)
+
     def detect_language(self, language):
         if language is None or language == "system_lang":
             for language in self.langs:
@@ -205,7 +219,7 @@ class Keyboard(Gtk.Box):
         if self.clear_timeout is not None:
             GLib.source_remove(self.clear_timeout)
             self.clear_timeout = None
-        if widget not in self.shift:
+        if widget is not None and widget not in self.shift:
             widget.get_style_context().remove_class("active")
 
     def clear(self, widget=None):
@@ -262,3 +276,162 @@ class Keyboard(Gtk.Box):
                 widget.get_style_context().add_class("active")
             else:
                 widget.get_style_context().remove_class("active")
+
+
+class KeyboardManager:
+    """
+    Builds one keyboard per layout the first time it is needed and keeps it while hidden
+
+    Showing the keyboard for another entry only re-targets the cached instance,
+    with matchbox a single matchbox-keyboard process is kept embedded for the whole session.
+    """
+
+    def __init__(self, screen):
+        self._screen = screen
+        self.keyboards = {}
+        self.current = None
+        self.matchbox = None
+
+    @property
+    def visible(self):
+        return self.current is not None
+
+    @staticmethod
+    def layout(purpose):
+        if purpose in (Gtk.InputPurpose.DIGITS, Gtk.InputPurpose.NUMBER):
+            return purpose
+        return Gtk.InputPurpose.FREE_FORM
+
+    def _build(self, layout):
+        screen = self._screen
+        kbd_grid = Gtk.Grid()
+        kbd_grid.set_size_request(screen.gtk.content_width, screen.gtk.keyboard_height)
+        kbd_grid.set_vexpand(False)
+        kbd_width = 1
+        if not screen.vertical_mode and layout in (Gtk.InputPurpose.DIGITS, Gtk.InputPurpose.NUMBER):
+            kbd_grid.set_column_homogeneous(True)
+            kbd_width = 2 if layout == Gtk.InputPurpose.DIGITS else 3
+        kbd_grid.attach(Gtk.Box(), 0, 0, 1, 1)
+        kbd = Keyboard(screen, screen.remove_keyboard, purpose=layout)
+        kbd_grid.attach(kbd, 1, 0, kbd_width, 1)
+        kbd_grid.attach(Gtk.Box(), kbd_width + 1, 0, 1, 1)
+        kbd_grid.show_all()
+        kbd_grid.connect("destroy", self._destroyed, layout)
+        logging.debug(f"Keyboard built for {layout}")
+        return {"box": kbd_grid, "keyboard": kbd}
+
+    def _destroyed(self, widget, layout):
+        keyboard = self.keyboards.get(layout)
+        if keyboard is None or keyboard["box"] is not widget:
+            return
+        del self.keyboards[layout]
+        self._detach(keyboard)
+        if self.current is keyboard:
+            self.current = None
+
+    def show(self, entry, box, close_cb):
+        if self._screen._config.get_main_config().getboolean("use-matchbox-keyboard", False):
+            self._show_matchbox()
+            return
+        layout = self.layout(entry.get_input_purpose())
+        if layout not in self.keyboards:
+            self.keyboards[layout] = self._build(layout)
+        keyboard = self.keyboards[layout]
+        if self.current is not None and self.current is not keyboard:
+            self._detach(self.current)
+        keyboard["keyboard"].set_entry(entry, close_cb, box)
+        if keyboard["box"].get_parent() is not box:
+            self._detach(keyboard)
+            box.pack_end(keyboard["box"], False, False, 0)
+            # The host can be dropped without hiding the keyboard, as the lock screen does
+            keyboard["host"] = (box, [
+                box.connect("unmap", self._host_gone, keyboard),
+                box.connect("destroy", self._host_gone, keyboard),
+            ])
+        self.current = keyboard
+        box.show_all()
+
+    def hide(self):
+        if self.current is None:
+            return
+        if self.current is self.matchbox:
+            self.matchbox["box"].hide()
+        else:
+            self._detach(self.current)
+            self.current["keyboard"].release(None, None)
+        self.current = None
+
+    def _host_gone(self, box, keyboard):
+        if self.current is keyboard:
+            self.hide()
+        else:
+            self._detach(keyboard)
+
+    @staticmethod
+    def _detach(keyboard):
+        host = keyboard.pop("host", None)
+        if host is not None:
+            box, handlers = host
+            for handler in handlers:
+                box.disconnect(handler)
+        parent = keyboard["box"].get_parent()
+        if parent is not None:
+            parent.remove(keyboard["box"])
+
+    def _show_matchbox(self):
+        if self.matchbox is not None and self.matchbox["process"].poll() is not None:
+            logging.info("matchbox-keyboard exited, starting it again")
+            self._stop_matchbox()
+        if self.matchbox is None:
+            self.matchbox = self._start_matchbox()
+        container = self._screen.base_panel.content
+        if self.matchbox["box"].get_parent() is not container:
+            self._detach(self.matchbox)
+            container.pack_end(self.matchbox["box"], False, False, 0)
+            self.matchbox["box"].show_all()
+            self.matchbox["socket"].add_id(self.matchbox["xid"])
+        self.matchbox["box"].show()
+        self.current = self.matchbox
+
+    def _start_matchbox(self):
+        env = os.environ.copy()
+        usrkbd = os.path.expanduser("~/.matchbox/keyboard.xml")
+        if os.path.isfile(usrkbd):
+            env["MB_KBD_CONFIG"] = usrkbd
+        else:
+            env["MB_KBD_CONFIG"] = "ks_includes/locales/keyboard.xml"
+        p = subprocess.Popen(["matchbox-keyboard", "--xid"], stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, env=env)
+        xid = int(p.stdout.readline())
+        logging.debug(f"XID {xid}")
+        logging.debug(f"PID {p.pid}")
+
+        kbd_grid = Gtk.Grid(no_show_all=True)
+        kbd_grid.set_size_request(self._screen.gtk.content_width, self._screen.gtk.keyboard_height)
+        kbd_grid.set_vexpand(False)
+        kbd_grid.get_style_context().add_class("keyboard_matchbox")
+        socket = Gtk.Socket()
+        kbd_grid.attach(socket, 0, 0, 1, 1)
+        return {"box": kbd_grid, "process": p, "socket": socket, "xid": xid}
+
+    def _stop_matchbox(self):
+        if self.matchbox is None:
+            return
+        if self.matchbox["process"].poll() is None:
+            os.kill(self.matchbox["process"].pid, SIGTERM)
+        self._detach(self.matchbox)
+        if self.current is self.matchbox:
+            self.current = None
+        self.matchbox = None
+
+    def reset(self):
+        """Drop the cached keyboards, the next show builds them with the current size and language"""
+        self.hide()
+        for keyboard in self.keyboards.values():
+            self._detach(keyboard)
+        self.keyboards.clear()
+
+    def shutdown(self, *args):
+        # Only the process has to go, the widgets are destroyed with the window
+        if self.matchbox is not None and self.matchbox["process"].poll() is None:
+            os.kill(self.matchbox["process"].pid, SIGTERM)
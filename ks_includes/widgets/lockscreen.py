@@ -73,6 +73,7 @@ class LockScreen:
     def relock(self, entry=None, box=None):
         if not self.lock_box:
             return
+        self.screen.remove_keyboard()
         if self.unlock_box:
             self.screen.overlay.remove(self.unlock_box)
         self.unlock_box = None
@@ -87,12 +88,12 @@ class LockScreen:
         self.clear_lock()
 
     def clear_lock(self):
+        self.screen.remove_keyboard()
         if self.lock_box:
             self.screen.overlay.remove(self.lock_box)
         if self.unlock_box:
             self.screen.overlay.remove(self.unlock_box)
         self.lock_box = None
         self.unlock_box = None
-        self.screen.remove_keyboard()
         self.screen.overlay.get_children()[0].show()
         logging.info("Unlocked")
@@ -0,0 +1,94 @@
+import cairo
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk
+
+TICK = .25
+GAP = " " * 6
+
+
+class Marquee(Gtk.DrawingArea):
+    """
+    A single line label that scrolls its text when it doesn't fit
+
+    The text is laid out once into a surface and scrolling only moves the offset it's painted at.
+    Scrolling is a scheduler task owned by the widget, so it pauses while the screen is blanked,
+    and is removed when the widget is unmapped so a dropped panel doesn't keep it.
+    """
+
+    def __init__(self, screen, name, label=""):
+        super().__init__(hexpand=True)
+        self._screen = screen
+        self.name = name
+        self.label = label
+        self.surface = None
+        self.text_width = self.period = 0
+        self.step = self.offset = 0.0
+        self.connect("draw", self.on_draw)
+        self.connect("style-updated", self.render)
+        self.connect("size-allocate", self.on_size_allocate)
+        self.connect("map", self.on_map)
+        self.connect("unmap", self.stop_scrolling)
+        self.connect("destroy", self.stop_scrolling)
+        self.render()
+
+    def get_label(self):
+        return self.label
+
+    def set_label(self, label):
+        if label != self.label:
+            self.label = label
+            self.render()
+
+    def render(self, *args):
+        layout = self.create_pango_layout(self.label)
+        width, height = layout.get_pixel_size()
+        self.text_width = width
+        self.period = width + self.create_pango_layout(GAP).get_pixel_size()[0]
+        # Half a character per tick
+        self.step = width / max(len(self.label), 1) / 2
+        self.offset = 0.0
+        self.surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, max(width, 1), max(height, 1))
+        Gtk.render_layout(self.get_style_context(), cairo.Context(self.surface), 0, 0, layout)
+        self.set_size_request(-1, height)
+        self.update_scrolling()
+        self.queue_draw()
+
+    def on_size_allocate(self, widget, allocation):
+        self.update_scrolling()
+
+    def on_map(self, widget):
+        self.update_scrolling()
+
+    def update_scrolling(self):
+        scrolling = self._screen.scheduler.owner_of(self.name) is self
+        if self.text_width > self.get_allocated_width():
+            if not scrolling and self.get_mapped():
+                # Replaces the task of a marquee that was dropped with its panel
+                self._screen.scheduler.add(self.name, TICK, self.scroll, owner=self)
+        elif scrolling:
+            self._screen.scheduler.remove(self.name)
+            self.offset = 0.0
+
+    def stop_scrolling(self, widget):
+        if self._screen.scheduler.owner_of(self.name) is self:
+            self._screen.scheduler.remove(self.name)
+
+    def scroll(self):
+        self.offset = (self.offset + self.step) % self.period
+        self.queue_draw()
+        return True
+
+    def on_draw(self, widget, ctx):
+        width = self.get_allocated_width()
+        y = (self.get_allocated_height() - self.surface.get_height()) // 2
+        if self.text_width <= width:
+            ctx.set_source_surface(self.surface, (width - self.text_width) // 2, y)
+            ctx.paint()
+            return
+        x = -round(self.offset)
+        while x < width:
+            ctx.set_source_surface(self.surface, x, y)
+            ctx.paint()
+            x += self.period
@@ -0,0 +1,159 @@
+import logging
+import threading
+from time import monotonic
+
+import gi
+import requests
+
+gi.require_version("Gtk", "3.0")
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import Gdk, GdkPixbuf, GLib, Gtk
+
+JPEG_START = b'\xff\xd8'
+JPEG_END = b'\xff\xd9'
+CHUNK_SIZE = 32768
+# A frame larger than this means the stream is not MJPEG or lost sync
+MAX_FRAME_BYTES = 8 * 1024 * 1024
+
+
+class MjpegView(Gtk.DrawingArea):
+    """
+    Shows an MJPEG stream, or snapshots polled from a url, decoded in a worker thread
+
+    The worker keeps reading the stream and drops the frames arriving faster than max_fps
+    or while the previous frame is still waiting to be drawn, the others are decoded at the size of the widget.
+    Only the latest frame is kept.
+    """
+
+    def __init__(self, url, snapshot=False, max_fps=15, headers=None, flip_h=False, flip_v=False, rotation=0):
+        super().__init__(hexpand=True, vexpand=True)
+        self.url = url
+        self.snapshot = snapshot
+        self.interval = 1 / max(max_fps, 1)
+        self.headers = headers or {}
+        self.flip_h = flip_h
+        self.flip_v = flip_v
+        self.rotation = rotation % 360
+        self.frame = None
+        self.size = (0, 0)
+        self.lock = threading.Lock()
+        self.redraw_pending = False
+        self.stopping = None
+        self.frames = self.dropped = 0
+        self.connect("draw", self.on_draw)
+        self.connect("size-allocate", self.on_size_allocate)
+
+    def start(self):
+        if self.stopping is not None:
+            return
+        # Each worker gets its own event, one still blocked in a read must not see a restart
+        self.stopping = threading.Event()
+        threading.Thread(target=self._run, args=(self.stopping,), name="mjpeg", daemon=True).start()
+
+    def stop(self):
+        if self.stopping is None:
+            return
+        self.stopping.set()
+        self.stopping = None
+        logging.info(f"Camera: {self.frames} frames shown, {self.dropped} dropped")
+
+    def on_size_allocate(self, widget, allocation):
+        self.size = (allocation.width, allocation.height)
+
+    def _run(self, stopping):
+        while not stopping.is_set():
+            try:
+                if self.snapshot:
+                    self._poll_snapshots(stopping)
+                else:
+                    self._read_stream(stopping)
+            except Exception as e:
+                if stopping.is_set():
+                    return
+                logging.info(f"Camera stream error: {e}")
+                stopping.wait(2)
+
+    def _read_stream(self, stopping):
+        with requests.get(self.url, headers=self.headers, stream=True, timeout=5) as response:
+            response.raise_for_status()
+            buffer = bytearray()
+            last = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if stopping.is_set():
+                    return
+                buffer += chunk
+                end = buffer.rfind(JPEG_END)
+                if end < 0:
+                    if len(buffer) > MAX_FRAME_BYTES:
+                        buffer.clear()
+                    continue
+                start = buffer.rfind(JPEG_START, 0, end)
+                frame = bytes(buffer[start:end + 2]) if start >= 0 else None
+                del buffer[:end + 2]
+                if frame is None:
+                    continue
+                now = monotonic()
+                if now - last < self.interval or self.redraw_pending:
+                    self.dropped += 1
+                    continue
+                last = now
+                self._publish(self._decode(frame))
+
+    def _poll_snapshots(self, stopping):
+        while not stopping.is_set():
+            start = monotonic()
+            response = requests.get(self.url, headers=self.headers, timeout=5)
+            response.raise_for_status()
+            self._publish(self._decode(response.content))
+            stopping.wait(max(self.interval - (monotonic() - start), 0))
+
+    def _decode(self, data):
+        width, height = self.size
+        if self.rotation in (90, 270):
+            width, height = height, width
+        loader = GdkPixbuf.PixbufLoader.new_with_type("jpeg")
+        if width > 1 and height > 1:
+            loader.connect("size-prepared", self._scale, width, height)
+        loader.write(data)
+        loader.close()
+        return loader.get_pixbuf()
+
+    @staticmethod
+    def _scale(loader, width, height, max_width, max_height):
+        # Downscale while decoding, keeping the aspect ratio
+        scale = min(max_width / width, max_height / height)
+        if scale < 1:
+            loader.set_size(max(int(width * scale), 1), max(int(height * scale), 1))
+
+    def _publish(self, frame):
+        with self.lock:
+            self.frame = frame
+            self.frames += 1
+            if self.redraw_pending:
+                return
+            self.redraw_pending = True
+        GLib.idle_add(self._redraw)
+
+    def _redraw(self):
+        with self.lock:
+            self.redraw_pending = False
+        self.queue_draw()
+        return False
+
+    def on_draw(self, widget, ctx):
+        width, height = self.get_allocated_width(), self.get_allocated_height()
+        ctx.set_source_rgb(0, 0, 0)
+        ctx.paint()
+        with self.lock:
+            frame = self.frame
+        if frame is None:
+            return
+        frame_width, frame_height = frame.get_width(), frame.get_height()
+        if self.rotation in (90, 270):
+            frame_width, frame_height = frame_height, frame_width
+        scale = min(width / frame_width, height / frame_height)
+        ctx.translate(width / 2, height / 2)
+        ctx.scale(scale * (-1 if self.flip_h else 1), scale * (-1 if self.flip_v else 1))
+        ctx.rotate(self.rotation * 3.14159265 / 180)
+        Gdk.cairo_set_source_pixbuf(ctx, frame, -frame.get_width() / 2, -frame.get_height() / 2)
+        ctx.paint()
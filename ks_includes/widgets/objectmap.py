@@ -25,11 +25,52 @@ class ObjectMap(Gtk.DrawingArea):
         self.margin_right = 15
         self.margin_top = 10
         self.margin_bottom = self.font_size * 2
-        self.objects = self.printer.get_stat("exclude_object", "objects")
-        self.current_object = self.printer.get_stat("current_object", "current_object")
-        self.excluded_objects = self.printer.get_stat("exclude_object", "excluded_objects")
+        self.objects = []
+        self.bounds = {}
         self.min_x = self.min_y = 99999999
         self.max_x = self.max_y = 0
+        self.current_object = self.printer.get_stat("exclude_object", "current_object")
+        self.excluded_objects = set(self.printer.get_stat("exclude_object", "excluded_objects"))
+        self.set_objects(self.printer.get_stat("exclude_object", "objects"))
+
+    def set_objects(self, objects):
+        self.objects = [obj for obj in objects if obj.get("polygon")]
+        # Bounding boxes are kept per object, for hit testing and to redraw only the objects that changed
+        self.bounds = {}
+        for obj in self.objects:
+            xs = [point[0] for point in obj["polygon"]]
+            ys = [point[1] for point in obj["polygon"]]
+            self.bounds[obj["name"]] = (min(xs), min(ys), max(xs), max(ys))
+        if self.bounds:
+            self.min_x = min(self.min_x, *(bound[0] for bound in self.bounds.values()))
+            self.min_y = min(self.min_y, *(bound[1] for bound in self.bounds.values()))
+            self.max_x = max(self.max_x, *(bound[2] for bound in self.bounds.values()))
+            self.max_y = max(self.max_y, *(bound[3] for bound in self.bounds.values()))
+        self.queue_draw()
+
+    def set_current(self, name):
+        if name == self.current_object:
+            return
+        self.queue_draw_object(self.current_object)
+        self.current_object = name
+        self.queue_draw_object(name)
+
+    def set_excluded(self, names):
+        names = set(names)
+        for name in names ^ self.excluded_objects:
+            self.queue_draw_object(name)
+        self.excluded_objects = names
+
+    def queue_draw_object(self, name):
+        if name not in self.bounds or self.max_x <= self.min_x or self.max_y <= self.min_y:
+            return
+        width, height = self.get_allocated_width(), self.get_allocated_height()
+        min_x, min_y, max_x, max_y = self.bounds[name]
+        left = int(self.x_bed_to_graph(width, min_x)) - 2
+        top = int(self.y_bed_to_graph(height, max_y)) - 2
+        right = int(self.x_bed_to_graph(width, max_x)) + 3
+        bottom = int(self.y_bed_to_graph(height, min_y)) + 3
+        self.queue_draw_area(left, top, right - left, bottom - top)
 
     def x_graph_to_bed(self, width, gx):
         return (((gx - self.margin_left) * (self.max_x - self.min_x))
@@ -45,18 +86,11 @@ class ObjectMap(Gtk.DrawingArea):
         y = self.y_graph_to_bed(da.get_allocated_height(), ev.y)
         logging.info(f"Touched GRAPH {ev.x:.0f},{ev.y:.0f} BED: {x:.0f},{y:.0f}")
 
-        for obj in self.objects:
-            obj_min_x = obj_max_x = obj["polygon"][0][0]
-            obj_min_y = obj_max_y = obj["polygon"][0][1]
-            for point in obj["polygon"]:
-                obj_min_x = min(obj_min_x, point[0])
-                obj_min_y = min(obj_min_y, point[1])
-                obj_max_x = max(obj_max_x, point[0])
-                obj_max_y = max(obj_max_y, point[1])
+        for name, (obj_min_x, obj_min_y, obj_max_x, obj_max_y) in self.bounds.items():
             if obj_min_x < x < obj_max_x and obj_min_y < y < obj_max_y:
-                logging.info(f"TOUCHED object it's: {obj['name']}")
-                if obj['name'] not in self.excluded_objects:
-                    self.exclude_object(obj['name'])
+                logging.info(f"TOUCHED object it's: {name}")
+                if name not in self.excluded_objects:
+                    self.exclude_object(name)
                 break
 
     def exclude_object(self, name):
@@ -71,16 +105,9 @@ class ObjectMap(Gtk.DrawingArea):
     def draw_graph(self, da, ctx):
         right = da.get_allocated_width() - self.margin_right
         bottom = da.get_allocated_height() - self.margin_bottom
-        self.objects = self.printer.get_stat("exclude_object", "objects")
-
-        for obj in self.objects:
-            for point in obj["polygon"]:
-                # Find min coords
-                self.min_x = min(self.min_x, point[0])
-                self.min_y = min(self.min_y, point[1])
-                # Find max coords
-                self.max_x = max(self.max_x, point[0])
-                self.max_y = max(self.max_y, point[1])
+        if self.max_x <= self.min_x or self.max_y <= self.min_y:
+            return
+        clip_left, clip_top, clip_right, clip_bottom = ctx.clip_extents()
 
         # Styling
         ctx.set_source_rgb(.5, .5, .5)  # Grey
@@ -119,12 +146,18 @@ class ObjectMap(Gtk.DrawingArea):
         ctx.stroke()
         ctx.set_dash([1, 0])
 
-        # Draw objects
+        # Draw objects, skipping the ones outside of the area being redrawn
         for obj in self.objects:
+            min_x, min_y, max_x, max_y = self.bounds[obj['name']]
+            if (self.x_bed_to_graph(da.get_allocated_width(), max_x) < clip_left
+                    or self.x_bed_to_graph(da.get_allocated_width(), min_x) > clip_right
+                    or self.y_bed_to_graph(da.get_allocated_height(), min_y) < clip_top
+                    or self.y_bed_to_graph(da.get_allocated_height(), max_y) > clip_bottom):
+                continue
             # change the color depending on the status
-            if obj['name'] == self.printer.get_stat("exclude_object", "current_object"):
+            if obj['name'] == self.current_object:
                 ctx.set_source_rgb(1, 0, 0)  # Red
-            elif obj['name'] in self.printer.get_stat("exclude_object", "excluded_objects"):
+            elif obj['name'] in self.excluded_objects:
                 ctx.set_source_rgb(0, 0, 0)  # Black
             else:
                 ctx.set_source_rgb(.5, .5, .5)  # Grey
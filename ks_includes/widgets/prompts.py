@@ -5,113 +5,145 @@ import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Gdk
 
+PROMPT_CACHE_SIZE = 4
+
+
+class PromptSpec:
+    """
+    A prompt parsed from the lines between prompt_begin and prompt_show
+
+    body holds (grouped, buttons) rows and the buttons are (name, gcode, style) tuples,
+    layout is everything but the text, prompts with the same layout share their dialog.
+    """
+    __slots__ = ("header", "text", "body", "footer", "layout")
+
+    def __init__(self, header, text, body, footer):
+        self.header = header
+        self.text = text
+        self.body = body
+        self.footer = footer
+        self.layout = (header, body, footer)
+
+
+def parse_button(params):
+    params = params.split('|')
+    if len(params) > 3:
+        logging.error(f'Unexpected number of parameters on the button: {params}')
+        return None
+    name = params[0]
+    gcode = params[1] if len(params) > 1 else name
+    style = params[2] if len(params) > 2 else 'default'
+    return name, gcode, style
+
+
+def parse_prompt(lines):
+    header = text = ""
+    body = []
+    footer = []
+    group = None
+    for line in lines:
+        command, space, params = line.partition(' ')
+        if command == 'prompt_begin':
+            header = params.strip()
+        elif command == 'prompt_text':
+            text = params
+        elif command in ('prompt_button', 'prompt_footer_button'):
+            button = parse_button(params)
+            if button is None:
+                continue
+            if command == 'prompt_footer_button':
+                footer.append(button)
+            elif group is not None:
+                group.append(button)
+            else:
+                body.append((False, (button,)))
+        elif command == 'prompt_button_group_start':
+            group = []
+        elif command == 'prompt_button_group_end':
+            if group:
+                body.append((True, tuple(group)))
+            group = None
+        else:
+            logging.debug(f'Unknown option {line}')
+    return PromptSpec(header, text, tuple(body), tuple(footer))
+
 
 class Prompt:
+    """
+    Shows the prompts of Klipper's action:prompt protocol
+
+    The lines are buffered from prompt_begin until prompt_show and parsed at once, so the dialog is built complete.
+    Ended dialogs are hidden and kept by layout, when the same buttons are prompted again only the text is updated.
+    """
+
     def __init__(self, screen):
         self.screen = screen
         self.gtk = screen.gtk
-        self.window_title = 'KlipperScreen'
-        self.text = self.header = ""
-        self.buttons = []
-        self.id = 1
-        self.prompt = None
-        self.scroll_box = Gtk.Box(
-            orientation=Gtk.Orientation.VERTICAL,
-        )
-        self.groups = []
-
-    def _key_press_event(self, widget, event):
-        keyval_name = Gdk.keyval_name(event.keyval)
-        if keyval_name in ["Escape", "BackSpace"]:
-            self.close()
+        self.lines = None
+        self.shown = None
+        self.dialogs = {}
 
     def decode(self, data):
         logging.info(f'{data}')
         if data.startswith('prompt_begin'):
-            self.header = data.replace('prompt_begin', '')
-            if self.header:
-                self.window_title = self.header
-            self.text = ""
-            self.buttons = []
-            return
-        elif data.startswith('prompt_text'):
-            self.text = data.replace('prompt_text ', '')
-            return
-        elif data.startswith('prompt_button '):
-            data = data.replace('prompt_button ', '')
-            params = data.split('|')
-            if len(params) == 1:
-                params.append(self.text)
-            if len(params) > 3:
-                logging.error('Unexpected number of parameters on the button')
-                return
-            self.set_button(*params)
-            return
-        elif data.startswith('prompt_footer_button'):
-            data = data.replace('prompt_footer_button ', '')
-            params = data.split('|')
-            if len(params) == 1:
-                params.append(self.text)
-            if len(params) > 3:
-                logging.error('Unexpected number of parameters on the button')
-                return
-            self.set_footer_button(*params)
-            return
-        elif data == 'prompt_show':
-            if not self.prompt:
-                self.show()
-            return
+            self.end()
+            self.lines = [data]
         elif data == 'prompt_end':
+            self.lines = None
             self.end()
-        elif data == 'prompt_button_group_start':
-            self.groups.append(
-                Gtk.FlowBox(
-                    selection_mode=Gtk.SelectionMode.NONE,
-                    orientation=Gtk.Orientation.HORIZONTAL,
-                )
-            )
-        elif data == 'prompt_button_group_end':
-            if self.groups:
-                self.scroll_box.add(self.groups.pop())
+        elif self.lines is None:
+            logging.debug(f'Prompt line outside of a prompt: {data}')
+        elif data == 'prompt_show':
+            spec = parse_prompt(self.lines)
+            self.lines = None
+            self.show(spec)
         else:
-            logging.debug(f'Unknown option {data}')
-
-    def set_button(self, name, gcode, style='default'):
-        button = self.gtk.Button(image_name=None, label=f"{name}", style=f'dialog-{style}')
-        button.connect("clicked", self.screen._send_action, "printer.gcode.script", {'script': gcode})
-        if self.groups:
-            self.groups[-1].add(button)
-            # Workaround to expand the buttons horizontally
-            max_childs = len(self.groups[-1].get_children())
-            self.groups[-1].set_max_children_per_line(min(4, max_childs))
-            self.groups[-1].set_min_children_per_line(min(4, max_childs))
+            self.lines.append(data)
+
+    def show(self, spec):
+        logging.info(f'Prompt {spec.header} {spec.text} {spec.footer}')
+        if spec.layout in self.dialogs:
+            dialog, text = self.dialogs.pop(spec.layout)
+            text.set_label(spec.text)
+            dialog.show()
+            self.screen.dialogs.append(dialog)
         else:
-            self.scroll_box.add(button)
-
-    def set_footer_button(self, name, gcode, style='default'):
-        self.buttons.append(
-            {"name": name, "response": self.id, 'gcode': gcode, 'style': f'dialog-{style}'}
-        )
-        self.id += 1
-
-    def show(self):
-        logging.info(f'Prompt {self.header} {self.text} {self.buttons}')
+            dialog, text = self.build(spec)
+        self.dialogs[spec.layout] = (dialog, text)
+        while len(self.dialogs) > PROMPT_CACHE_SIZE:
+            self.dialogs.pop(next(iter(self.dialogs)))[0].destroy()
+        self.shown = dialog
+        self.screen.screensaver.close()
 
-        title = Gtk.Label(wrap=True, hexpand=True, vexpand=False, halign=Gtk.Align.CENTER, label=self.header)
+    def build(self, spec):
+        title = Gtk.Label(wrap=True, hexpand=True, vexpand=False, halign=Gtk.Align.CENTER, label=spec.header)
 
         close = self.gtk.Button("cancel", scale=self.gtk.bsidescale)
         close.set_hexpand(False)
         close.set_vexpand(False)
         close.connect("clicked", self.close)
 
-        label = Gtk.Label(label=self.text, wrap=True, hexpand=True, vexpand=True)
-
-        self.scroll_box.add(label)
-        self.scroll_box.reorder_child(label, 0)
+        text = Gtk.Label(label=spec.text, wrap=True, hexpand=True, vexpand=True)
+        scroll_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        scroll_box.add(text)
+        for grouped, buttons in spec.body:
+            if not grouped:
+                scroll_box.add(self.button(*buttons[0]))
+                continue
+            group = Gtk.FlowBox(
+                selection_mode=Gtk.SelectionMode.NONE,
+                orientation=Gtk.Orientation.HORIZONTAL,
+            )
+            for button in buttons:
+                group.add(self.button(*button))
+            # Workaround to expand the buttons horizontally
+            group.set_max_children_per_line(min(4, len(buttons)))
+            group.set_min_children_per_line(min(4, len(buttons)))
+            scroll_box.add(group)
 
         scroll = self.gtk.ScrolledWindow(steppers=False)
         scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-        scroll.add(self.scroll_box)
+        scroll.add(scroll_box)
 
         content = Gtk.Grid()
         if not self.screen.windowed:
@@ -119,27 +151,49 @@ class Prompt:
             content.attach(close, 1, 0, 1, 1)
         content.attach(scroll, 0, 1, 2, 1)
 
-        self.prompt = self.gtk.Dialog(
-            self.window_title,
-            self.buttons,
-            content,
-            self.response,
-        )
-        self.prompt.connect("key-press-event", self._key_press_event)
-        self.prompt.connect("delete-event", self.close)
-        self.screen.screensaver.close()
+        footer = [
+            {"name": name, "response": i, "style": f'dialog-{style}'}
+            for i, (name, gcode, style) in enumerate(spec.footer, start=1)
+        ]
+        dialog = self.gtk.Dialog(spec.header or 'KlipperScreen', footer, content, self.response, spec.footer)
+        dialog.connect("key-press-event", self._key_press_event)
+        dialog.connect("delete-event", self.close)
+        dialog.connect("destroy", self.forget, spec.layout)
+        return dialog, text
+
+    def button(self, name, gcode, style):
+        button = self.gtk.Button(image_name=None, label=f"{name}", style=f'dialog-{style}')
+        button.connect("clicked", self.screen._send_action, "printer.gcode.script", {'script': gcode})
+        return button
 
-    def response(self, dialog, response_id):
-        for button in self.buttons:
-            if button['response'] == response_id:
-                self.screen._send_action(None, "printer.gcode.script", {'script': button['gcode']})
+    def _key_press_event(self, widget, event):
+        keyval_name = Gdk.keyval_name(event.keyval)
+        if keyval_name in ["Escape", "BackSpace"]:
+            self.close()
+
+    def response(self, dialog, response_id, footer):
+        if 0 < response_id <= len(footer):
+            self.screen._send_action(None, "printer.gcode.script", {'script': footer[response_id - 1][1]})
 
     def close(self, *args):
         script = {'script': 'RESPOND type="command" msg="action:prompt_end"'}
         self.screen._send_action(None, "printer.gcode.script", script)
+        # The dialog is hidden when Klipper ends the prompt
+        return True
 
     def end(self):
-        if self.prompt is not None:
-            self.gtk.remove_dialog(self.prompt)
-        self.prompt = None
-        self.screen.prompt = None
+        if self.shown is None:
+            return
+        self.shown.hide()
+        if self.shown in self.screen.dialogs:
+            self.screen.dialogs.remove(self.shown)
+        self.shown = None
+
+    def forget(self, dialog, layout):
+        # Dialogs are also destroyed along with the others, or by tapping a prompt without footer buttons
+        if self.dialogs.get(layout, (None,))[0] is dialog:
+            del self.dialogs[layout]
+        if dialog in self.screen.dialogs:
+            self.screen.dialogs.remove(dialog)
+        if self.shown is dialog:
+            self.shown = None
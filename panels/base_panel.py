@@ -4,7 +4,7 @@ import logging
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import GLib, Gtk, Pango
+from gi.repository import Gtk, Pango
 from jinja2 import Environment
 from datetime import datetime
 from math import log
@@ -24,10 +24,9 @@ class BasePanel(ScreenPanel):
         self.current_panel = None
         self.time_min = -1
         self.time_format = self._config.get_main_config().getboolean("24htime", True)
-        self.time_update = None
-        self.battery_update = None
         self.titlebar_items = []
         self.titlebar_name_type = None
+        self.titlebar_names = {}
         self.current_extruder = None
         self.last_usage_report = datetime.now()
         self.usage_report = 0
@@ -199,10 +198,10 @@ class BasePanel(ScreenPanel):
             return self._gtk.Image("heat-up", img_size, img_size)
 
     def activate(self):
-        if self.time_update is None:
-            self.time_update = GLib.timeout_add_seconds(1, self.update_time)
-        if self.battery_update is None:
-            self.battery_update = GLib.timeout_add_seconds(60, self.battery_percentage)
+        if "clock" not in self._screen.scheduler:
+            self._screen.scheduler.add("clock", 1, self.update_time, owner=self.titlebar)
+        if "battery" not in self._screen.scheduler:
+            self._screen.scheduler.add("battery", 60, self.battery_percentage, owner=self.titlebar)
 
     def add_content(self, panel):
         printing = self._printer and self._printer.state in {"printing", "paused"}
@@ -278,17 +277,13 @@ class BasePanel(ScreenPanel):
         if not devices:
             return
         for device in devices:
+            if device not in self.labels:
+                continue
             temp = self._printer.get_stat(device, "temperature")
-            if temp and device in self.labels:
-                name = ""
-                if not (device.startswith("extruder") or device.startswith("heater_bed")):
-                    if self.titlebar_name_type == "full":
-                        name = device.split()[1] if len(device.split()) > 1 else device
-                        name = f'{self.prettify(name)}: '
-                    elif self.titlebar_name_type == "short":
-                        name = device.split()[1] if len(device.split()) > 1 else device
-                        name = f"{name[:1].upper()}: "
-                self.labels[device].set_label(f"{name}{temp:.0f}°")
+            if temp:
+                self.label_bindings.update(
+                    device, self.labels[device], (self.titlebar_name(device), round(temp)), self.format_titlebar_temp
+                )
 
         if (self.current_extruder and 'toolhead' in data and 'extruder' in data['toolhead']
                 and data["toolhead"]["extruder"] != self.current_extruder):
@@ -300,6 +295,23 @@ class BasePanel(ScreenPanel):
 
         return False
 
+    def titlebar_name(self, device):
+        if device not in self.titlebar_names:
+            name = ""
+            if not (device.startswith("extruder") or device.startswith("heater_bed")):
+                if self.titlebar_name_type == "full":
+                    name = device.split()[1] if len(device.split()) > 1 else device
+                    name = f'{self.prettify(name)}: '
+                elif self.titlebar_name_type == "short":
+                    name = device.split()[1] if len(device.split()) > 1 else device
+                    name = f"{name[:1].upper()}: "
+            self.titlebar_names[device] = name
+        return self.titlebar_names[device]
+
+    @staticmethod
+    def format_titlebar_temp(value):
+        return f"{value[0]}{value[1]}°"
+
     def remove(self, widget):
         self.content.remove(widget)
 
@@ -393,6 +405,7 @@ class BasePanel(ScreenPanel):
         ScreenPanel.ks_printer_cfg = self._config.get_printer_config(printer)
         if self.ks_printer_cfg is not None:
             self.titlebar_name_type = self.ks_printer_cfg.get("titlebar_name_type", None)
+            self.titlebar_names.clear()
             titlebar_items = self.ks_printer_cfg.get("titlebar_items", None)
             if titlebar_items is not None:
                 self.titlebar_items = [str(i.strip()) for i in titlebar_items.split(',')]
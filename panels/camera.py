@@ -4,9 +4,13 @@ import mpv
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk
+from gi.repository import Gdk, Gtk
 from contextlib import suppress
 from ks_includes.screen_panel import ScreenPanel
+from ks_includes.widgets.mjpeg_view import MjpegView
+
+# Moonraker webcam services that serve MJPEG, or JPEG snapshots for the adaptive one
+MJPEG_SERVICES = ("mjpegstreamer", "mjpegstreamer-adaptive", "uv4l-mjpeg", "webrtc-camerastreamer")
 
 
 class Panel(ScreenPanel):
@@ -14,6 +18,9 @@ class Panel(ScreenPanel):
         title = title or _("Camera")
         super().__init__(screen, title)
         self.mpv = None
+        self.view = None
+        self.use_mpv = self._config.get_main_config().getboolean("camera_use_mpv", False)
+        self.max_fps = self._config.get_main_config().getint("camera_max_fps", 15)
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         for i, cam in enumerate(self._printer.cameras):
             if not cam["enabled"]:
@@ -42,19 +49,62 @@ class Panel(ScreenPanel):
                 self.play(None, cam)
 
     def deactivate(self):
+        self.close_view()
         if self.mpv:
             self.mpv.terminate()
             self.mpv = None
 
-    def play(self, widget, cam):
-        url = cam['stream_url']
+    def camera_url(self, url):
         if url.startswith('/'):
             logging.info("camera URL is relative")
             endpoint = self._screen.apiclient.endpoint.split(':')
             url = f"{endpoint[0]}:{endpoint[1]}{url}"
+        return url
+
+    def play(self, widget, cam):
+        url = self.camera_url(cam['stream_url'])
         if '/webrtc' in url:
-            self._screen.show_popup_message(_('WebRTC is not supported by the backend trying Stream'))
+            if self.use_mpv:
+                self._screen.show_popup_message(_('WebRTC is not supported by the backend trying Stream'))
             url = url.replace('/webrtc', '/stream')
+        if not self.use_mpv and cam.get("service", "mjpegstreamer") in MJPEG_SERVICES:
+            self.show_view(cam, url)
+        else:
+            self.play_mpv(cam, url)
+
+    def show_view(self, cam, url):
+        self.close_view()
+        snapshot = cam.get("service") == "mjpegstreamer-adaptive" and bool(cam.get("snapshot_url"))
+        if snapshot:
+            url = self.camera_url(cam["snapshot_url"])
+        fps = min(self.max_fps, cam.get("target_fps") or self.max_fps)
+        logging.debug(f"Camera URL: {url} fps: {fps}")
+        self.view = MjpegView(
+            url, snapshot, fps, flip_h=cam["flip_horizontal"], flip_v=cam["flip_vertical"], rotation=cam["rotation"]
+        )
+        self.view.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
+        self.view.connect("button-press-event", self.view_clicked)
+        self.content.remove(self.scroll)
+        self.content.add(self.view)
+        self.view.show()
+        self.view.start()
+
+    def view_clicked(self, widget, event):
+        if len(self._printer.cameras) == 1:
+            self._screen._menu_go_back()
+        else:
+            self.close_view()
+
+    def close_view(self):
+        if self.view is None:
+            return
+        self.view.stop()
+        self.content.remove(self.view)
+        self.view = None
+        self.content.add(self.scroll)
+        self.content.show_all()
+
+    def play_mpv(self, cam, url):
         vf_list = []
         if cam["flip_horizontal"]:
             vf_list.append("hflip")
@@ -18,13 +18,11 @@ class Panel(ScreenPanel):
         self.current_object = self._gtk.Button("extrude", "", scale=self.bts, position=Gtk.PositionType.LEFT, lines=1)
         self.current_object.connect("clicked", self.exclude_current)
         self.current_object.set_vexpand(False)
-        self.excluded_objects = self._printer.get_stat("exclude_object", "excluded_objects")
+        self.excluded_objects = set(self._printer.get_stat("exclude_object", "excluded_objects"))
         logging.info(f'Excluded: {self.excluded_objects}')
-        self.objects = self._printer.get_stat("exclude_object", "objects")
+        self.objects = []
         self.labels['map'] = None
-        for obj in self.objects:
-            logging.info(f"Adding {obj['name']}")
-            self.add_object(obj["name"])
+        self.set_objects(self._printer.get_stat("exclude_object", "objects"))
 
         scroll = self._gtk.ScrolledWindow()
         scroll.add(self.object_list)
@@ -47,6 +45,16 @@ class Panel(ScreenPanel):
         self.content.add(grid)
         self.content.show_all()
 
+    def set_objects(self, objects):
+        self.objects = objects
+        names = {obj["name"] for obj in objects}
+        for name in set(self.buttons) - names:
+            self.remove_object(name)
+        for obj in objects:
+            if obj["name"] not in self.buttons:
+                self.add_object(obj["name"])
+        logging.info(f"Objects: {len(objects)}")
+
     def add_object(self, name):
         if name not in self.buttons and name not in self.excluded_objects:
             self.buttons[name] = self._gtk.Button(label=name.replace("_", " "))
@@ -55,6 +63,13 @@ class Panel(ScreenPanel):
             self.buttons[name].connect("clicked", self.exclude_object, name)
             self.buttons[name].get_style_context().add_class("frame-item")
             self.object_list.add(self.buttons[name])
+            self.buttons[name].show_all()
+
+    def remove_object(self, name):
+        button = self.buttons.pop(name, None)
+        if button is not None:
+            self.object_list.remove(button)
+            button.destroy()
 
     def exclude_object(self, widget, name):
         if len(self.excluded_objects) == len(self.objects) - 1:
@@ -84,34 +99,28 @@ class Panel(ScreenPanel):
     def process_update(self, action, data):
         if action == "notify_status_update":
             if "exclude_object" in data:
-                if "object" in data["exclude_object"]:                    # Update objects
-                    self.objects = data["exclude_object"]["objects"]
-                    logging.info(f'Objects: {data["exclude_object"]["objects"]}')
-                    for obj in self.buttons:
-                        self.object_list.remove(self.buttons[obj])
-                    self.buttons = {}
-                    for obj in self.objects:
-                        logging.info(f"Adding {obj['name']}")
-                        self.add_object(obj["name"])
-                    self.content.show_all()
-                if "current_object" in data["exclude_object"]:                    # Update objects
-                    # Update current objects
-                    if data["exclude_object"]["current_object"]:
-                        self.current_object.set_label(f'{data["exclude_object"]["current_object"].replace("_", " ")}')
-                    self.update_graph()
-                if "excluded_objects" in data["exclude_object"]:                    # Update objects
-                    # Update excluded objects
-                    logging.info(f'Excluded objects: {data["exclude_object"]["excluded_objects"]}')
-                    self.excluded_objects = data["exclude_object"]["excluded_objects"]
-                    for name in self.excluded_objects:
-                        if name in self.buttons:
-                            self.object_list.remove(self.buttons[name])
-                    self.update_graph()
+                if "objects" in data["exclude_object"]:
+                    self.set_objects(data["exclude_object"]["objects"])
+                    if self.labels['map']:
+                        self.labels['map'].set_objects(self.objects)
+                if "current_object" in data["exclude_object"]:
+                    current = data["exclude_object"]["current_object"]
+                    if current:
+                        self.current_object.set_label(f'{current.replace("_", " ")}')
+                    if self.labels['map']:
+                        self.labels['map'].set_current(current)
+                if "excluded_objects" in data["exclude_object"]:
+                    excluded = set(data["exclude_object"]["excluded_objects"])
+                    logging.info(f'Excluded objects: {excluded - self.excluded_objects}')
+                    for name in excluded - self.excluded_objects:
+                        self.remove_object(name)
+                    self.excluded_objects = excluded
+                    if self.labels['map']:
+                        self.labels['map'].set_excluded(excluded)
                     if len(self.excluded_objects) == len(self.objects):
                         self._screen._menu_go_back()
         elif action == "notify_gcode_response" and "Excluding object" in data:
             self._screen.show_popup_message(data, level=1)
-            self.update_graph()
 
     def activate(self):
         self.update_graph()
@@ -320,10 +320,15 @@ class Panel(ScreenPanel):
     def update_temp(self, extruder, temp, target, power):
         if not temp:
             return
-        new_label_text = f"{temp or 0:.0f}"
-        if target:
-            new_label_text += f"/{target:.0f}"
-        new_label_text += "°\n"
-        if self._show_heater_power and power:
-            new_label_text += f" {power * 100:.0f}%"
-        find_widget(self.labels[extruder], Gtk.Label).set_text(new_label_text)
+        value = (
+            round(temp),
+            round(target) if target else None,
+            round(power * 100) if self._show_heater_power and power else None,
+        )
+        self.label_bindings.update(extruder, self.labels[extruder], value, self.format_extruder_temp)
+
+    @staticmethod
+    def format_extruder_temp(value):
+        temp, target, power = value
+        text = f"{temp}/{target}°\n" if target is not None else f"{temp}°\n"
+        return text + (f" {power}%" if power is not None else "")
@@ -1,4 +1,3 @@
-import logging
 import re
 
 import gi
@@ -19,6 +18,9 @@ class Panel(ScreenPanel):
         self.sort_btn.get_style_context().add_class("buttons_slim")
         self.options = {}
         self.macros = {}
+        self.catalog = None
+        self.options_section = None
+        self.hashtag = None
         self.menu = ['macros_menu']
 
         adjust = self._gtk.Button("settings", " " + _("Settings"), "blue_move", self.bts, Gtk.PositionType.LEFT, 1)
@@ -26,8 +28,15 @@ class Panel(ScreenPanel):
         adjust.connect("clicked", self.load_menu, 'options', _("Settings"))
         adjust.set_hexpand(False)
 
+        self.labels['search'] = Gtk.Entry(hexpand=True, placeholder_text=_("Search"))
+        self.labels['search'].connect("changed", self.filter_macros)
+        self.labels['search'].connect("touch-event", self._screen.show_keyboard)
+        self.labels['search'].connect("button-press-event", self._screen.show_keyboard)
+        self.labels['search'].connect("focus-out-event", self._screen.remove_keyboard)
+
         sbox = Gtk.Box(vexpand=False)
         sbox.pack_start(self.sort_btn, True, True, 5)
+        sbox.pack_start(self.labels['search'], True, True, 5)
         sbox.pack_start(adjust, True, True, 5)
 
         self.labels['macros_list'] = self._gtk.ScrolledWindow()
@@ -47,24 +56,12 @@ class Panel(ScreenPanel):
         self.reload_macros()
 
     def add_gcode_macro(self, macro):
-        section = self._printer.get_macro(macro)
-        if section:
-            if "rename_existing" in section:
-                return
-            if "gcode" in section:
-                gcode = section["gcode"].split("\n")
-            else:
-                logging.error(f"gcode not found in {macro}\n{section}")
-                return
-        else:
-            logging.debug(f"Couldn't load {macro}\n{section}")
-            return
         name = Gtk.Label(hexpand=True, vexpand=True, halign=Gtk.Align.START, valign=Gtk.Align.CENTER,
                          wrap=True, wrap_mode=Pango.WrapMode.WORD_CHAR)
-        name.set_markup(f"<big><b>{macro}</b></big>")
+        name.set_markup(f"<big><b>{macro.name}</b></big>")
 
         btn = self._gtk.Button("resume", style="setting_blue1")
-        btn.connect("clicked", self.run_gcode_macro, macro)
+        btn.connect("clicked", self.run_gcode_macro, macro.name)
         btn.set_hexpand(False)
         btn.set_halign(Gtk.Align.END)
 
@@ -76,44 +73,34 @@ class Panel(ScreenPanel):
         row.add(labels)
         row.add(btn)
 
-        self.macros[macro] = {
+        self.macros[macro.name] = {
             "row": row,
             "params": {},
         }
 
-        pattern = re.compile(r'params\.(?P<param>[a-zA-Z0-9_]+)'
-                             r'(?:\s*\|\s*default\(\s*(?P<default>[^\)]+)\s*\))?'
-                             r'(?:\s*\|\s*(?P<type_hint>[a-zA-Z]+))?')
-        for line in gcode:
-            if line.startswith("{") and "params." in line:
-                result = re.search(pattern, line)
-                if result:
-                    result = result.groupdict()
-                    default = result.get("default", "")
-                    type_hint = result.get("type_hint", "")
-                    entry = Gtk.Entry(placeholder_text=default)
-                    if type_hint == "int":
-                        entry.set_input_purpose(Gtk.InputPurpose.DIGITS)
-                        entry.set_input_hints(Gtk.InputHints.NO_EMOJI)
-                        entry.get_style_context().add_class("active")
-                    elif type_hint == "float":
-                        entry.set_input_purpose(Gtk.InputPurpose.NUMBER)
-                        entry.set_input_hints(Gtk.InputHints.EMOJI)
-                        entry.get_style_context().add_class("active")
-                    else:
-                        entry.set_input_purpose(Gtk.InputPurpose.ALPHA)
-                        entry.set_input_hints(Gtk.InputHints.NONE)
-                    icon = self._gtk.PixbufFromIcon("hashtag")
-                    entry.set_icon_from_pixbuf(Gtk.EntryIconPosition.SECONDARY, icon)
-                    entry.connect("icon-press", self.on_icon_pressed)
-                    self.macros[macro]["params"].update({result["param"]: entry})
-
-        for param in self.macros[macro]["params"]:
-            labels.add(Gtk.Label(param))
-            self.macros[macro]["params"][param].connect("touch-event", self.show_keyboard)
-            self.macros[macro]["params"][param].connect("button-press-event", self.show_keyboard)
-            self.macros[macro]["params"][param].connect("focus-out-event", self._screen.remove_keyboard)
-            labels.add(self.macros[macro]["params"][param])
+        if macro.params and self.hashtag is None:
+            self.hashtag = self._gtk.PixbufFromIcon("hashtag")
+        for param in macro.params:
+            entry = Gtk.Entry(placeholder_text=param.default)
+            if param.type_hint == "int":
+                entry.set_input_purpose(Gtk.InputPurpose.DIGITS)
+                entry.set_input_hints(Gtk.InputHints.NO_EMOJI)
+                entry.get_style_context().add_class("active")
+            elif param.type_hint == "float":
+                entry.set_input_purpose(Gtk.InputPurpose.NUMBER)
+                entry.set_input_hints(Gtk.InputHints.EMOJI)
+                entry.get_style_context().add_class("active")
+            else:
+                entry.set_input_purpose(Gtk.InputPurpose.ALPHA)
+                entry.set_input_hints(Gtk.InputHints.NONE)
+            entry.set_icon_from_pixbuf(Gtk.EntryIconPosition.SECONDARY, self.hashtag)
+            entry.connect("icon-press", self.on_icon_pressed)
+            entry.connect("touch-event", self.show_keyboard)
+            entry.connect("button-press-event", self.show_keyboard)
+            entry.connect("focus-out-event", self._screen.remove_keyboard)
+            labels.add(Gtk.Label(param.name))
+            labels.add(entry)
+            self.macros[macro.name]["params"][param.name] = entry
 
     def show_keyboard(self, entry, event):
         self._screen.show_keyboard(entry, event)
@@ -163,32 +150,41 @@ class Panel(ScreenPanel):
         GLib.idle_add(self.reload_macros)
 
     def reload_macros(self):
-        self.labels['macros'].remove_column(0)
-        self.macros = {}
-        self.options = {}
-        self.labels['options'].remove_column(0)
+        catalog = self._printer.macro_catalog
+        section = f"displayed_macros {self._screen.connected_printer}"
+        if catalog is not self.catalog or section != self.options_section:
+            # The config was reloaded, the rows are built again as they are shown
+            self.catalog = catalog
+            self.options_section = section
+            self.macros = {}
+            self.options = {}
+            self.clear_options('options')
+            self.add_options('options', self.options, (
+                (macro, {"name": macro, "section": section, "type": "binary"}) for macro in catalog.listed()
+            ))
         self.load_gcode_macros()
         return False
 
     def load_gcode_macros(self):
-        for macro in self._printer.get_gcode_macros():
-            self.options[macro] = {
-                "name": macro,
-                "section": f"displayed_macros {self._screen.connected_printer}",
-                "type": "binary"
-            }
-            show = self._config.get_config().getboolean(self.options[macro]["section"], macro.lower(), fallback=True)
-            if macro not in self.macros and show:
-                self.add_gcode_macro(macro)
-
-        for macro in list(self.options):
-            self.add_option('options', self.options, macro, self.options[macro])
-        macros = sorted(self.macros, reverse=self.sort_reverse, key=str.casefold)
-        for macro in macros:
-            pos = macros.index(macro)
-            self.labels['macros'].insert_row(pos)
-            self.labels['macros'].attach(self.macros[macro]['row'], 0, pos, 1, 1)
-            self.labels['macros'].show_all()
+        grid = self.labels['macros']
+        for child in grid.get_children():
+            grid.remove(child)
+        config = self._config.get_config()
+        pos = 0
+        for macro in self.catalog.listed(self.sort_reverse):
+            if not config.getboolean(self.options_section, macro.lower(), fallback=True):
+                continue
+            if macro not in self.macros:
+                self.add_gcode_macro(self.catalog.get(macro))
+            grid.attach(self.macros[macro]['row'], 0, pos, 1, 1)
+            pos += 1
+        grid.show_all()
+        self.filter_macros()
+
+    def filter_macros(self, widget=None):
+        text = self.labels['search'].get_text().strip().casefold()
+        for macro, row in self.macros.items():
+            row['row'].set_visible(self.catalog.get(macro).matches(text))
 
     def back(self):
         if len(self.menu) > 1:
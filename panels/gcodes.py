@@ -8,6 +8,7 @@ from gi.repository import Gtk, Pango
 from datetime import datetime
 from ks_includes.screen_panel import ScreenPanel
 from ks_includes.KlippyGtk import find_widget
+from ks_includes.gcode_analyzer import TOOL_NAMES, product_icon
 from ks_includes.widgets.flowboxchild_extended import PrintListItem
 
 
@@ -202,14 +203,8 @@ class Panel(ScreenPanel):
             icon = self._gtk.Button(label=basename)
             if 'filename' in item:
                 icon.connect("clicked", self.confirm_print, path)
-                if "salmon" in item['filename'] or "SALMON" in item['filename']:
-                    image_args = (path, icon, self.thumbsize, False, "salmon")
-                elif "blanco" in item['filename'] or "BLANCO" in item['filename']:
-                    image_args = (path, icon, self.thumbsize, False, "elblanco")
-                elif "prime" in item['filename'] or "cut" in item['filename'] or "PRIME" in item['filename'] or "CUT" in item['filename'] :
-                    image_args = (path, icon, self.thumbsize, False, "primecut")
-                else :
-                    image_args = (path, icon, self.thumbsize, False, "file")
+                icon_name = product_icon(self._files.get_product(path))
+                image_args = (path, icon, self.thumbsize, False, icon_name)
             elif 'dirname' in item:
                 icon.connect("clicked", self.change_dir, path)
                 image_args = (None, icon, self.thumbsize, False, "folder")
@@ -436,10 +431,22 @@ class Panel(ScreenPanel):
             info += _("Size") + f': <b>{self.format_size(fileinfo["size"])}</b>\n'
         if "estimated_time" in fileinfo:
             info += _("Estimated Time") + f': <b>{self.format_time(fileinfo["estimated_time"])}</b>\n'
-        if "job_id" in fileinfo:
-            history = self._screen.apiclient.send_request(f"server/history/job?uid={fileinfo['job_id']}")
-            if history and history['job']['status'] == "completed":
-                info += _("Last Duration") + f": <b>{self.format_time(history['job']['print_duration'])}</b>"
+        info += self.get_analysis_info(filename)
+        if last_duration := self._screen.eta.last_duration(filename):
+            info += _("Last Duration") + f": <b>{self.format_time(last_duration)}</b>"
+        return info
+
+    def get_analysis_info(self, filename):
+        analysis = self._files.get_analysis(filename)
+        if analysis is None:
+            return ""
+        info = _("Product") + f': <b>{analysis["product"]}</b>\n'
+        for tool, used in analysis["extrusion"].items():
+            info += f'    {TOOL_NAMES.get(tool, tool)}: <b>{used / 1000:.2f}</b> m\n'
+        if analysis["tool_changes"]:
+            info += _("Tool changes") + f': <b>{analysis["tool_changes"]}</b>\n'
+        if analysis["layers"]:
+            info += _("Layers") + f': <b>{analysis["layers"]}</b>\n'
         return info
 
     def load_files(self, result, method, params):
@@ -1,14 +1,13 @@
 # -*- coding: utf-8 -*-
 from ks_includes.KlippyGtk import find_widget
+from ks_includes.gcode_analyzer import product_icon
 from ks_includes.screen_panel import ScreenPanel
-from time import time
-from statistics import median
-from math import pi, sqrt, trunc
+from ks_includes.widgets.marquee import Marquee
+from math import pi, trunc
 from gi.repository import GLib, Gtk, Pango
 import logging
 import os
 import json
-from datetime import datetime
 
 import gi
 
@@ -39,14 +38,10 @@ class Panel(ScreenPanel):
         self.req_speed = 0
         self.oheight = 0.0
         self.current_extruder = None
-        self.fila_section = pi * ((1.75 / 2) ** 2)
-        self.filename_label = {'complete': "Filename"}
         self.filename = ""
-        self.prev_pos = None
+        self.changeover_file = None
         self.prev_gpos = None
         self.can_close = False
-        self.flow_timeout = None
-        self.animation_timeout = None
         self.file_metadata = self.fans = {}
         self.state = "standby"
         self.timeleft_type = "auto"
@@ -54,7 +49,6 @@ class Panel(ScreenPanel):
         self.zoffset = 0.0
         self.flowrate = 0.0
         self.vel = 0.0
-        self.flowstore = []
         self.mm = _("mm")
         self.mms = _("mm/s")
         self.mms2 = _("mm/s²")
@@ -104,18 +98,19 @@ class Panel(ScreenPanel):
                 "speed": "-"
             }
 
-        self.labels['file'] = Gtk.Label(label="Filename", hexpand=True)
-        self.labels['file'].get_style_context().add_class("printing-filename")
-        self.labels['file'].set_halign(Gtk.Align.CENTER)  # Center the filename
         self.labels['lcdmessage'] = Gtk.Label(no_show_all=True)
         self.labels['lcdmessage'].get_style_context().add_class("printing-status")
         self.labels['lcdmessage'].set_halign(Gtk.Align.CENTER)  # Center the LCD message too
 
         for label in self.labels:
-            if label not in ['file', 'lcdmessage']:  # Skip filename and LCD message
+            if label != 'lcdmessage':  # Skip LCD message
                 self.labels[label].set_halign(Gtk.Align.START)
             self.labels[label].set_ellipsize(Pango.EllipsizeMode.END)
 
+        # The filename is centered and scrolls when it doesn't fit
+        self.labels['file'] = Marquee(self._screen, "file name", "Filename")
+        self.labels['file'].get_style_context().add_class("printing-filename")
+
         fi_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10, valign=Gtk.Align.CENTER)
         fi_box.add(self.labels['file'])
         fi_box.add(self.labels['lcdmessage'])
@@ -131,10 +126,13 @@ class Panel(ScreenPanel):
         self.labels['darea'] = Gtk.DrawingArea()
         self.labels['darea'].connect("draw", self.on_draw)
 
-        box = Gtk.Box(halign=Gtk.Align.CENTER, valign=Gtk.Align.CENTER)
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, halign=Gtk.Align.CENTER, valign=Gtk.Align.CENTER)
         self.labels['progress_text'] = Gtk.Label(label="0%")
         self.labels['progress_text'].get_style_context().add_class("printing-progress-text")
         box.add(self.labels['progress_text'])
+        self.labels['eta'] = Gtk.Label(no_show_all=True)
+        self.labels['eta'].get_style_context().add_class("printing-status")
+        box.add(self.labels['eta'])
 
         overlay = Gtk.Overlay(hexpand=True, vexpand=True)
         overlay.set_size_request(*(self._gtk.font_size * 15,) * 2)  # Make it larger
@@ -144,9 +142,6 @@ class Panel(ScreenPanel):
         self.grid.attach(overlay, 0, 3, 4, 1)
 
         self.current_extruder = self._printer.get_stat("toolhead", "extruder")
-        if self.current_extruder:
-            diameter = float(self._printer.get_config_section(self.current_extruder)['filament_diameter'])
-            self.fila_section = pi * ((diameter / 2) ** 2)
 
         self.buttons = {}
         self.create_buttons()
@@ -212,9 +207,10 @@ class Panel(ScreenPanel):
                 self.plus_btn.connect("clicked", on_plus_clicked)
                 self.entry.connect("activate", lambda e: on_entry_changed(e))
 
-            def set_value(self, value):
+            def set_value(self, value, notify=True):
                 self.entry.set_text(str(int(value)))
-                self.callback(value)
+                if notify:
+                    self.callback(value)
 
             def get_value(self):
                 try:
@@ -375,14 +371,8 @@ class Panel(ScreenPanel):
         return os.path.join(os.path.dirname(__file__), '..', 'config', 'extrusion_rates.json')
 
     def _read_rates_file(self):
-        path = self._rates_file_path()
-        try:
-            if os.path.exists(path) and os.path.getsize(path) > 0:
-                with open(path, 'r', encoding='utf-8') as f:
-                    return json.load(f) or {}
-        except Exception:
-            logging.debug("Failed to read extrusion rates file; proceeding with empty data")
-        return {}
+        # Cached by the production queue, only read again when the file changes
+        return self._screen.production.saved_rates()
 
     def _write_rates_file(self, data):
         path = self._rates_file_path()
@@ -510,10 +500,7 @@ class Panel(ScreenPanel):
         return self.state in ["printing", "paused"]
 
     def activate(self):
-        if self.flow_timeout is None:
-            self.flow_timeout = GLib.timeout_add_seconds(2, self.update_flow)
-        if self.animation_timeout is None:
-            self.animation_timeout = GLib.timeout_add(500, self.animate_label)
+        self._screen.scheduler.add("flow", 2, self.update_flow, owner=self.content)
 
         # Force apply current default extrusion rates to printer when panel activates
         self.force_apply_default_rates()
@@ -538,13 +525,10 @@ class Panel(ScreenPanel):
             logging.error(f"Failed to force apply default rates: {e}")
 
     def deactivate(self):
-        if self.flow_timeout is not None:
+        self.labels['file'].stop_scrolling(None)
+        if "flow" in self._screen.scheduler:
             self.record_print_start_time()
-            GLib.source_remove(self.flow_timeout)
-            self.flow_timeout = None
-        if self.animation_timeout is not None:
-            GLib.source_remove(self.animation_timeout)
-            self.animation_timeout = None
+            self._screen.scheduler.remove("flow")
 
     def create_buttons(self):
 
@@ -595,14 +579,19 @@ class Panel(ScreenPanel):
             self.can_close = True  # Enable closing
             self.close_panel()
         else:
-            # Restart the print
+            # Start the next cycle of the production queue, the same file if nothing is planned
             if self.filename:
-                logging.info(f"Restarting print after quality selection: {self.filename}")
-                if self.state == "error":
-                    self._screen._ws.klippy.gcode_script("SDCARD_RESET_FILE")
-                self._screen._ws.klippy.print_start(self.filename)
-                self.record_print_start_time()
-                self.new_print()
+                job = self._screen.production.changeover(self.filename, Panel._temp_rates, self.state == "error")
+                if job is None:
+                    self.can_close = True
+                    self.close_panel()
+                    return
+                logging.info(f"Next cycle after quality selection: {job.filename}")
+                # The rates were sent with the changeover
+                self.changeover_file = job.filename
+                self.orange_input.set_value(job.rates['orange'], notify=False)
+                self.white_input.set_value(job.rates['white'], notify=False)
+                self.new_print(rates_applied=True)
             else:
                 logging.info(f"Could not restart {self.filename}")
 
@@ -610,43 +599,8 @@ class Panel(ScreenPanel):
         """Save quality history with good and bad print counts"""
         if not self.filename:
             return
-
-        history_file = os.path.join(os.path.dirname(__file__), '..', 'config', 'history.json')
-        today = datetime.now().strftime("%Y-%m-%d")
-
-        try:
-            # Read existing history
-            if os.path.exists(history_file) and os.path.getsize(history_file) > 0:
-                with open(history_file, 'r', encoding='utf-8') as f:
-                    history_data = json.load(f)
-            else:
-                history_data = {}
-
-            # Check if it's the first entry for today (new date)
-            is_new_day = today not in history_data
-
-            # Initialize date entry if it doesn't exist
-            if is_new_day:
-                history_data[today] = {}
-                # Clean old entries (more than 30 days) when adding a new date
-                self.clean_old_history_entries(history_data, today)
-
-            # Initialize filename entry if it doesn't exist
-            if self.filename not in history_data[today]:
-                history_data[today][self.filename] = {"good": 0, "bad": 0}
-
-            # Add the new counts
-            history_data[today][self.filename]["good"] += good_prints
-            history_data[today][self.filename]["bad"] += bad_prints
-
-            # Save the updated history
-            with open(history_file, 'w', encoding='utf-8') as f:
-                json.dump(history_data, f, indent=2, ensure_ascii=False)
-
-            logging.info(f"Quality history saved: {self.filename} - {today} - Good: {good_prints}, Bad: {bad_prints}")
-
-        except Exception as e:
-            logging.error(f"Error while saving quality history: {e}")
+        if self._screen.analytics.record_quality(self.filename, good_prints, bad_prints):
+            logging.info(f"Quality history saved: {self.filename} - Good: {good_prints}, Bad: {bad_prints}")
 
     def _load_product_defaults(self):
         cfg = self._read_rates_file()
@@ -659,35 +613,6 @@ class Panel(ScreenPanel):
                 if 'white' in val:
                     self.product_extrusion_rates[key]['white'] = val['white']
 
-    def clean_old_history_entries(self, history_data, current_date):
-        """Clean history entries older than 30 days"""
-        try:
-            from datetime import datetime, timedelta
-
-            current_date_obj = datetime.strptime(current_date, "%Y-%m-%d")
-            cutoff_date = current_date_obj - timedelta(days=30)
-
-            dates_to_remove = []
-            for date_str in history_data.keys():
-                try:
-                    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-                    if date_obj < cutoff_date:
-                        dates_to_remove.append(date_str)
-                except ValueError:
-                    # Skip invalid date formats
-                    logging.warning(f"Invalid date format in history: {date_str}")
-                    continue
-
-            if dates_to_remove:
-                for old_date in dates_to_remove:
-                    del history_data[old_date]
-                logging.info(f"Cleaned {len(dates_to_remove)} old history entries older than 30 days: {dates_to_remove}")
-            else:
-                logging.debug("No old history entries to clean")
-
-        except Exception as e:
-            logging.error(f"Error while cleaning old history entries: {e}")
-
     def save_offset(self, widget, device):
         sign = "+" if self.zoffset > 0 else "-"
         label = Gtk.Label(hexpand=True, vexpand=True, wrap=True)
@@ -785,7 +710,7 @@ class Panel(ScreenPanel):
         for arg in args:
             self.buttons[arg].set_sensitive(False)
 
-    def new_print(self):
+    def new_print(self, rates_applied=False):
         self._screen.screensaver.close()
         if "virtual_sdcard" in self._printer.data:
             logging.info("reseting progress")
@@ -796,7 +721,8 @@ class Panel(ScreenPanel):
         self.update_progress(0.0)
         # Reset the last print checkbox for next time
         self.last_print_checkbox.set_active(False)
-        self.force_apply_default_rates()
+        if not rates_applied:
+            self.force_apply_default_rates()
 
         self.set_state("printing")
 
@@ -811,6 +737,14 @@ class Panel(ScreenPanel):
             return
         elif action == "notify_metadata_update" and data['filename'] == self.filename:
             self.get_file_metadata(response=True)
+        elif action == "notify_eta_update":
+            if data['filename'] == self.filename:
+                self.update_time_left(data)
+            return
+        elif action == "notify_gcode_analysis" and data['filename'] == self.filename:
+            icon_name = self.get_file_icon(self.filename)
+            self.labels['file_icon'].set_from_pixbuf(self._screen.production.icon(icon_name, self._gtk.font_size * 12))
+            return
         elif action != "notify_status_update":
             return
 
@@ -852,19 +786,8 @@ class Panel(ScreenPanel):
             if 'homing_origin' in data['gcode_move']:
                 self.zoffset = float(data['gcode_move']['homing_origin'][2])
         if 'motion_report' in data:
-            if 'live_position' in data['motion_report']:
-                pos = data["motion_report"]["live_position"]
-                now = time()
-                if self.prev_pos is not None:
-                    interval = (now - self.prev_pos[1])
-                    # Calculate Flowrate
-                    evelocity = (pos[3] - self.prev_pos[0][3]) / interval
-                    self.flowstore.append(self.fila_section * evelocity)
-                self.prev_pos = [pos, now]
             if 'live_velocity' in data['motion_report']:
                 self.vel = float(data["motion_report"]["live_velocity"])
-            if 'live_extruder_velocity' in data['motion_report']:
-                self.flowstore.append(self.fila_section * float(data["motion_report"]["live_extruder_velocity"]))
 
         # Remove fan processing since we don't display it anymore
         if "print_stats" in data:
@@ -884,51 +807,24 @@ class Panel(ScreenPanel):
             if 'total_duration' in data["print_stats"]:
                 # Keep duration but don't display it
                 pass
-            if self.state in ["printing", "paused"]:
-                self.update_time_left()
 
     def update_flow(self):
-        if not self.flowstore:
-            self.flowstore.append(0)
-        self.flowrate = median(self.flowstore)
-        self.flowstore = []
-        # Remove button updates since we don't have those buttons anymore
+        # Samples are collected by the screen flow telemetry from live_extruder_velocity
+        self.flowrate = self._screen.flow_telemetry.get_flow(self.current_extruder)
+        self.labels['flowrate'].set_label(f"{self.flowrate:.1f} {self.mms3}")
         return True
 
-    def update_time_left(self):
-        progress = (
-            max(self._printer.get_stat('virtual_sdcard', 'file_position') - self.file_metadata['gcode_start_byte'], 0)
-            / (self.file_metadata['gcode_end_byte'] - self.file_metadata['gcode_start_byte'])
-        ) if "gcode_start_byte" in self.file_metadata else self._printer.get_stat('virtual_sdcard', 'progress')
-
-        # Remove button label updates since we don't have those buttons anymore
-        # Just keep the progress calculation
-        self.update_progress(progress)
-
-    def estimate_time(self, progress, print_duration, file_time, filament_time, slicer_time, last_time):
-        estimate_above = 0.3
-        slicer_time /= sqrt(self.speed_factor)
-        if progress <= estimate_above:
-            return last_time or slicer_time or filament_time or file_time
-        objects = self._printer.get_stat("exclude_object", "objects")
-        excluded_objects = self._printer.get_stat("exclude_object", "excluded_objects")
-        exclude_compensation = 3 * (len(excluded_objects) / len(objects)) if len(objects) > 0 else 0
-        weight_last = 4.0 - exclude_compensation if print_duration < last_time else 0
-        weight_slicer = 1.0 + estimate_above - progress - exclude_compensation if print_duration < slicer_time else 0
-        weight_filament = min(progress - estimate_above, 0.33) if print_duration < filament_time else 0
-        weight_file = progress - estimate_above
-        total_weight = weight_last + weight_slicer + weight_filament + weight_file
-        if total_weight == 0:
-            return 0
-        return (
-            (
-                last_time * weight_last
-                + slicer_time * weight_slicer
-                + filament_time * weight_filament
-                + file_time * weight_file
-            )
-            / total_weight
-        )
+    def update_time_left(self, eta):
+        # Published by the screen eta service every few seconds while printing
+        self.update_progress(eta['progress'])
+        self.labels['duration'].set_label(self.format_time(eta['elapsed']))
+        self.labels['est_time'].set_label(self.format_time(eta['total']))
+        self.labels['time_left'].set_label(self.format_eta(eta['total'], eta['elapsed']))
+        if eta['remaining'] is not None and self.state in ("printing", "paused"):
+            self.labels['eta'].set_label(self.labels['time_left'].get_label())
+            self.labels['eta'].show()
+        else:
+            self.labels['eta'].hide()
 
     def update_progress(self, progress: float):
         self.progress = progress
@@ -969,6 +865,8 @@ class Panel(ScreenPanel):
         if self.state != state:
             logging.debug(f"Changing job_status state from '{self.state}' to '{state}'")
             self.state = state
+            if state not in ("printing", "paused"):
+                self.labels['eta'].hide()
             if self.thumb_dialog:
                 self.close_dialog(self.thumb_dialog)
         self.show_buttons_for_state()
@@ -1070,92 +968,44 @@ class Panel(ScreenPanel):
 
     def update_filename(self, filename):
         if not filename or filename == self.filename:
+            if filename and filename == self.changeover_file:
+                # The same file again, its rates were not changed
+                self.changeover_file = None
             return
 
         self.filename = filename
         logging.debug(f"Updating filename to {filename}")
 
-        # Load product-specific rates from JSON based on new filename
+        # Load product-specific rates, the session rates take precedence over the saved ones
         product_key = self._get_product_key(filename)
-        data = self._read_rates_file()
+        rates = self._screen.production.rates_for(product_key, Panel._temp_rates)
+        orange_rate = rates['orange']
+        white_rate = rates['white']
 
-        # Check for temporary session rates first
-        if product_key in Panel._temp_rates:
-            rates = Panel._temp_rates[product_key]
-            orange_rate = rates.get('orange', None)
-            white_rate = rates.get('white', None)
-        else:
-            orange_rate = None
-            white_rate = None
-
-        # If no temp rates, load from JSON
-        if orange_rate is None:
-            if product_key in data and 'orange' in data[product_key]:
-                orange_rate = data[product_key]['orange']
-            else:
-                orange_rate = data['orange']
-
-        if white_rate is None:
-            if product_key in data and 'white' in data[product_key]:
-                white_rate = data[product_key]['white']
-            else:
-                white_rate = data['white']
-
-        # Apply the rates to the inputs
-        self.orange_input.set_value(orange_rate)
-        self.white_input.set_value(white_rate)
+        # Apply the rates to the inputs, a changeover already sent them to the printer
+        notify = filename != self.changeover_file
+        self.changeover_file = None
+        self.orange_input.set_value(orange_rate, notify=notify)
+        self.white_input.set_value(white_rate, notify=notify)
 
         logging.info(f"FILENAME UPDATED: {filename} → Product: {product_key} → Orange: {orange_rate}%, White: {white_rate}%")
         self.labels["file"].set_label(os.path.splitext(self.filename)[0])
 
         # Update the file icon based on filename
         icon_name = self.get_file_icon(self.filename)
-        self.labels['file_icon'].set_from_pixbuf(self._gtk.PixbufFromIcon(icon_name, self._gtk.font_size * 12))  # Updated to match creation size
-
-        self.filename_label = {
-            "complete": self.labels['file'].get_label(),
-            "current": self.labels['file'].get_label(),
-        }
+        self.labels['file_icon'].set_from_pixbuf(self._screen.production.icon(icon_name, self._gtk.font_size * 12))
 
         self.get_file_metadata()
 
     def _get_product_key(self, filename=None):
-        # Helper to get the product key from filename
-        fname = filename or self.filename or ""
-        fname = fname.lower()
-        if "salmon" in fname:
-            return "Salmon"
-        elif "blanco" in fname:
-            return "EL BLANCO"
-        elif "veganvita" in fname:
-            return "VEGANVITA"
-        elif "prime" in fname or "cut" in fname:
-            return "PRIME CUT"
-        else:
-            return "UNKNOWN"
-
-    def animate_label(self):
-        if ellipsized := self.labels['file'].get_layout().is_ellipsized():
-            self.filename_label['current'] = self.filename_label['current'][1:]
-            self.labels['file'].set_label(self.filename_label['current'] + " " * 6)
-        else:
-            self.filename_label['current'] = self.filename_label['complete']
-            self.labels['file'].set_label(self.filename_label['complete'])
-        return True
+        # Helper to get the product key from the gcode analysis or the filename
+        return self._files.get_product(filename or self.filename or "")
 
     def get_file_icon(self, filename):
-        """Determine the appropriate icon based on filename keywords"""
+        """Determine the appropriate icon based on the detected product"""
         if not filename:
             return "file"
-        filename_lower = filename.lower()
-        if "salmon" in filename_lower:
-            return "salmon"
-        elif "blanco" in filename_lower:
-            return "elblanco"
-        elif "prime" in filename_lower or "cut" in filename_lower:
-            return "primecut"
-        else:
-            return "file"
+        return product_icon(self._files.get_product(filename))
 
     def get_file_metadata(self, response=False):
         if self._files.file_metadata_exists(self.filename):
@@ -1178,7 +1028,3 @@ class Panel(ScreenPanel):
             self.labels['height'].set_label(f"{self.oheight:.2f} {self.mm}")
         if "filament_total" in self.file_metadata:
             self.labels['filament_total'].set_label(f"{float(self.file_metadata['filament_total']) / 1000:.1f} m")
-        if "job_id" in self.file_metadata and self.file_metadata['job_id']:
-            history = self._screen.apiclient.send_request(f"server/history/job?uid={self.file_metadata['job_id']}")
-            if history and history['job']['status'] == "completed" and history['job']['print_duration']:
-                self.file_metadata["last_time"] = history['job']['print_duration']
@@ -3,7 +3,7 @@ import logging
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, GLib
+from gi.repository import Gtk
 from panels.menu import Panel as MenuPanel
 from ks_includes.widgets.heatergraph import HeaterGraph
 from ks_includes.widgets.keypad import Keypad
@@ -15,7 +15,6 @@ class Panel(MenuPanel):
         super().__init__(screen, title, items)
         self.left_panel = None
         self.devices = {}
-        self.graph_update = None
         self.active_heater = None
         self.h = self.f = 0
         self.main_menu = Gtk.Grid(row_homogeneous=True, column_homogeneous=True, hexpand=True, vexpand=True)
@@ -40,6 +39,12 @@ class Panel(MenuPanel):
             self.main_menu.attach(scroll, 1, 0, 1, 1)
         self.content.add(self.main_menu)
 
+    def retranslate(self):
+        if self.numpad_visible:
+            return False
+        self.labels.pop("keypad", None)
+        return super().retranslate()
+
     def update_graph_visibility(self, force_hide=False):
         if self.left_panel is None:
             logging.info("No left panel")
@@ -60,14 +65,11 @@ class Panel(MenuPanel):
                 self.left_panel.add(self.labels['da'])
             self.labels['da'].queue_draw()
             self.labels['da'].show()
-            if self.graph_update is None:
-                # This has a high impact on load
-                self.graph_update = GLib.timeout_add_seconds(5, self.update_graph)
+            # This has a high impact on load
+            self._screen.scheduler.add("main menu graph", 5, self.update_graph, owner=self.labels['da'])
         elif self.labels['da'] in self.left_panel:
             self.left_panel.remove(self.labels['da'])
-            if self.graph_update is not None:
-                GLib.source_remove(self.graph_update)
-                self.graph_update = None
+            self._screen.scheduler.remove("main menu graph")
         return False
 
     def activate(self):
@@ -76,9 +78,7 @@ class Panel(MenuPanel):
         self.update_graph_visibility()
 
     def deactivate(self):
-        if self.graph_update is not None:
-            GLib.source_remove(self.graph_update)
-            self.graph_update = None
+        self._screen.scheduler.remove("main menu graph")
         if self.active_heater is not None:
             self.hide_numpad()
 
@@ -227,7 +227,7 @@ class Panel(MenuPanel):
         self.labels['devices'].get_style_context().add_class('heater-grid')
 
         name = Gtk.Label()
-        temp = Gtk.Label(label=_("Temp (°C)"))
+        temp = self.translatable(Gtk.Label(), "Temp (°C)")
 
         self.labels['devices'].attach(name, 0, 0, 1, 1)
         self.labels['devices'].attach(temp, 1, 0, 1, 1)
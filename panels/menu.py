@@ -11,18 +11,24 @@ from ks_includes.widgets.autogrid import AutoGrid
 
 
 class Panel(ScreenPanel):
+    retranslatable = True
 
     def __init__(self, screen, title, items=None):
         super().__init__(screen, title)
         self.items = items
-        self.j2_data = self._printer.get_printer_status_data()
+        self.j2_data = self.get_j2_data()
         self.create_menu_items()
         self.scroll = self._gtk.ScrolledWindow()
         self.scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         self.autogrid = AutoGrid()
 
+    def get_j2_data(self):
+        data = self._printer.get_printer_status_data()
+        data["screen"] = {"profiler": self._screen.profiler is not None}
+        return data
+
     def activate(self):
-        self.j2_data = self._printer.get_printer_status_data()
+        self.j2_data = self.get_j2_data()
         self.add_content()
 
     def add_content(self):
@@ -88,6 +94,13 @@ class Panel(ScreenPanel):
                 b.connect("clicked", self._screen._go_to_submenu, key)
             self.labels[key] = b
 
+    def retranslate(self):
+        for item in self.items:
+            key = list(item)[0]
+            name = self._screen.env.from_string(item[key]['name']).render(self.j2_data)
+            self.labels[key].set_label(name.replace("\n", " "))
+        return super().retranslate()
+
     def evaluate_enable(self, enable):
         if enable == "{{ moonraker_connected }}":
             logging.info(f"moonraker connected {self._screen._ws.connected}")
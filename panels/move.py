@@ -5,7 +5,7 @@ import gi
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk
-from ks_includes.KlippyGcodes import KlippyGcodes
+from ks_includes.jog_controller import JogController
 from ks_includes.screen_panel import ScreenPanel
 
 
@@ -37,12 +37,10 @@ class Panel(ScreenPanel):
             "home": self._gtk.Button("home", _("Home"), "blue_move"),
             "motors_off": self._gtk.Button("motor-off", _("Disable Motors"), "blue_move"),
         }
-        self.buttons["x+"].connect("clicked", self.move, "X", "+")
-        self.buttons["x-"].connect("clicked", self.move, "X", "-")
-        self.buttons["y+"].connect("clicked", self.move, "Y", "+")
-        self.buttons["y-"].connect("clicked", self.move, "Y", "-")
-        self.buttons["z+"].connect("clicked", self.move, "Z", "+")
-        self.buttons["z-"].connect("clicked", self.move, "Z", "-")
+        self.jog = JogController(self._screen)
+        for button in ("x+", "x-", "y+", "y-", "z+", "z-"):
+            self.buttons[button].connect("pressed", self.move, button[0].upper(), button[1])
+            self.buttons[button].connect("released", self.stop_move)
         self.buttons["home"].connect("clicked", self.home)
         script = {"script": "M18"}
         self.buttons["motors_off"].connect(
@@ -194,12 +192,9 @@ class Panel(ScreenPanel):
         self.labels["options_menu"] = self._gtk.ScrolledWindow()
         self.labels["options"] = Gtk.Grid()
         self.labels["options_menu"].add(self.labels["options"])
-        self.options = {}
-        for option in configurable_options:
-            name = list(option)[0]
-            self.options.update(
-                self.add_option("options", self.settings, name, option[name])
-            )
+        self.options = self.add_options(
+            "options", self.settings, (next(iter(option.items())) for option in configurable_options)
+        )
 
     def reinit_panels(self, value):
         self._screen.panels_reinit.append("bed_level")
@@ -210,9 +205,13 @@ class Panel(ScreenPanel):
         self._screen.panels_reinit.append("zcalibrate")
         self.menu.clear()
 
+    def deactivate(self):
+        self.jog.stop()
+
     def process_update(self, action, data):
         if action != "notify_status_update":
             return
+        self.jog.process_update(data)
         if "toolhead" in data and "max_velocity" in data["toolhead"]:
             max_vel = max(int(float(data["toolhead"]["max_velocity"])), 2)
             adj = self.options["move_speed_xy"].get_adjustment()
@@ -249,7 +248,7 @@ class Panel(ScreenPanel):
         ):
             direction = "-" if direction == "+" else "+"
 
-        dist = f"{direction}{self.distance}"
+        dist = float(f"{direction}{self.distance}")
         config_key = "move_speed_z" if axis == "z" else "move_speed_xy"
         speed = (
             None
@@ -258,11 +257,10 @@ class Panel(ScreenPanel):
         )
         if speed is None:
             speed = self._config.get_config()["main"].getint(config_key, self.max_z_velocity)
-        speed = 60 * max(1, speed)
-        script = f"{KlippyGcodes.MOVE_RELATIVE}\nG0 {axis}{dist} F{speed}"
-        self._screen._send_action(widget, "printer.gcode.script", {"script": script})
-        if self._printer.get_stat("gcode_move", "absolute_coordinates"):
-            self._screen._ws.klippy.gcode_script("G90")
+        self.jog.press(axis, dist, max(1, speed))
+
+    def stop_move(self, widget):
+        self.jog.release()
 
     def home(self, widget):
         if "delta" in self._printer.get_config_section("printer")["kinematics"]:
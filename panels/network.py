@@ -44,7 +44,6 @@ class Panel(ScreenPanel):
             self.content.add(self.error_box)
             self._screen.panels_reinit.append(self._screen._cur_panels[-1])
             return
-        self.update_timeout = None
         self.network_list = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, hexpand=True, vexpand=True)
         self.network_rows = {}
         self.networks = {}
@@ -96,8 +95,6 @@ class Panel(ScreenPanel):
             self.labels['main_box'].pack_start(sbox, False, False, 5)
             GLib.idle_add(self.load_networks)
             scroll.add(self.network_list)
-            self.sdbus_nm.enable_monitoring(True)
-            self.conn_status = GLib.timeout_add_seconds(1, self.sdbus_nm.monitor_connection_status)
         else:
             self._screen.show_popup_message(_("No wireless interface has been found"), level=2)
             self.labels['networkinfo'] = Gtk.Label()
@@ -420,26 +417,29 @@ class Panel(ScreenPanel):
     def activate(self):
         if self.sdbus_nm is None:
             return
-        if self.update_timeout is None:
+        if "network" not in self._screen.scheduler:
             if self.sdbus_nm.wifi:
                 if self.reload_button.get_sensitive():
                     self._gtk.Button_busy(self.reload_button, True)
                     self.sdbus_nm.rescan()
                     self.load_networks()
                 self.update_all_networks()
-                self.update_timeout = GLib.timeout_add_seconds(5, self.update_all_networks)
+                self._screen.scheduler.add("network", 5, self.update_all_networks, owner=self.content)
+                self.sdbus_nm.enable_monitoring(True)
+                self._screen.scheduler.add(
+                    "network status", 1, self.sdbus_nm.monitor_connection_status, owner=self.content
+                )
             else:
                 self.update_single_network_info()
-                self.update_timeout = GLib.timeout_add_seconds(5, self.update_single_network_info)
+                self._screen.scheduler.add("network", 5, self.update_single_network_info, owner=self.content)
 
     def deactivate(self):
         if self.sdbus_nm is None:
             return
-        if self.update_timeout is not None:
-            GLib.source_remove(self.update_timeout)
-            self.update_timeout = None
+        self._screen.scheduler.remove("network")
         if self.sdbus_nm.wifi:
             self.sdbus_nm.enable_monitoring(False)
+            self._screen.scheduler.remove("network status")
 
     def toggle_wifi(self, switch, gparams):
         enable = switch.get_active()
@@ -38,6 +38,10 @@ class Panel(ScreenPanel):
         self._screen.connect_printer(name)
 
     def activate(self):
+        if self._screen.printer_pool is not None:
+            # The connection stays open in the background, selecting the printer again is instant
+            self._screen.printer_pool.deactivate()
+            return
         if self._screen._ws and self._screen._ws.connected:
             self._screen.close_websocket()
             logging.debug("Waiting for disconnect")
@@ -0,0 +1,124 @@
+import os
+from bisect import bisect_left
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, Pango
+from ks_includes.screen_panel import ScreenPanel
+
+
+class Panel(ScreenPanel):
+    def __init__(self, screen, title):
+        title = title or _("Production Queue")
+        super().__init__(screen, title)
+        self.queue = self._screen.production
+        # Sorted filenames of the rows in the files grid
+        self.file_rows = []
+
+        self.labels['summary'] = Gtk.Label(hexpand=True, wrap=True)
+        self.labels['recipes'] = Gtk.Grid(row_spacing=5, column_spacing=5)
+        self.labels['files'] = Gtk.Grid(row_spacing=5, column_spacing=5)
+
+        clear = self._gtk.Button("delete", _("Clear"), "color1", self.bts, Gtk.PositionType.LEFT, 1)
+        clear.set_hexpand(False)
+        clear.connect("clicked", self.clear)
+        header = Gtk.Box(spacing=5)
+        header.pack_start(self.labels['summary'], True, True, 0)
+        header.pack_start(clear, False, False, 0)
+
+        add_title = Gtk.Label(halign=Gtk.Align.START)
+        add_title.set_markup(f"<b>{_('Add')}</b>")
+
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        box.add(self.labels['recipes'])
+        box.add(add_title)
+        box.add(self.labels['files'])
+        scroll = self._gtk.ScrolledWindow()
+        scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scroll.add(box)
+
+        main = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+        main.pack_start(header, False, False, 0)
+        main.pack_start(scroll, True, True, 0)
+        self.content.add(main)
+
+    def activate(self):
+        self.load_files()
+        self.load_recipes()
+
+    def _name_label(self, filename):
+        return Gtk.Label(
+            label=os.path.splitext(filename)[0], hexpand=True, halign=Gtk.Align.START,
+            ellipsize=Pango.EllipsizeMode.END
+        )
+
+    def _small_button(self, icon, style, callback, *args):
+        button = self._gtk.Button(icon, None, style, self.bts)
+        button.set_hexpand(False)
+        button.connect("clicked", callback, *args)
+        return button
+
+    def load_recipes(self):
+        grid = self.labels['recipes']
+        for child in grid.get_children():
+            grid.remove(child)
+        current = self.queue.current()
+        for i, recipe in enumerate(self.queue.recipes):
+            name = self._name_label(recipe.filename)
+            if recipe is current:
+                name.get_style_context().add_class("active")
+            count = Gtk.Label(label=f"{recipe.done} / {recipe.cycles}")
+            grid.attach(name, 0, i, 1, 1)
+            grid.attach(count, 1, i, 1, 1)
+            grid.attach(self._small_button("decrease", "color1", self.change_cycles, i, -1), 2, i, 1, 1)
+            grid.attach(self._small_button("increase", "color2", self.change_cycles, i, 1), 3, i, 1, 1)
+            grid.attach(self._small_button("delete", "color3", self.remove, i), 4, i, 1, 1)
+        self.update_summary()
+        grid.show_all()
+
+    def load_files(self):
+        grid = self.labels['files']
+        files = self._files.files
+        removed = [filename for filename in self.file_rows if filename not in files]
+        for filename in removed:
+            row = bisect_left(self.file_rows, filename)
+            grid.remove_row(row)
+            del self.file_rows[row]
+        shown = set(self.file_rows)
+        added = [filename for filename in files if filename not in shown]
+        for filename in added:
+            row = bisect_left(self.file_rows, filename)
+            grid.insert_row(row)
+            grid.attach(self._name_label(filename), 0, row, 1, 1)
+            grid.attach(self._small_button("increase", "color4", self.add, filename), 1, row, 1, 1)
+            self.file_rows.insert(row, filename)
+        if added:
+            grid.show_all()
+
+    def update_summary(self):
+        if not self.queue.recipes:
+            summary = _("Nothing planned, finished files are repeated")
+        else:
+            summary = _("Cycles left") + f": {self.queue.remaining()}"
+        idle = self.queue.idle_stats()
+        if idle is not None:
+            summary += "\n" + _("Idle between cycles") + f": {self.format_time(idle[0])} " \
+                + f"({_('average')} {self.format_time(idle[1])}, {_('today')} {self.format_time(idle[2])})"
+        self.labels['summary'].set_label(summary)
+
+    def add(self, widget, filename):
+        self.queue.add(filename)
+        self.load_recipes()
+
+    def remove(self, widget, index):
+        self.queue.remove(index)
+        self.load_recipes()
+
+    def change_cycles(self, widget, index, delta):
+        self.queue.set_cycles(index, self.queue.recipes[index].cycles + delta)
+        self.load_recipes()
+
+    def clear(self, widget):
+        self.queue.clear()
+        self.load_recipes()
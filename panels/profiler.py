@@ -0,0 +1,121 @@
+import datetime
+from time import time
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib, Gtk, Pango
+from ks_includes.screen_panel import ScreenPanel
+
+ROWS = 15
+
+
+class Panel(ScreenPanel):
+    def __init__(self, screen, title):
+        title = title or _("Profiler")
+        super().__init__(screen, title)
+        self.profiler = self._screen.profiler
+        if self.profiler is None:
+            self.content.add(Gtk.Label(
+                label=_("The profiler is off") + "\n\n" + _("Set profile_main_loop: True in [main] to enable it"),
+                vexpand=True, wrap=True, justify=Gtk.Justification.CENTER
+            ))
+            return
+
+        self.labels['summary'] = Gtk.Label(hexpand=True, halign=Gtk.Align.START, wrap=True)
+        reset = self._gtk.Button("refresh", _("Reset"), "color1", self.bts, Gtk.PositionType.LEFT, 1)
+        reset.set_hexpand(False)
+        reset.connect("clicked", self.reset)
+        header = Gtk.Box(spacing=5)
+        header.pack_start(self.labels['summary'], True, True, 0)
+        header.pack_start(reset, False, False, 0)
+
+        self.labels['tasks'] = Gtk.Grid(row_spacing=2, column_spacing=10)
+        self.labels['callbacks'] = Gtk.Grid(row_spacing=2, column_spacing=10)
+        self.labels['frames'] = Gtk.Grid(row_spacing=2, column_spacing=10)
+        self.labels['stalls'] = Gtk.Grid(row_spacing=2, column_spacing=10)
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        for name, title in (
+            ('tasks', _("Tasks")), ('callbacks', _("Callbacks")), ('frames', _("Frames")), ('stalls', _("Stalls"))
+        ):
+            label = Gtk.Label(halign=Gtk.Align.START)
+            label.set_markup(f"<b>{title}</b>")
+            box.add(label)
+            box.add(self.labels[name])
+        scroll = self._gtk.ScrolledWindow()
+        scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scroll.add(box)
+
+        main = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+        main.pack_start(header, False, False, 0)
+        main.pack_start(scroll, True, True, 0)
+        self.content.add(main)
+
+    def activate(self):
+        if self.profiler is None:
+            return
+        self.refresh()
+        self._screen.scheduler.add("profiler", 2, self.refresh, owner=self.content)
+
+    def deactivate(self):
+        self._screen.scheduler.remove("profiler")
+
+    @staticmethod
+    def _clear(grid):
+        for child in grid.get_children():
+            grid.remove(child)
+
+    @staticmethod
+    def _row(grid, row, cells):
+        for column, text in enumerate(cells):
+            label = Gtk.Label(label=text, halign=Gtk.Align.END if column else Gtk.Align.START)
+            if not column:
+                label.set_hexpand(True)
+                label.set_ellipsize(Pango.EllipsizeMode.START)
+            grid.attach(label, column, row, 1, 1)
+
+    def _table(self, grid, histograms):
+        self._clear(grid)
+        self._row(grid, 0, ("", _("Count"), "ms", "p95", "max"))
+        for row, (name, histogram) in enumerate(self.profiler.top(histograms, ROWS), start=1):
+            self._row(grid, row, (
+                name, f"{histogram.count}", f"{histogram.mean:.1f}",
+                f"{histogram.percentile(.95):.0f}", f"{histogram.max:.0f}"
+            ))
+        grid.show_all()
+
+    def refresh(self):
+        self.labels['summary'].set_label(
+            _("Stalls") + f": {len(self.profiler.stalls)} (> {self.profiler.stall_ms} ms) "
+            + f"{self.format_time(time() - self.profiler.started)}"
+        )
+        self._table(self.labels['tasks'], self._screen.scheduler.stats)
+        self._table(self.labels['callbacks'], self.profiler.callbacks)
+        self._table(self.labels['frames'], self.profiler.frames)
+
+        grid = self.labels['stalls']
+        self._clear(grid)
+        for row, stall in enumerate(reversed(self.profiler.stalls)):
+            when = datetime.datetime.fromtimestamp(stall.time).strftime("%H:%M:%S")
+            self._row(grid, row, (stall.source, when, f"{stall.ms:.0f} ms"))
+            if stall.stack:
+                button = self._gtk.Button("info", None, "color3", self.bts)
+                button.set_hexpand(False)
+                button.connect("clicked", self.show_stack, stall)
+                grid.attach(button, 3, row, 1, 1)
+        grid.show_all()
+        return True
+
+    def show_stack(self, widget, stall):
+        label = Gtk.Label(halign=Gtk.Align.START, selectable=True)
+        label.set_markup(f"<tt>{GLib.markup_escape_text(''.join(stall.stack))}</tt>")
+        scroll = self._gtk.ScrolledWindow()
+        scroll.add(label)
+        self._gtk.Dialog(f"{stall.source} {stall.ms:.0f} ms", None, scroll, self.close_stack)
+
+    def close_stack(self, dialog, response_id):
+        self._gtk.remove_dialog(dialog)
+
+    def reset(self, widget):
+        self.profiler.reset()
+        self.refresh()
@@ -6,11 +6,25 @@ from ks_includes.screen_panel import ScreenPanel
 
 
 class Panel(ScreenPanel):
+    retranslatable = True
+
     def __init__(self, screen, title):
         title = title or _("Settings")
         super().__init__(screen, title)
-        self.printers = self.settings = self.langs = {}
+        self.printers = {}
+        self.settings = {}
+        self.langs = {}
         self.menu = ['settings_menu']
+        self.labels['settings_menu'] = self._gtk.ScrolledWindow()
+        self.labels['settings'] = Gtk.Grid()
+        self.labels['settings_menu'].add(self.labels['settings'])
+        self.add_settings()
+        self.menu_builders['lang'] = self.build_lang_menu
+        self.menu_builders['printers'] = self.build_printers_menu
+
+        self.content.add(self.labels['settings_menu'])
+
+    def add_settings(self):
         options = self._config.get_configurable_options().copy()
         options.append({"printers": {
             "name": _("Printer Connections"),
@@ -22,13 +36,16 @@ class Panel(ScreenPanel):
             "type": "menu",
             "menu": "lang"
         }})
-        self.labels['settings_menu'] = self._gtk.ScrolledWindow()
-        self.labels['settings'] = Gtk.Grid()
-        self.labels['settings_menu'].add(self.labels['settings'])
-        for option in options:
-            name = list(option)[0]
-            self.add_option('settings', self.settings, name, option[name])
+        self.add_options('settings', self.settings, (next(iter(option.items())) for option in options))
 
+    def retranslate(self):
+        # The configurable options were created again in the new language
+        self.settings = {}
+        self.clear_options('settings')
+        self.add_settings()
+        return super().retranslate()
+
+    def build_lang_menu(self):
         self.labels['lang_menu'] = self._gtk.ScrolledWindow()
         self.labels['lang'] = Gtk.Grid()
         self.labels['lang_menu'].add(self.labels['lang'])
@@ -38,8 +55,9 @@ class Panel(ScreenPanel):
                 "type": "button",
                 "callback": self._screen.change_language,
             }
-            self.add_option("lang", self.langs, lang, self.langs[lang])
+        self.add_options("lang", self.langs, list(self.langs.items()))
 
+    def build_printers_menu(self):
         self.labels['printers_menu'] = self._gtk.ScrolledWindow()
         self.labels['printers'] = Gtk.Grid()
         self.labels['printers_menu'].add(self.labels['printers'])
@@ -52,6 +70,4 @@ class Panel(ScreenPanel):
                 "moonraker_host": printer[pname]['moonraker_host'],
                 "moonraker_port": printer[pname]['moonraker_port'],
             }
-            self.add_option("printers", self.printers, pname, self.printers[pname])
-
-        self.content.add(self.labels['settings_menu'])
+        self.add_options("printers", self.printers, list(self.printers.items()))
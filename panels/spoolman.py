@@ -1,13 +1,13 @@
 import logging
 import os.path
 import pathlib
+from collections import Counter
 
 import gi
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, GdkPixbuf, GObject, Pango, Gdk
 from ks_includes.screen_panel import ScreenPanel
-from ks_includes.KlippyRest import KlippyRest
 from datetime import datetime
 
 try:
@@ -39,6 +39,9 @@ def format_date(date):
     return None
 
 
+PAGE_SIZE = 100
+
+
 class SpoolmanVendor:
     id: int
     name: str
@@ -101,6 +104,9 @@ class SpoolmanSpool(GObject.GObject):
         for date in ["first_used", "last_used", "registered"]:
             if date in entries:
                 self.__setattr__(date, format_date(entries[date]))
+        if self.filament is not None and not hasattr(self.filament, 'material'):
+            self.filament.material = ''
+        self.last_used_ts = self.last_used.timestamp() if self.last_used else 0
 
     @property
     def name(self):
@@ -132,7 +138,6 @@ class SpoolmanSpool(GObject.GObject):
 
 
 class Panel(ScreenPanel):
-    apiClient: KlippyRest
     _active_spool_id: int = None
 
     @staticmethod
@@ -143,10 +148,9 @@ class Panel(ScreenPanel):
 
     @staticmethod
     def spool_compare_date(model, row1, row2, user_data):
-        spool1 = model.get_value(row1, 0)
-        spool2 = model.get_value(row2, 0)
-        return 1 if (spool1.last_used or datetime.min).replace(tzinfo=None) > \
-                    (spool2.last_used or datetime.min).replace(tzinfo=None) else -1
+        used1 = model.get_value(row1, 0).last_used_ts
+        used2 = model.get_value(row2, 0).last_used_ts
+        return (used1 > used2) - (used1 < used2)
 
     def _on_material_filter_clear(self, sender, combobox):
         self._filters["material"] = None
@@ -164,7 +168,6 @@ class Panel(ScreenPanel):
     def __init__(self, screen, title):
         title = title or "Spoolman"
         super().__init__(screen, title)
-        self.apiClient = screen.apiclient
         if self._config.get_main_config().getboolean("24htime", True):
             self.timeFormat = '%Y-%m-%d %H:%M'
         else:
@@ -175,6 +178,11 @@ class Panel(ScreenPanel):
         self._filters = {}
         self._model = Gtk.TreeStore(SpoolmanSpool.__gtype__)
         self._materials = Gtk.ListStore(str, str)
+        # The local index: the row of each spool by id and the number of spools per material
+        self._rows = {}
+        self._material_count = Counter()
+        self._load_id = 0
+        self._loaded_ids = set()
 
         self._filterable = self._model.filter_new()
         self._filterable.set_visible_func(self._filter_spools)
@@ -379,56 +387,106 @@ class Panel(ScreenPanel):
 
     def process_update(self, action, data):
         if action == "notify_active_spool_set":
+            previous = self._active_spool_id
             self._active_spool_id = data['spool_id']
-            self._treeview.get_model().foreach(lambda store, treepath, treeiter:
-                                               store.row_changed(treepath, treeiter)
-                                               )
-            self._treeview.queue_draw()
+            for spool_id in (previous, self._active_spool_id):
+                self._row_changed(spool_id)
+            if self._active_spool_id is not None:
+                # Setting the active spool updates its last used date
+                self._spoolman_request(f"/v1/spool/{self._active_spool_id}", self._spool_loaded)
+
+    def _spoolman_request(self, path, callback, *args):
+        self._screen._ws.send_method(
+            "server.spoolman.proxy", {"request_method": "GET", "path": path}, callback, *args
+        )
 
     def load_spools(self, data=None):
+        """Fetches the spools a page at a time, the rows are updated in place as pages arrive"""
+        self._load_id += 1
+        self._loaded_ids = set()
+        self._load_page(0)
+
+    def _load_page(self, offset):
         hide_archived = self._config.get_config().getboolean("spoolman", "hide_archived", fallback=True)
-        self._model.clear()
-        self._materials.clear()
-        spools = self.apiClient.post_request("server/spoolman/proxy", json={
-            "request_method": "GET",
-            "path": f"/v1/spool?allow_archived={not hide_archived}",
-        })
-        if not spools or "result" not in spools:
+        self._spoolman_request(
+            f"/v1/spool?allow_archived={not hide_archived}&limit={PAGE_SIZE}&offset={offset}&sort=id:asc",
+            self._page_loaded, self._load_id, offset
+        )
+
+    def _page_loaded(self, result, method, params, load_id, offset):
+        if load_id != self._load_id:
+            return
+        if not isinstance(result.get("result"), list):
+            logging.error(f"Error trying to fetch spools: {result}")
             self._screen.show_popup_message(_("Error trying to fetch spools"))
             return
-
-        materials = []
-        for spool in spools["result"]:
-            spoolObject = SpoolmanSpool(**spool)
-            self._model.append(None, [spoolObject])
-            if not hasattr(spoolObject.filament, 'material'):
-                spoolObject.filament.material = ''
-            elif spoolObject.filament.material not in materials:
-                materials.append(spoolObject.filament.material)
-
-        materials.sort()
+        spools = result["result"]
+        for spool in spools:
+            self._loaded_ids.add(spool["id"])
+            self._index_spool(SpoolmanSpool(**spool))
+        if len(spools) == PAGE_SIZE:
+            self._load_page(offset + PAGE_SIZE)
+            return
+        # Last page: drop the spools that were deleted or archived meanwhile
+        for spool_id in [i for i in self._rows if i not in self._loaded_ids]:
+            self._remove_spool(spool_id)
+        self._update_materials()
+
+    def _spool_loaded(self, result, method, params):
+        if isinstance(result.get("result"), dict) and "id" in result["result"]:
+            self._index_spool(SpoolmanSpool(**result["result"]))
+            self._update_materials()
+
+    def _index_spool(self, spool):
+        if spool.id in self._rows:
+            it = self._rows[spool.id]
+            self._material_count[self._model.get_value(it, 0).filament.material] -= 1
+            self._model.set_value(it, 0, spool)
+        else:
+            self._rows[spool.id] = self._model.append(None, [spool])
+        self._material_count[spool.filament.material] += 1
+
+    def _remove_spool(self, spool_id):
+        it = self._rows.pop(spool_id)
+        self._material_count[self._model.get_value(it, 0).filament.material] -= 1
+        self._model.remove(it)
+
+    def _row_changed(self, spool_id):
+        if spool_id in self._rows:
+            it = self._rows[spool_id]
+            self._model.row_changed(self._model.get_path(it), it)
+
+    def _update_materials(self):
+        materials = sorted(material for material, count in self._material_count.items() if material and count > 0)
+        shown = [row[0] for row in self._materials][1:]
+        if len(self._materials) and materials == shown:
+            return
+        self._materials.clear()
         self._materials.append([None, _("All")])
         for material in materials:
             self._materials.append([material, material])
 
+    def _spool_id_set(self, result, method, params, message):
+        if not result or "error" in result:
+            logging.error(f"{method}: {result}")
+            self._screen.show_popup_message(message)
+
     def clear_active_spool(self, sender: Gtk.Button = None):
-        result = self.apiClient.post_request("server/spoolman/spool_id", json={})
-        if not result:
-            self._screen.show_popup_message(_("Error clearing active spool"))
-            return
+        self._screen._ws.send_method(
+            "server.spoolman.post_spool_id", {}, self._spool_id_set, _("Error clearing active spool")
+        )
 
     def set_active_spool(self, spool: SpoolmanSpool):
-        result = self.apiClient.post_request("server/spoolman/spool_id", json={
-            "spool_id": spool.id
-        })
-        if not result:
-            self._screen.show_popup_message(_("Error setting active spool"))
-            return
+        self._screen._ws.send_method(
+            "server.spoolman.post_spool_id", {"spool_id": spool.id}, self._spool_id_set,
+            _("Error setting active spool")
+        )
+
+    def get_active_spool(self):
+        self._screen._ws.send_method("server.spoolman.get_spool_id", {}, self._active_spool_loaded)
 
-    def get_active_spool(self) -> SpoolmanSpool:
-        result = self.apiClient.send_request("server/spoolman/spool_id")
-        if not result:
+    def _active_spool_loaded(self, result, method, params):
+        if not isinstance(result.get("result"), dict):
             self._screen.show_popup_message(_("Error getting active spool"))
             return
-        self._active_spool_id = result["spool_id"]
-        return self._active_spool_id
+        self.process_update("notify_active_spool_set", {"spool_id": result["result"].get("spool_id")})
@@ -12,7 +12,6 @@ from ks_includes.KlippyGtk import find_widget
 
 
 class Panel(ScreenPanel):
-    graph_update = None
     active_heater = None
 
     def __init__(self, screen, title, **kwargs):
@@ -196,14 +195,11 @@ class Panel(ScreenPanel):
                 self.left_panel.add(self.labels["da"])
             self.labels["da"].queue_draw()
             self.labels["da"].show()
-            if self.graph_update is None:
-                # This has a high impact on load
-                self.graph_update = GLib.timeout_add_seconds(5, self.update_graph)
+            # This has a high impact on load
+            self._screen.scheduler.add("temperature graph", 5, self.update_graph, owner=self.labels["da"])
         elif self.labels["da"] in self.left_panel:
             self.left_panel.remove(self.labels["da"])
-            if self.graph_update is not None:
-                GLib.source_remove(self.graph_update)
-                self.graph_update = None
+            self._screen.scheduler.remove("temperature graph")
 
     def activate(self):
         if not self._printer.tempstore:
@@ -236,9 +232,7 @@ class Panel(ScreenPanel):
         self.extra_selection = None
 
     def deactivate(self):
-        if self.graph_update is not None:
-            GLib.source_remove(self.graph_update)
-            self.graph_update = None
+        self._screen.scheduler.remove("temperature graph")
         if self.active_heater is not None:
             self.hide_numpad()
 
@@ -388,6 +382,8 @@ class Panel(ScreenPanel):
             name.get_style_context().add_class("graph_label")
 
         self.labels["da"].add_object(device, "temperatures", rgb, False, False)
+        if device.startswith("extruder"):
+            self.labels["da"].add_flow(device, rgb)
         temp = self._gtk.Button(label="", lines=1)
         find_widget(temp, Gtk.Label).set_ellipsize(False)
 
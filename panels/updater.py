@@ -1,4 +1,5 @@
 import logging
+from datetime import datetime
 from gettext import ngettext
 
 import gi
@@ -14,6 +15,8 @@ class Panel(ScreenPanel):
         super().__init__(screen, title)
         self.labels = {}
         self.update_status = None
+        self.infogrid = None
+        self.shown_info = {}
 
         self.buttons = {
             "update_all": self._gtk.Button(
@@ -50,18 +53,30 @@ class Panel(ScreenPanel):
         self.scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         self.scroll.add(self.update_msg)
 
+        self.checked = Gtk.Label(halign=Gtk.Align.END, ellipsize=Pango.EllipsizeMode.END)
+
         self.main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, vexpand=True)
         self.main_box.pack_start(top_box, False, False, 0)
         self.main_box.pack_start(self.scroll, True, True, 0)
+        self.main_box.pack_start(self.checked, False, False, 0)
 
         self.content.add(self.main_box)
 
     def activate(self):
-        self._screen._ws.send_method("machine.update.status", callback=self.get_updates)
+        status = self._screen.update_status
+        if status.version_info is not None or status.error is not None:
+            self.show_status({"version_info": status.version_info, "error": status.error, "time": status.time})
+        if status.is_stale():
+            status.request()
+
+    def process_update(self, action, data):
+        if action == "notify_update_status":
+            self.show_status(data)
 
     def create_info_grid(self):
         infogrid = Gtk.Grid()
         infogrid.get_style_context().add_class("system-program-grid")
+        self.shown_info = {}
         for i, prog in enumerate(sorted(list(self.update_status["version_info"]))):
             self.labels[prog] = Gtk.Label(
                 hexpand=True, halign=Gtk.Align.START, ellipsize=Pango.EllipsizeMode.END
@@ -95,30 +110,27 @@ class Panel(ScreenPanel):
             self.update_program_info(prog)
         self.clear_scroll()
         self.scroll.add(infogrid)
+        self.infogrid = infogrid
 
     def clear_scroll(self):
         for child in self.scroll.get_children():
             self.scroll.remove(child)
 
     def refresh_updates(self, widget=None):
-        self.clear_scroll()
-        self.scroll.add(self.update_msg)
         self._gtk.Button_busy(widget, True)
-        logging.info("Sending machine.update.refresh")
-        self._screen._ws.send_method(
-            "machine.update.refresh", callback=self.get_updates
-        )
+        if not self._screen.update_status.request(refresh=True):
+            self._gtk.Button_busy(widget, False)
 
-    def get_updates(self, response, method, params):
+    def show_status(self, data):
         self._gtk.Button_busy(self.buttons["refresh"], False)
-        logging.info(response)
-        if not response or "result" not in response:
+        if data["version_info"] is None:
             self.buttons["update_all"].set_sensitive(False)
             self.clear_scroll()
-            if "error" in response:
+            self.infogrid = None
+            if data["error"]:
                 self.scroll.add(
                     Gtk.Label(
-                        label=f"Moonraker: {response['error']['message']}", vexpand=True
+                        label=f"Moonraker: {data['error']}", vexpand=True
                     )
                 )
             else:
@@ -126,9 +138,19 @@ class Panel(ScreenPanel):
                     Gtk.Label(label=_("Not working or not configured"), vexpand=True)
                 )
         else:
-            self.update_status = response["result"]
+            self.update_status = {"version_info": data["version_info"]}
             self.buttons["update_all"].set_sensitive(True)
-            self.create_info_grid()
+            if self.infogrid is None or set(self.shown_info) != set(data["version_info"]):
+                self.create_info_grid()
+            else:
+                # Only the rows of the programs that changed are updated
+                for prog, info in data["version_info"].items():
+                    if info != self.shown_info.get(prog):
+                        self.update_program_info(prog)
+        checked = datetime.fromtimestamp(data["time"]).strftime("%H:%M") if data["time"] else "-"
+        self.checked.set_label(
+            f"{_('Last checked')}: {checked}" + (f"  Moonraker: {data['error']}" if data["error"] else "")
+        )
         self.scroll.show_all()
 
     def restart(self, widget, program):
@@ -331,6 +353,7 @@ class Panel(ScreenPanel):
             return
 
         info = self.update_status["version_info"][p]
+        self.shown_info[p] = info
 
         if p == "system":
             distro = (
@@ -3,7 +3,6 @@
 import ast
 import argparse
 import gc
-import json
 import logging
 import os
 import subprocess
@@ -18,16 +17,25 @@ gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Gdk, GLib, Pango
 from importlib import import_module
 from jinja2 import Environment
-from signal import SIGTERM
 from datetime import datetime
 
 from ks_includes import functions
+from ks_includes.analytics import PrintAnalytics
+from ks_includes.eta import EtaService
 from ks_includes.KlippyWebsocket import KlippyWebsocket
 from ks_includes.KlippyRest import KlippyRest
 from ks_includes.files import KlippyFiles
+from ks_includes.flow_telemetry import FlowTelemetry
 from ks_includes.KlippyGtk import KlippyGtk
+from ks_includes.main_loop_profiler import MainLoopProfiler
+from ks_includes.scheduler import Scheduler
 from ks_includes.printer import Printer
-from ks_includes.widgets.keyboard import Keyboard
+from ks_includes.printer_pool import PrinterPool
+from ks_includes.production_queue import ProductionQueue
+from ks_includes.session_recorder import SessionRecorder
+from ks_includes.theme import ThemeManager
+from ks_includes.update_status import UpdateStatusService
+from ks_includes.widgets.keyboard import KeyboardManager
 from ks_includes.widgets.prompts import Prompt
 from ks_includes.widgets.lockscreen import LockScreen
 from ks_includes.widgets.screensaver import ScreenSaver
@@ -61,11 +69,12 @@ class KlipperScreen(Gtk.Window):
     connecting_to_printer = None
     connected_printer = None
     files = None
-    keyboard = None
     panels = {}
     popup_message = None
     printers = None
     printer = None
+    printer_pool = None
+    profiler = None
     updating = False
     _ws = None
     reinit_count = 0
@@ -78,7 +87,6 @@ class KlipperScreen(Gtk.Window):
     notification_log = []
     prompt = None
     tempstore_timeout = None
-    check_dpms_timeout = None
 
     def __init__(self, args):
         self.server_info = None
@@ -100,8 +108,21 @@ class KlipperScreen(Gtk.Window):
 
         self._config = KlipperScreenConfig(configfile, self)
         self.lang_ltr = set_text_direction(self._config.get_main_config().get("language", None))
+        if self._config.get_main_config().getboolean("profile_main_loop", fallback=False):
+            self.profiler = MainLoopProfiler(self, self._config.get_main_config().getint("profile_stall_ms", 100))
+            self.profiler.install()
+        self.scheduler = Scheduler()
         self.env = Environment(extensions=["jinja2.ext.i18n"], autoescape=True)
         self.env.install_gettext_translations(self._config.get_lang())
+        self.analytics = PrintAnalytics(os.path.join(klipperscreendir, "config"))
+        self.flow_telemetry = FlowTelemetry(os.path.join(klipperscreendir, "config", "flow_history"))
+        self.eta = EtaService(self)
+        self.update_status = UpdateStatusService(
+            self, 60 * self._config.get_main_config().getint("update_status_interval", 60)
+        )
+        self.production = ProductionQueue(self, os.path.join(klipperscreendir, "config"))
+        self.keyboard_manager = KeyboardManager(self)
+        self.connect("destroy", self.shutdown_services)
 
         self.connect("key-press-event", self._key_press_event)
         self.connect("configure_event", self.update_size)
@@ -147,11 +168,11 @@ class KlipperScreen(Gtk.Window):
         self.theme = self._config.get_main_config().get('theme')
         self.show_cursor = self._config.get_main_config().getboolean("show_cursor", fallback=False)
         self.setup_gtk_settings()
-        self.style_provider = Gtk.CssProvider()
         self.screensaver = ScreenSaver(self)
         self.gtk = KlippyGtk(self)
-        self.base_css = ""
-        self.load_base_styles()
+        self.themes = ThemeManager(self, os.path.join(klipperscreendir, "styles"))
+        self.style_options = self.themes.style_options
+        self.gtk.color_list = self.style_options['graph_colors']
         self.set_icon_from_file(os.path.join(klipperscreendir, "styles", "icon.svg"))
         self.base_panel = BasePanel(self)
         self.change_theme(self.theme)
@@ -210,7 +231,10 @@ class KlipperScreen(Gtk.Window):
             "shutdown": self.state_shutdown
         }
         for printer in self.printers:
-            printer["data"] = Printer(self.state_execute, state_callbacks)
+            printer["data"] = Printer(self.state_execute, state_callbacks, self.scheduler, list(printer)[0])
+        main_config = self._config.get_main_config()
+        if len(self.printers) > 1 and main_config.getboolean("warm_printers", fallback=False):
+            self.printer_pool = PrinterPool(self, self.printers, main_config.getint("warm_printers_max", fallback=4))
         default_printer = self._config.get_main_config().get('default_printer')
         logging.debug(f"Default printer: {default_printer}")
         if [True for p in self.printers if default_printer in p]:
@@ -221,6 +245,8 @@ class KlipperScreen(Gtk.Window):
         else:
             self.base_panel.show_printer_select(True)
             self.show_printer_select()
+        if self.printer_pool is not None:
+            self.printer_pool.start()
 
     def close_websocket(self):
         self._ws.close()
@@ -229,7 +255,14 @@ class KlipperScreen(Gtk.Window):
 
     def connect_printer(self, name):
         self.connecting_to_printer = name
-        if self._ws is not None and self._ws.connected:
+        if self.printer_pool is not None:
+            session = self.printer_pool.activate(name)
+            if session.ready:
+                self.switch_printer(session)
+                return
+            self.eta.stop()
+            self.update_status.stop()
+        elif self._ws is not None and self._ws.connected:
             self.printer_initializing("Waiting Websocket closure")
             self.close_websocket()
             return
@@ -238,35 +271,39 @@ class KlipperScreen(Gtk.Window):
         self.initialized = False
         self.initializing = False
         logging.info(f"Connecting to printer: {name}")
-        ind = next(
-            (
-                self.printers.index(printer)
-                for printer in self.printers
-                if name == list(printer)[0]
-            ),
-            0,
-        )
-        self.printer = self.printers[ind]["data"]
-        self.apiclient = KlippyRest(
-            self.printers[ind][name]["moonraker_host"],
-            self.printers[ind][name]["moonraker_port"],
-            self.printers[ind][name]["moonraker_api_key"],
-            self.printers[ind][name]["moonraker_path"],
-            self.printers[ind][name]["moonraker_ssl"],
-        )
-        self._ws = KlippyWebsocket(
-            {
-                "on_connect": self.websocket_connected,
-                "on_message": self._websocket_callback,
-                "on_close": self.websocket_disconnected,
-                "on_cancel": self.websocket_connection_cancel,
-            },
-            self.printers[ind][name]["moonraker_host"],
-            self.printers[ind][name]["moonraker_port"],
-            self.printers[ind][name]["moonraker_api_key"],
-            self.printers[ind][name]["moonraker_path"],
-            self.printers[ind][name]["moonraker_ssl"],
-        )
+        if self.printer_pool is not None:
+            # The other printers keep their connections in the background
+            self.printer, self.apiclient, self._ws = self.printer_pool.open(session)
+        else:
+            ind = next(
+                (
+                    self.printers.index(printer)
+                    for printer in self.printers
+                    if name == list(printer)[0]
+                ),
+                0,
+            )
+            self.printer = self.printers[ind]["data"]
+            self.apiclient = KlippyRest(
+                self.printers[ind][name]["moonraker_host"],
+                self.printers[ind][name]["moonraker_port"],
+                self.printers[ind][name]["moonraker_api_key"],
+                self.printers[ind][name]["moonraker_path"],
+                self.printers[ind][name]["moonraker_ssl"],
+            )
+            self._ws = KlippyWebsocket(
+                {
+                    "on_connect": self.websocket_connected,
+                    "on_message": self._websocket_callback,
+                    "on_close": self.websocket_disconnected,
+                    "on_cancel": self.websocket_connection_cancel,
+                },
+                self.printers[ind][name]["moonraker_host"],
+                self.printers[ind][name]["moonraker_port"],
+                self.printers[ind][name]["moonraker_api_key"],
+                self.printers[ind][name]["moonraker_path"],
+                self.printers[ind][name]["moonraker_ssl"],
+            )
         if self.files is None:
             self.files = KlippyFiles(self)
         else:
@@ -276,7 +313,39 @@ class KlipperScreen(Gtk.Window):
         self.printer_initializing(_("Connecting to %s") % name, True)
         self.connect_to_moonraker()
 
+    def switch_printer(self, session):
+        logging.info(f"Switching to printer: {session.name}")
+        self.printer = session.printer
+        self.apiclient = session.apiclient
+        self._ws = session.ws
+        self.server_info = session.server_info
+        self.connecting = False
+        self.initializing = False
+        self.initialized = True
+        self.reinit_count = 0
+        self.connected_printer = session.name
+        self.base_panel.set_ks_printer_cfg(session.name)
+        if self.files is None:
+            self.files = KlippyFiles(self)
+        self.files.load_index(session.files)
+        self.files.set_gcodes_path()
+        self.flow_telemetry.reset()
+        self.eta.reset()
+        self.eta.load_history()
+        self.eta.process_update(self.printer.data, self.printer)
+        self.update_status.reset()
+        self.update_status.process_update(self.printer.data)
+        self.update_status.start()
+        self.production.reset()
+        self.production.process_update(self.printer.data, self.printer)
+        self.printer_initializing(_("Connecting to %s") % session.name, True)
+        self.printer.change_state(self.printer.evaluate_state())
+
     def ws_subscribe(self):
+        self._ws.klippy.object_subscription(self.subscriptions(self.printer))
+
+    @staticmethod
+    def subscriptions(printer):
         requested_updates = {
             "objects": {
                 "bed_mesh": ["profile_name", "mesh_max", "mesh_min", "probed_matrix", "profiles"],
@@ -299,25 +368,25 @@ class KlipperScreen(Gtk.Window):
                 "screws_tilt_adjust": ['results', 'error'],
             }
         }
-        for extruder in self.printer.get_tools():
+        for extruder in printer.get_tools():
             requested_updates['objects'][extruder] = [
                 "target", "temperature", "pressure_advance", "smooth_time", "power"]
-        for h in self.printer.get_heaters():
+        for h in printer.get_heaters():
             requested_updates['objects'][h] = ["target", "temperature", "power"]
-        for t in self.printer.get_temp_sensors():
+        for t in printer.get_temp_sensors():
             requested_updates['objects'][t] = ["temperature"]
-        for f in self.printer.get_temp_fans():
+        for f in printer.get_temp_fans():
             requested_updates['objects'][f] = ["target", "temperature"]
-        for f in self.printer.get_fans():
+        for f in printer.get_fans():
             requested_updates['objects'][f] = ["speed"]
-        for f in self.printer.get_filament_sensors():
+        for f in printer.get_filament_sensors():
             requested_updates['objects'][f] = ["enabled", "filament_detected"]
-        for p in self.printer.get_pwm_tools() + self.printer.get_output_pins():
+        for p in printer.get_pwm_tools() + printer.get_output_pins():
             requested_updates['objects'][p] = ["value"]
-        for led in self.printer.get_leds():
+        for led in printer.get_leds():
             requested_updates['objects'][led] = ["color_data"]
 
-        self._ws.klippy.object_subscription(requested_updates)
+        return requested_updates
 
     @staticmethod
     def _load_panel(panel):
@@ -480,94 +549,32 @@ class KlipperScreen(Gtk.Window):
 
     def restart_ks(self, *args):
         logging.debug(f"Restarting {sys.executable} {' '.join(sys.argv)}")
+        self.shutdown_services()
         os.execv(sys.executable, ['python'] + sys.argv)
         # noinspection PyUnreachableCode
         self._ws.send_method("machine.services.restart", {"service": "KlipperScreen"})  # Fallback
 
+    def shutdown_services(self, *args):
+        # Before exiting or exec'ing: stop the processes started and save the gcode index
+        self.keyboard_manager.shutdown()
+        if self.files is not None:
+            self.files.analyzer.shutdown()
+
     def setup_gtk_settings(self):
         settings = Gtk.Settings.get_default()
         settings.set_property("gtk-theme-name", "Adwaita")
         settings.set_property("gtk-application-prefer-dark-theme", False)
 
-    def load_base_styles(self):
-        base_conf_path = os.path.join(klipperscreendir, "styles", "base.conf")
-        with open(base_conf_path) as f:
-            self.style_options = json.load(f)
-        self.gtk.color_list = self.style_options['graph_colors']
-        base_css_path = os.path.join(klipperscreendir, "styles", "base.css")
-        self.base_css = pathlib.Path(base_css_path).read_text()
-        self.base_css = self.base_css.replace("KS_FONT_SIZE", f"{self.gtk.font_size}")
-        self.base_css = self.customize_graph_colors(self.base_css)
-
-        self.style_provider.load_from_data(self.base_css.encode())
-        Gtk.StyleContext.add_provider_for_screen(
-            Gdk.Screen.get_default(),
-            Gtk.CssProvider(),
-            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
-
-    def load_custom_theme(self, theme_name):
-        theme_dir = os.path.join(klipperscreendir, "styles", theme_name)
-        theme_css_path = os.path.join(theme_dir, "style.css")
-        theme_conf_path = os.path.join(theme_dir, "style.conf")
-
-        theme_css = ""
-        theme_options = {}
-
-        if os.path.exists(theme_css_path):
-            theme_css = pathlib.Path(theme_css_path).read_text()
-
-        if os.path.exists(theme_conf_path):
-            try:
-                with open(theme_conf_path) as f:
-                    theme_options = json.load(f)
-            except Exception as e:
-                logging.error(
-                    f"Unable to parse custom template conf file:\n"
-                    f"{e}\n\n"
-                    f"{traceback.format_exc()}"
-                )
-
-        return theme_css, theme_options
-
-    def customize_graph_colors(self, css_data):
-        for category, category_data in self.style_options['graph_colors'].items():
-            for i, color in enumerate(category_data['colors'], start=0):
-                if category == "extruder":
-                    class_name = f".graph_label_{category}{i}" if i > 0 else f".graph_label_{category}"
-                elif category == "bed":
-                    class_name = f".graph_label_heater_{category}"
-                else:
-                    class_name = f".graph_label_{category}_{i + 1}"
-                css_data += f"\n{class_name} {{ border-left-color: #{color} }}"
-        return css_data
-
-    def update_style_provider(self, theme_css):
-        css_data = self.customize_graph_colors(theme_css)
-        css_data = self.base_css + css_data
-        screen = Gdk.Screen.get_default()
-        if self.style_provider:
-            Gtk.StyleContext.remove_provider_for_screen(screen, self.style_provider)
-        self.style_provider = Gtk.CssProvider()
-        self.style_provider.load_from_data(css_data.encode())
-        Gtk.StyleContext.add_provider_for_screen(
-            screen,
-            self.style_provider,
-            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
-
     def change_theme(self, theme_name=None):
         if not theme_name:
             theme_name = self._config.get_main_config().get('theme')
         self.gtk.update_themedir(theme_name)
-        theme_css, theme_options = self.load_custom_theme(theme_name)
-        self.style_options.update(theme_options)
+        self.style_options = self.themes.apply(theme_name, self.gtk.font_size)
         self.gtk.color_list = self.style_options['graph_colors']
-        self.update_style_provider(theme_css)
         self.reload_icon_theme()
 
     def reload_icon_theme(self):
-        self.panels_reinit = list(self.panels)
+        self.gtk.reload_images()
         self.base_panel.reload_icons()
 
     def _go_to_submenu(self, widget, name):
@@ -647,9 +654,7 @@ class KlipperScreen(Gtk.Window):
 
     def set_dpms(self, use_dpms):
         if not use_dpms:
-            if self.check_dpms_timeout is not None:
-                GLib.source_remove(self.check_dpms_timeout)
-            self.check_dpms_timeout = None
+            self.scheduler.remove("dpms")
             state = functions.get_DPMS_state()
             if state != functions.DPMS_State.Fail:
                 try:
@@ -683,8 +688,8 @@ class KlipperScreen(Gtk.Window):
             self.show_popup_message(f"DPMS Error:\n {e}")
             self.set_dpms(False)
             return
-        if self.blanking_time > 0 and self.check_dpms_timeout is None:
-            self.check_dpms_timeout = GLib.timeout_add_seconds(1, self.check_dpms_state)
+        if self.blanking_time > 0 and "dpms" not in self.scheduler:
+            self.scheduler.add("dpms", 1, self.check_dpms_state)
             return
 
     def set_screenblanking_printing_timeout(self, time):
@@ -743,6 +748,8 @@ class KlipperScreen(Gtk.Window):
     def state_disconnected(self):
         logging.debug("### Going to disconnected")
         self.printer.stop_tempstore_updates()
+        self.eta.stop()
+        self.update_status.stop()
         self.initialized = False
         self.reinit_count = 0
         self._init_printer(_("Klipper has disconnected"), go_to_splash=True)
@@ -795,18 +802,30 @@ class KlipperScreen(Gtk.Window):
 
     def change_language(self, widget, lang):
         self._config.install_language(lang)
-        self.lang_ltr = set_text_direction(lang)
+        lang_ltr = set_text_direction(lang)
         self.env.install_gettext_translations(self._config.get_lang())
         self._config._create_configurable_options(self)
         self._config.set('main', 'language', lang)
         self._config.save_user_config_options()
-        self.reload_panels()
+        if lang_ltr != self.lang_ltr:
+            self.lang_ltr = lang_ltr
+            self.reload_panels()
+            return
+        self.keyboard_manager.reset()
+        # Panels that can't translate their text again are rebuilt, the hidden ones when they are shown next
+        stale = [name for name, panel in self.panels.items() if not panel.retranslate()]
+        self.panels_reinit.extend(name for name in stale if name not in self.panels_reinit)
+        if any(name in stale for name in self._cur_panels):
+            self.reload_panels()
+        elif self._cur_panels:
+            self.base_panel.set_title(self.panels[self._cur_panels[-1]].title)
 
     def reload_panels(self, *args):
         if "printer_select" in self._cur_panels:
             self.show_printer_select()
             return
         home = self._cur_panels[0]
+        self.keyboard_manager.reset()
         self.panels_reinit = list(self.panels)
         self._remove_all_panels()
         if home == "main_menu":
@@ -833,6 +852,10 @@ class KlipperScreen(Gtk.Window):
             return
         elif action == "notify_status_update" and self.printer.state != "shutdown":
             self.printer.process_update(data)
+            self.flow_telemetry.process_update(data, self.printer)
+            self.eta.process_update(data, self.printer)
+            self.update_status.process_update(data)
+            self.production.process_update(data, self.printer)
             if 'manual_probe' in data and data['manual_probe']['is_active'] and 'zcalibrate' not in self._cur_panels:
                 self.show_panel("zcalibrate")
             if "screws_tilt_adjust" in data and 'bed_level' not in self._cur_panels:
@@ -844,7 +867,12 @@ class KlipperScreen(Gtk.Window):
         elif action == "notify_metadata_update":
             self.files.request_metadata(data['filename'])
             return
+        elif action == "notify_history_changed":
+            self.eta.process_history(data)
+        elif action == "notify_update_refreshed":
+            self.update_status.process_refreshed(data)
         elif action == "notify_update_response":
+            self.update_status.process_response(data)
             if 'message' in data and 'Error' in data['message']:
                 logging.error(f"{action}:{data['message']}")
                 self.show_popup_message(data['message'], 3, from_ws=True)
@@ -888,12 +916,8 @@ class KlipperScreen(Gtk.Window):
 
     def process_action(self, action):
         if action.startswith("prompt"):
-            if action.startswith("prompt_begin"):
-                if self.prompt is not None:
-                    self.prompt.end()
-                self.prompt = Prompt(self)
             if self.prompt is None:
-                return
+                self.prompt = Prompt(self)
             self.prompt.decode(action)
         if action.startswith("ks_show"):
             self.parse_ks_action(action[8:].strip())
@@ -913,6 +937,12 @@ class KlipperScreen(Gtk.Window):
     def process_update(self, *args):
         self.base_panel.process_update(*args)
         if self._cur_panels and hasattr(self.panels[self._cur_panels[-1]], "process_update"):
+            if self.profiler is not None:
+                self.profiler.call(
+                    f"panels.{self._cur_panels[-1]}.process_update", self.panels[self._cur_panels[-1]].process_update,
+                    *args
+                )
+                return
             self.panels[self._cur_panels[-1]].process_update(*args)
 
     def confirm_save(self, widget):
@@ -1121,6 +1151,10 @@ class KlipperScreen(Gtk.Window):
             self._init_printer("Error getting printer configuration")
             return False
         self.printer.reinit(printer_info, config['status'])
+        self.flow_telemetry.reset()
+        self.eta.reset()
+        self.update_status.reset()
+        self.production.reset()
         self.printer.available_commands = self.apiclient.get_gcode_help()
         info = self.apiclient.send_request("machine/system_info")
         if info and 'system_info' in info:
@@ -1168,6 +1202,12 @@ class KlipperScreen(Gtk.Window):
         self.reinit_count = 0
         self.initializing = False
         self.printer.process_update(data['status'])
+        self.flow_telemetry.process_update(data['status'], self.printer)
+        self.eta.load_history()
+        self.eta.process_update(data['status'], self.printer)
+        self.update_status.process_update(data['status'])
+        self.update_status.start()
+        self.production.process_update(data['status'], self.printer)
         self.log_notification("Printer Initialized", 1)
         return False
 
@@ -1219,65 +1259,12 @@ class KlipperScreen(Gtk.Window):
             box = self.base_panel.content
         if close_cb is None:
             close_cb = self.remove_keyboard
-        if self.keyboard is not None:
-            self.remove_keyboard(box=box)
-            entry.grab_focus()
-        kbd_grid = Gtk.Grid()
-        kbd_grid.set_size_request(self.gtk.content_width, self.gtk.keyboard_height)
-        kbd_grid.set_vexpand(False)
-
-        if self._config.get_main_config().getboolean("use-matchbox-keyboard", False):
-            return self._show_matchbox_keyboard(kbd_grid)
-        purpose = entry.get_input_purpose()
-        kbd_width = 1
-        if not self.vertical_mode and purpose in (Gtk.InputPurpose.DIGITS, Gtk.InputPurpose.NUMBER):
-            kbd_grid.set_column_homogeneous(True)
-            kbd_width = 2 if purpose == Gtk.InputPurpose.DIGITS else 3
-        kbd_grid.attach(Gtk.Box(), 0, 0, 1, 1)
-        kbd = Keyboard(self, close_cb, entry=entry, box=box)
-        kbd_grid.attach(kbd, 1, 0, kbd_width, 1)
-        kbd_grid.attach(Gtk.Box(), kbd_width + 1, 0, 1, 1)
-        self.keyboard = {"box": kbd_grid}
-        box.pack_end(kbd_grid, False, False, 0)
-        box.show_all()
-
-    def _show_matchbox_keyboard(self, kbd_grid):
-        env = os.environ.copy()
-        usrkbd = os.path.expanduser("~/.matchbox/keyboard.xml")
-        if os.path.isfile(usrkbd):
-            env["MB_KBD_CONFIG"] = usrkbd
-        else:
-            env["MB_KBD_CONFIG"] = "ks_includes/locales/keyboard.xml"
-        p = subprocess.Popen(["matchbox-keyboard", "--xid"], stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE, env=env)
-        xid = int(p.stdout.readline())
-        logging.debug(f"XID {xid}")
-        logging.debug(f"PID {p.pid}")
-
-        keyboard = Gtk.Socket()
-        kbd_grid.get_style_context().add_class("keyboard_matchbox")
-        kbd_grid.attach(keyboard, 0, 0, 1, 1)
-        self.base_panel.content.pack_end(kbd_grid, False, False, 0)
-
-        self.show_all()
-        keyboard.add_id(xid)
-
-        self.keyboard = {
-            "box": kbd_grid,
-            "process": p,
-            "socket": keyboard
-        }
-        return
+        self.keyboard_manager.show(entry, box, close_cb)
 
     def remove_keyboard(self, entry=None, event=None, box=None):
-        if self.keyboard is None:
+        if not self.keyboard_manager.visible:
             return
-        if box is None:
-            box = self.base_panel.content
-        if 'process' in self.keyboard:
-            os.kill(self.keyboard['process'].pid, SIGTERM)
-        box.remove(self.keyboard['box'])
-        self.keyboard = None
+        self.keyboard_manager.hide()
         if entry:
             entry.set_sensitive(False)  # Move the focus
             entry.set_sensitive(True)
@@ -1286,7 +1273,7 @@ class KlipperScreen(Gtk.Window):
         keyval_name = Gdk.keyval_name(event.keyval)
         if keyval_name == "Escape":
             self._menu_go_back(home=True)
-        elif keyval_name == "BackSpace" and len(self._cur_panels) > 1 and self.keyboard is None:
+        elif keyval_name == "BackSpace" and len(self._cur_panels) > 1 and not self.keyboard_manager.visible:
             self.base_panel.back()
 
     def update_size(self, *args):
@@ -1324,6 +1311,10 @@ def main():
         "-m", "--monitor", default="0", metavar='<monitor>',
         help="Number of the monitor, that will show Klipperscreen (default: 0)"
     )
+    parser.add_argument(
+        "--capture", default=None, metavar='<capture file>',
+        help="Record the Moonraker traffic to a file for scripts/replay_session.py"
+    )
     args = parser.parse_args()
 
     functions.setup_logging(os.path.normpath(os.path.expanduser(args.logfile)))
@@ -1331,12 +1322,18 @@ def main():
     if not Gtk.init_check():
         logging.critical("Failed to initialize Gtk")
         raise RuntimeError
+    recorder = None
+    if args.capture:
+        recorder = SessionRecorder(args.capture)
+        KlippyWebsocket.recorder = KlippyRest.recorder = recorder
     try:
         win = KlipperScreen(args)
     except Exception as e:
         logging.exception(f"Failed to initialize window\n{e}\n\n{traceback.format_exc()}")
         raise RuntimeError from e
     win.connect("destroy", Gtk.main_quit)
+    if recorder is not None:
+        win.connect("destroy", recorder.close)
     win.show_all()
     Gtk.main()
 
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the drawing code of the widgets on an offscreen cairo surface, no display needed
+
+    python3 scripts/benchmark_drawing.py --save-baseline benchmark_baseline.json   # on the reference machine
+    python3 scripts/benchmark_drawing.py --baseline benchmark_baseline.json        # fails on regressions
+
+Synthetic data covers realistic and extreme sizes: temperature stores of 1200 to 3600 points with up to 16
+sensors, bed meshes up to 50x50 and up to 200 excluded objects of 100 points. For each case the median
+and p95 time per draw and the peak memory allocated during a draw are reported. Baselines are only
+comparable on the same hardware, keep one per device class (a Pi, the CI runner...).
+"""
+
+import argparse
+import gettext
+import json
+import math
+import os
+import random
+import sys
+import tracemalloc
+from statistics import median
+from time import perf_counter
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cairo
+import gi
+
+gi.require_version("Gtk", "3.0")
+
+from ks_includes.printer import Printer
+from ks_includes.widgets.bedmap import BedMap
+from ks_includes.widgets.heatergraph import HeaterGraph
+from ks_includes.widgets.objectmap import ObjectMap
+from panels import job_status
+
+COLORS = ((1, .3, .1), (.1, .6, 1), (.2, .8, .2), (.9, .8, .1), (.7, .3, .9), (.4, .4, .4))
+
+
+def headless(widget_class):
+    """The methods of a widget on a plain class, so its drawing code runs without GTK"""
+    namespace = {key: value for key, value in vars(widget_class).items() if not key.startswith("__")}
+    return type(f"Headless{widget_class.__name__}", (), namespace)
+
+
+class Area:
+    """Stands for the Gtk.DrawingArea passed to the draw handlers"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def get_allocated_width(self):
+        return self.width
+
+    def get_allocated_height(self):
+        return self.height
+
+
+def new_printer(data=None):
+    printer = Printer(lambda state, callback: False, {})
+    if data:
+        printer.process_update(data)
+    return printer
+
+
+def heater_graph(rng, font_size, points, series):
+    printer = new_printer()
+    printer.tempstore_size = points
+    graph = headless(HeaterGraph)()
+    graph.printer = printer
+    graph.store = {}
+    graph.flow = {}
+    graph.font_size = round(font_size * 0.75)
+    graph.max_temp = 300
+    for i in range(series):
+        name = "extruder" if i == 0 else "heater_bed" if i == 1 else f"temperature_sensor sensor_{i}"
+        base = 210 if i == 0 else 60 if i == 1 else 35 + i
+        temperatures, value = [], base
+        for step in range(points):
+            value += rng.gauss(0, .3) + (base - value) * .05
+            temperatures.append(round(value, 2))
+        store = {"temperatures": temperatures}
+        rgb = COLORS[i % len(COLORS)]
+        graph.add_object(name, "temperatures", rgb, False, False)
+        if i < 2:
+            store["targets"] = [float(base)] * points
+            store["powers"] = [round(min(1, max(0, rng.gauss(.4, .1))), 3) for step in range(points)]
+            graph.add_object(name, "targets", rgb, False, True)
+            graph.add_object(name, "powers", rgb, True, False)
+        printer.tempstore[name] = store
+    return graph
+
+
+def bed_map(rng, font_size, size):
+    bed = headless(BedMap)()
+    bed.font_size = font_size
+    bed.font_spacing = round(font_size * 1.5)
+    bed.invert_x = bed.invert_y = False
+    bed.rotation = 0
+    bed.mesh_radius = 0
+    bed.mesh_min = [0, 0]
+    bed.mesh_max = [0, 0]
+    matrix = [
+        [round(.1 * math.sin(x / size * 3) * math.cos(y / size * 2) + rng.gauss(0, .01), 4) for x in range(size)]
+        for y in range(size)
+    ]
+    bed.update_bm({"mesh_min": [10, 10], "mesh_max": [225, 225], "probed_matrix": matrix})
+    return bed
+
+
+def object_map(rng, font_size, count, points):
+    objects = []
+    columns = math.ceil(math.sqrt(count))
+    for i in range(count):
+        cx, cy = 20 + (i % columns) * 200 / columns, 20 + (i // columns) * 200 / columns
+        radius = 80 / columns
+        polygon = [
+            [round(cx + radius * math.cos(2 * math.pi * p / points), 3),
+             round(cy + radius * math.sin(2 * math.pi * p / points), 3)]
+            for p in range(points)
+        ]
+        objects.append({"name": f"PART_{i}", "center": [cx, cy], "polygon": polygon})
+    excluded = [obj["name"] for obj in rng.sample(objects, count // 10)]
+    printer = new_printer({"exclude_object": {
+        "objects": objects, "excluded_objects": excluded, "current_object": objects[0]["name"]
+    }})
+    objmap = headless(ObjectMap)()
+    objmap.printer = printer
+    objmap.font_size = round(font_size * 0.75)
+    objmap.font_spacing = round(objmap.font_size * 1.5)
+    objmap.margin_left = round(objmap.font_size * 2.75)
+    objmap.margin_right = 15
+    objmap.margin_top = 10
+    objmap.margin_bottom = objmap.font_size * 2
+    objmap.min_x = objmap.min_y = 99999999
+    objmap.max_x = objmap.max_y = 0
+    # The map keeps its own state, filled the way the exclude panel does it
+    objmap.queue_draw = lambda: None
+    objmap.current_object = objects[0]["name"]
+    objmap.excluded_objects = set(excluded)
+    objmap.set_objects(objects)
+    return objmap
+
+
+def progress_arc(rng, font_size):
+    panel = headless(job_status.Panel)()
+    panel._gtk = SimpleNamespace(font_size=font_size)
+    panel.progress = .63
+    return panel
+
+
+def cases(rng, font_size, extreme):
+    yield "heatergraph 1200x4", heater_graph(rng, font_size, 1200, 4).draw_graph, (800, 300)
+    yield "heatergraph 1200x16", heater_graph(rng, font_size, 1200, 16).draw_graph, (800, 300)
+    yield "bedmap 5x5", bed_map(rng, font_size, 5).draw_graph, (480, 400)
+    yield "bedmap 15x15", bed_map(rng, font_size, 15).draw_graph, (480, 400)
+    yield "objectmap 20x20", object_map(rng, font_size, 20, 20).draw_graph, (480, 400)
+    yield "progress arc", progress_arc(rng, font_size).on_draw, (480, 480)
+    if extreme:
+        yield "heatergraph 3600x16", heater_graph(rng, font_size, 3600, 16).draw_graph, (1920, 600)
+        yield "bedmap 50x50", bed_map(rng, font_size, 50).draw_graph, (800, 480)
+        yield "objectmap 200x100", object_map(rng, font_size, 200, 100).draw_graph, (800, 480)
+
+
+def measure(draw, size, repeat):
+    area = Area(*size)
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, *size)
+
+    def once():
+        ctx = cairo.Context(surface)
+        ctx.set_operator(cairo.OPERATOR_CLEAR)
+        ctx.paint()
+        ctx.set_operator(cairo.OPERATOR_OVER)
+        start = perf_counter()
+        draw(area, ctx)
+        surface.flush()
+        return perf_counter() - start
+
+    once()
+    times = sorted(once() for run in range(repeat))
+    tracemalloc.start()
+    once()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "median_ms": round(median(times) * 1000, 3),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * .95))] * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the drawing code of the widgets")
+    parser.add_argument("--repeat", type=int, default=30, help="draws measured per case")
+    parser.add_argument("--font-size", type=int, default=20)
+    parser.add_argument("--no-extreme", action="store_true", help="skip the extreme sizes")
+    parser.add_argument("--baseline", help="compare to this baseline and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=.25, help="allowed slowdown over the baseline, 0.25 = 25%%")
+    parser.add_argument("--save-baseline", help="write the results as a baseline to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    gettext.install("KlipperScreen")
+
+    rng = random.Random(args.seed)
+    results = {}
+    print(f"{'case':24} {'median ms':>10} {'p95 ms':>10} {'peak KiB':>10}")
+    for name, draw, size in cases(rng, args.font_size, not args.no_extreme):
+        results[name] = measure(draw, size, args.repeat)
+        print(f"{name:24} {results[name]['median_ms']:>10} {results[name]['p95_ms']:>10} "
+              f"{results[name]['peak_kib']:>10}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        limit = baseline[name]["median_ms"] * (1 + args.tolerance)
+        if result["median_ms"] > limit:
+            regressions.append(f"{name}: {result['median_ms']} ms, baseline {baseline[name]['median_ms']} ms")
+        peak_limit = baseline[name]["peak_kib"] * (1 + args.tolerance)
+        if result["peak_kib"] > max(peak_limit, baseline[name]["peak_kib"] + 16):
+            regressions.append(f"{name}: {result['peak_kib']} KiB, baseline {baseline[name]['peak_kib']} KiB")
+    for regression in regressions:
+        print(f"Regression {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,832 @@
+#!/usr/bin/env python3
+"""
+Moonraker stand-in for exercising KlipperScreen without hardware
+
+Serves the websocket and the HTTP endpoints used by KlipperScreen on localhost, with a simulated printer
+streaming notify_status_update traffic at configurable rates. Only the standard library is used,
+so it runs offline on any Linux box, for example in CI:
+
+    python3 scripts/moonraker_simulator.py --port 7125 --files 5000 --sensors 16 --motion-hz 50 \
+        --scenario print --duration 600 --pid $(pgrep -f screen.py) --report sim_report.json
+
+Scenarios:
+    idle        the printer stays ready, only temperatures and sensors change
+    print       back to back print cycles: start, progress, complete
+    pause       print cycles paused and resumed half way
+    storm       print cycles with Klipper disconnects and websocket drops every --storm-interval seconds
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import struct
+import time
+import zlib
+from collections import Counter, defaultdict
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B63"
+STORE_SIZE = 1200
+
+
+def png(width, height, rgb):
+    """A solid color png, enough to exercise the thumbnail loading"""
+    row = b"\x00" + bytes(rgb) * width
+    raw = zlib.compress(row * height)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", raw) + chunk(b"IEND", b"")
+
+
+class SimPrinter:
+    """State of the simulated Klipper, changes are collected and flushed as status deltas"""
+
+    def __init__(self, args, rng):
+        self.args = args
+        self.rng = rng
+        self.extruders = ["extruder"] + [f"extruder{i}" for i in range(1, args.extruders)]
+        self.sensors = [f"temperature_sensor sensor_{i}" for i in range(args.sensors)]
+        self.heaters = self.extruders + ["heater_bed"]
+        self.files = self._make_files(args.files)
+        self.thumbnails = {}
+        self.config = self._make_config()
+        self.status = self._make_status()
+        self.changes = defaultdict(dict)
+        self.store = {
+            name: {
+                "temperatures": [25.0] * STORE_SIZE,
+                **({"targets": [0.0] * STORE_SIZE, "powers": [0.0] * STORE_SIZE} if name in self.heaters else {}),
+            }
+            for name in self.heaters + self.sensors
+        }
+        self.print_start = None
+        self.paused_at = None
+        self.paused_total = 0.0
+
+    def _make_files(self, count):
+        now = time.time()
+        files = {}
+        for i in range(count):
+            path = f"sim/part_{i:05d}.gcode"
+            size = 200000 + (i * 7919) % 5000000
+            files[path] = {
+                "path": path,
+                "modified": now - i * 60,
+                "size": size,
+                "permissions": "rw",
+            }
+        return files
+
+    def metadata(self, path):
+        info = self.files[path]
+        stem = os.path.splitext(os.path.basename(path))[0]
+        thumbs = []
+        for side in (32, 300):
+            relative = f".thumbs/{stem}-{side}x{side}.png"
+            thumbs.append({"width": side, "height": side, "size": 0, "relative_path": relative})
+            self.thumbnails[os.path.join(os.path.dirname(path), relative)] = side
+        return {
+            "filename": path,
+            "size": info["size"],
+            "modified": info["modified"],
+            "slicer": "SimSlicer",
+            "slicer_version": "1.0",
+            "layer_height": 0.2,
+            "first_layer_height": 0.2,
+            "object_height": 20.0,
+            "filament_total": info["size"] / 100,
+            "estimated_time": self.args.cycle_seconds,
+            "first_layer_extr_temp": 210.0,
+            "first_layer_bed_temp": 60.0,
+            "gcode_start_byte": 1000,
+            "gcode_end_byte": info["size"] - 1000,
+            "thumbnails": thumbs,
+        }
+
+    def _make_config(self):
+        config = {
+            "printer": {"kinematics": "cartesian", "max_velocity": "300", "max_accel": "3000"},
+            "stepper_x": {"position_endstop": "0", "position_max": "235"},
+            "stepper_y": {"position_endstop": "0", "position_max": "235"},
+            "stepper_z": {"position_endstop": "0", "position_max": "250"},
+            "heater_bed": {"max_temp": "120"},
+            "fan": {},
+            "virtual_sdcard": {"path": "~/printer_data/gcodes"},
+            "pause_resume": {},
+            "display_status": {},
+            "exclude_object": {},
+            "bed_mesh": {"mesh_min": "10, 10", "mesh_max": "225, 225", "probe_count": "5, 5"},
+            "probe": {"z_offset": "1.0"},
+            "firmware_retraction": {},
+            "gcode_macro PRINT_START": {"gcode": ""},
+            "gcode_macro PRINT_END": {"gcode": ""},
+            "gcode_macro LOAD_FILAMENT": {"gcode": ""},
+        }
+        for extruder in self.extruders:
+            config[extruder] = {"filament_diameter": "1.75", "nozzle_diameter": "0.4", "max_temp": "280"}
+        for sensor in self.sensors:
+            config[sensor] = {"sensor_type": "temperature_host"}
+        return config
+
+    def _make_status(self):
+        status = {
+            "webhooks": {"state": "ready", "state_message": "Printer is ready"},
+            "configfile": {"config": self.config, "settings": {}, "warnings": []},
+            "print_stats": {
+                "filename": "", "total_duration": 0.0, "print_duration": 0.0, "filament_used": 0.0,
+                "state": "standby", "message": "", "info": {"total_layer": None, "current_layer": None},
+            },
+            "virtual_sdcard": {"file_path": None, "progress": 0.0, "is_active": False, "file_position": 0,
+                               "file_size": 0},
+            "display_status": {"progress": 0.0, "message": None},
+            "idle_timeout": {"state": "Idle", "printing_time": 0.0},
+            "pause_resume": {"is_paused": False},
+            "toolhead": {
+                "homed_axes": "xyz", "axis_minimum": [0, 0, 0, 0], "axis_maximum": [235, 235, 250, 0],
+                "print_time": 0.0, "estimated_print_time": 0.0, "extruder": "extruder",
+                "position": [0.0, 0.0, 0.0, 0.0], "max_velocity": 300, "max_accel": 3000,
+                "minimum_cruise_ratio": 0.5, "square_corner_velocity": 5.0,
+            },
+            "gcode_move": {
+                "speed_factor": 1.0, "speed": 1500.0, "extrude_factor": 1.0, "absolute_coordinates": True,
+                "absolute_extrude": True, "homing_origin": [0.0, 0.0, 0.0, 0.0],
+                "position": [0.0, 0.0, 0.0, 0.0], "gcode_position": [0.0, 0.0, 0.0, 0.0],
+            },
+            "motion_report": {"live_position": [0.0, 0.0, 0.0, 0.0], "live_velocity": 0.0,
+                              "live_extruder_velocity": 0.0},
+            "fan": {"speed": 0.0},
+            "exclude_object": {"objects": [], "excluded_objects": [], "current_object": None},
+            "bed_mesh": {"profile_name": "", "mesh_min": [10, 10], "mesh_max": [225, 225], "probed_matrix": [[]],
+                         "profiles": {}},
+            "manual_probe": {"is_active": False},
+            "firmware_retraction": {"retract_length": 0.5, "retract_speed": 30, "unretract_extra_length": 0,
+                                    "unretract_speed": 30},
+            "heater_bed": {"temperature": 25.0, "target": 0.0, "power": 0.0},
+        }
+        for extruder in self.extruders:
+            status[extruder] = {"temperature": 25.0, "target": 0.0, "power": 0.0, "can_extrude": False,
+                                "pressure_advance": 0.04, "smooth_time": 0.04}
+        for sensor in self.sensors:
+            status[sensor] = {"temperature": 30.0 + self.rng.random() * 10, "measured_min_temp": 20.0,
+                              "measured_max_temp": 60.0}
+        return status
+
+    def set(self, obj, field, value):
+        if self.status[obj].get(field) != value:
+            self.status[obj][field] = value
+            self.changes[obj][field] = value
+
+    def flush(self):
+        changes, self.changes = self.changes, defaultdict(dict)
+        return changes
+
+    def query(self, objects):
+        result = {}
+        for name, fields in objects.items():
+            if name not in self.status:
+                continue
+            result[name] = dict(self.status[name]) if not fields else {
+                field: self.status[name][field] for field in fields if field in self.status[name]
+            }
+        return result
+
+    @property
+    def state(self):
+        return self.status["print_stats"]["state"]
+
+    # Printing
+
+    def start(self, filename):
+        if filename not in self.files:
+            raise KeyError(filename)
+        self.print_start = time.monotonic()
+        self.paused_total = 0.0
+        size = self.files[filename]["size"]
+        self.set("print_stats", "filename", filename)
+        self.set("print_stats", "state", "printing")
+        self.set("print_stats", "info", {"total_layer": 100, "current_layer": 0})
+        self.set("virtual_sdcard", "file_path", f"/sim/gcodes/{filename}")
+        self.set("virtual_sdcard", "file_size", size)
+        self.set("virtual_sdcard", "is_active", True)
+        self.set("idle_timeout", "state", "Printing")
+        objects = [{"name": f"PART_{i}", "center": [40 + i * 40, 100], "polygon": []} for i in range(4)]
+        self.set("exclude_object", "objects", objects)
+        for heater in self.heaters:
+            self.set(heater, "target", 60.0 if heater == "heater_bed" else 210.0)
+
+    def pause(self):
+        if self.state == "printing":
+            self.paused_at = time.monotonic()
+            self.set("print_stats", "state", "paused")
+            self.set("pause_resume", "is_paused", True)
+
+    def resume(self):
+        if self.state == "paused":
+            self.paused_total += time.monotonic() - self.paused_at
+            self.paused_at = None
+            self.set("print_stats", "state", "printing")
+            self.set("pause_resume", "is_paused", False)
+
+    def finish(self, state="complete"):
+        self.set("print_stats", "state", state)
+        self.set("virtual_sdcard", "is_active", False)
+        self.set("idle_timeout", "state", "Ready")
+        self.set("motion_report", "live_velocity", 0.0)
+        self.set("motion_report", "live_extruder_velocity", 0.0)
+        for heater in self.heaters:
+            self.set(heater, "target", 0.0)
+        self.print_start = None
+
+    def gcode(self, script):
+        for line in script.splitlines():
+            words = line.split()
+            if not words:
+                continue
+            cmd = words[0].upper()
+            params = {}
+            for word in words[1:]:
+                if "=" in word:
+                    key, value = word.split("=", 1)
+                    params[key.upper()] = value.strip('"')
+                else:
+                    params[word[:1].upper()] = word[1:]
+            if cmd == "SDCARD_PRINT_FILE":
+                self.start(params.get("FILENAME", ""))
+            elif cmd == "SDCARD_RESET_FILE":
+                self.set("print_stats", "state", "standby")
+            elif cmd == "M104" or cmd == "M109":
+                tool = int(params.get("T", 0))
+                if tool < len(self.extruders):
+                    self.set(self.extruders[tool], "target", float(params.get("S", 0)))
+            elif cmd == "M140" or cmd == "M190":
+                self.set("heater_bed", "target", float(params.get("S", 0)))
+            elif cmd == "SET_HEATER_TEMPERATURE" and params.get("HEATER") in self.heaters:
+                self.set(params["HEATER"], "target", float(params.get("TARGET", 0)))
+            elif cmd == "M220":
+                self.set("gcode_move", "speed_factor", float(params.get("S", 100)) / 100)
+            elif cmd == "M221":
+                self.set("gcode_move", "extrude_factor", float(params.get("S", 100)) / 100)
+            elif cmd == "ACTIVATE_EXTRUDER" and params.get("EXTRUDER") in self.extruders:
+                self.set("toolhead", "extruder", params["EXTRUDER"])
+            elif cmd in ("T0", "T1", "T2", "T3") and int(cmd[1:]) < len(self.extruders):
+                self.set("toolhead", "extruder", self.extruders[int(cmd[1:])])
+            elif cmd == "SET_GCODE_OFFSET" and "Z" in params:
+                self.set("gcode_move", "homing_origin", [0.0, 0.0, float(params["Z"]), 0.0])
+            elif cmd == "M106":
+                self.set("fan", "speed", float(params.get("S", 255)) / 255)
+            elif cmd == "M107":
+                self.set("fan", "speed", 0.0)
+
+    # Simulation steps
+
+    def step_motion(self, now):
+        if self.state != "printing":
+            return
+        t = now - self.print_start - self.paused_total
+        x = 117.5 + 60 * math.sin(t * 1.7)
+        y = 117.5 + 60 * math.cos(t * 1.3)
+        progress = min(t / self.args.cycle_seconds, 1.0)
+        z = round(0.2 + progress * 19.8, 2)
+        velocity = abs(100 * math.cos(t * 1.7)) + 20
+        position = [round(x, 3), round(y, 3), z, round(t * 2, 3)]
+        self.set("motion_report", "live_position", position)
+        self.set("motion_report", "live_velocity", round(velocity, 2))
+        self.set("motion_report", "live_extruder_velocity", round(velocity * 0.02 + self.rng.random() * 0.1, 3))
+        self.set("gcode_move", "gcode_position", position)
+        self.set("toolhead", "position", position)
+
+    def step_status(self, now, period):
+        for heater in self.heaters:
+            status = self.status[heater]
+            error = status["target"] - status["temperature"]
+            power = max(0.0, min(1.0, error / 20)) if status["target"] else 0.0
+            temperature = status["temperature"] + error * min(period, 1.0) * 0.15 + self.rng.gauss(0, 0.1)
+            self.set(heater, "temperature", round(max(temperature, 20.0), 2))
+            self.set(heater, "power", round(power, 3))
+        for sensor in self.sensors:
+            temperature = self.status[sensor]["temperature"] + self.rng.gauss(0, 0.05)
+            self.set(sensor, "temperature", round(temperature, 2))
+        if self.print_start is None or self.state != "printing":
+            return
+        elapsed = now - self.print_start
+        printing = elapsed - self.paused_total
+        progress = min(printing / self.args.cycle_seconds, 1.0)
+        size = self.status["virtual_sdcard"]["file_size"]
+        self.set("print_stats", "total_duration", round(elapsed, 2))
+        self.set("print_stats", "print_duration", round(printing, 2))
+        self.set("print_stats", "filament_used", round(printing * 15, 1))
+        self.set("print_stats", "info", {"total_layer": 100, "current_layer": int(progress * 100)})
+        self.set("virtual_sdcard", "progress", round(progress, 4))
+        self.set("virtual_sdcard", "file_position", int(1000 + progress * (size - 2000)))
+        self.set("display_status", "progress", round(progress, 4))
+        if progress >= 1.0:
+            self.finish()
+
+    def step_store(self):
+        for name, store in self.store.items():
+            for key, values in store.items():
+                values.pop(0)
+                values.append(self.status[name][key[:-1]])
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.subscription = {}
+        self.closed = False
+
+    async def send(self, payload):
+        data = payload.encode()
+        length = len(data)
+        if length < 126:
+            header = struct.pack("!BB", 0x81, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x81, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x81, 127, length)
+        self.writer.write(header + data)
+        await self.writer.drain()
+        return len(header) + length
+
+    async def receive(self):
+        """Returns the next text message, None when the connection is closed"""
+        message = b""
+        while True:
+            head = await self.reader.readexactly(2)
+            opcode = head[0] & 0x0F
+            length = head[1] & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", await self.reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", await self.reader.readexactly(8))[0]
+            mask = await self.reader.readexactly(4) if head[1] & 0x80 else b"\x00" * 4
+            payload = bytearray(await self.reader.readexactly(length))
+            for i in range(length):
+                payload[i] ^= mask[i % 4]
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                self.writer.write(struct.pack("!BB", 0x8A, len(payload)) + bytes(payload))
+                continue
+            if opcode in (0x0, 0x1, 0x2):
+                message += payload
+                if head[0] & 0x80:
+                    return message.decode()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.writer.write(struct.pack("!BB", 0x88, 0))
+            except (ConnectionError, RuntimeError):
+                pass
+            self.writer.close()
+
+
+class Simulator:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.printer = SimPrinter(args, self.rng)
+        self.clients = []
+        self.started = time.monotonic()
+        self.sent = Counter()
+        self.sent_bytes = 0
+        self.requests = Counter()
+        self.reactions = defaultdict(list)
+        self.pending_event = None
+        self.samples = []
+        self._cpu = None
+        self.history = [
+            {
+                "job_id": f"{i:06X}", "filename": path, "status": "completed", "print_duration": 1800 + i * 7,
+                "total_duration": 1900 + i * 7, "start_time": time.time() - i * 3600, "end_time": None,
+                "filament_used": 1000.0,
+            }
+            for i, path in enumerate(list(self.printer.files)[:50])
+        ]
+
+    # Events
+
+    def event(self, name):
+        """Marks a scripted event, the delay until the next client request is recorded as its reaction time"""
+        self.pending_event = (name, time.monotonic())
+
+    def _request(self, method):
+        self.requests[method] += 1
+        if self.pending_event is not None:
+            name, start = self.pending_event
+            self.reactions[name].append(time.monotonic() - start)
+            self.pending_event = None
+
+    async def notify(self, method, params):
+        if not self.clients:
+            return
+        payload = json.dumps({"jsonrpc": "2.0", "method": method, "params": params})
+        for client in list(self.clients):
+            try:
+                self.sent_bytes += await client.send(payload)
+                self.sent[method] += 1
+            except (ConnectionError, RuntimeError):
+                self._drop(client)
+
+    async def broadcast_status(self):
+        changes = self.printer.flush()
+        if not changes or not self.clients:
+            return
+        eventtime = time.monotonic()
+        for client in list(self.clients):
+            delta = {
+                name: values for name, values in changes.items()
+                if name in client.subscription
+            }
+            if not delta:
+                continue
+            payload = json.dumps({"jsonrpc": "2.0", "method": "notify_status_update", "params": [delta, eventtime]})
+            try:
+                self.sent_bytes += await client.send(payload)
+                self.sent["notify_status_update"] += 1
+            except (ConnectionError, RuntimeError):
+                self._drop(client)
+
+    def _drop(self, client):
+        client.close()
+        if client in self.clients:
+            self.clients.remove(client)
+
+    # Requests
+
+    def server_info(self):
+        return {
+            "klippy_connected": self.printer.status["webhooks"]["state"] != "disconnected",
+            "klippy_state": self.printer.status["webhooks"]["state"],
+            "components": ["server", "file_manager", "history", "data_store", "webcam", "machine"],
+            "failed_components": [], "registered_directories": ["gcodes", "config"],
+            "warnings": [], "websocket_count": len(self.clients), "moonraker_version": "v0.9.0-sim",
+            "missing_klippy_requirements": [], "api_version": [1, 5, 0], "api_version_string": "1.5.0",
+        }
+
+    def printer_info(self):
+        state = self.printer.status["webhooks"]["state"]
+        return {
+            "state": state, "state_message": self.printer.status["webhooks"]["state_message"],
+            "hostname": "simulator", "software_version": "v0.12.0-sim", "cpu_info": "simulated",
+            "klipper_path": "/sim/klipper", "python_path": "/sim/python", "log_file": "/sim/klippy.log",
+            "config_file": "/sim/printer.cfg",
+        }
+
+    def temperature_store(self):
+        return {name: {key: list(values) for key, values in store.items()}
+                for name, store in self.printer.store.items()}
+
+    def handle(self, method, params, client=None):
+        """Moonraker methods, shared by the websocket and the HTTP endpoints"""
+        self._request(method)
+        printer = self.printer
+        if method == "server.info":
+            return self.server_info()
+        if method == "server.connection.identify":
+            return {"connection_id": id(client)}
+        if method == "printer.info":
+            return self.printer_info()
+        if method in ("printer.objects.query", "printer.objects.subscribe"):
+            objects = params.get("objects", {})
+            if client is not None and method.endswith("subscribe"):
+                client.subscription = objects
+            return {"eventtime": time.monotonic(), "status": printer.query(objects)}
+        if method == "printer.objects.list":
+            return {"objects": list(printer.status)}
+        if method == "printer.gcode.help":
+            return {"G28": "Home", "SDCARD_PRINT_FILE": "Print", "Z_OFFSET_APPLY_PROBE": "Apply",
+                    "Z_OFFSET_APPLY_ENDSTOP": "Apply", "M221": "Flow"}
+        if method == "printer.gcode.script":
+            printer.gcode(params.get("script", ""))
+            return "ok"
+        if method == "printer.print.start":
+            printer.start(params["filename"])
+            return "ok"
+        if method == "printer.print.pause":
+            printer.pause()
+            return "ok"
+        if method == "printer.print.resume":
+            printer.resume()
+            return "ok"
+        if method == "printer.print.cancel":
+            printer.finish("cancelled")
+            return "ok"
+        if method in ("printer.emergency_stop", "printer.restart", "printer.firmware_restart"):
+            return "ok"
+        if method == "server.files.list":
+            return list(printer.files.values())
+        if method == "server.files.get_directory":
+            return {"dirs": [{"dirname": "sim", "modified": time.time(), "size": 4096, "permissions": "rw"}],
+                    "files": [], "disk_usage": {"total": 1 << 34, "used": 1 << 32, "free": 3 << 32},
+                    "root_info": {"name": "gcodes", "permissions": "rw"}}
+        if method == "server.files.metadata":
+            return printer.metadata(params["filename"])
+        if method == "server.history.list":
+            limit = int(params.get("limit", 50))
+            return {"count": len(self.history), "jobs": self.history[:limit]}
+        if method == "server.temperature_store":
+            return self.temperature_store()
+        if method == "server.config":
+            return {"config": {"data_store": {"temperature_store_size": STORE_SIZE}}}
+        if method == "machine.system_info":
+            return {"system_info": {"cpu_info": {"cpu_count": 4, "model": "simulated"},
+                                    "distribution": {"name": "Simulated"}}}
+        if method == "server.webcams.list":
+            return {"webcams": []}
+        if method == "machine.device_power.devices":
+            return {"devices": []}
+        if method == "access.oneshot_token":
+            return "simulated"
+        raise KeyError(method)
+
+    async def serve_websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        client = Client(reader, writer)
+        self.clients.append(client)
+        logging.info(f"Websocket client connected ({len(self.clients)})")
+        try:
+            while True:
+                message = await client.receive()
+                if message is None:
+                    break
+                request = json.loads(message)
+                response = {"jsonrpc": "2.0", "id": request.get("id")}
+                try:
+                    response["result"] = self.handle(request.get("method"), request.get("params") or {}, client)
+                except KeyError as e:
+                    response["error"] = {"code": 404, "message": f"Not found: {e}"}
+                except (ValueError, TypeError) as e:
+                    response["error"] = {"code": 400, "message": str(e)}
+                if request.get("id") is not None:
+                    self.sent_bytes += await client.send(json.dumps(response))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._drop(client)
+            logging.info(f"Websocket client disconnected ({len(self.clients)})")
+
+    def route(self, verb, path, query):
+        """Maps the HTTP endpoints to the websocket methods"""
+        path = path.strip("/")
+        if path.startswith("server/files/gcodes/"):
+            thumb = unquote(path[len("server/files/gcodes/"):])
+            side = self.printer.thumbnails.get(thumb)
+            if side is None:
+                raise KeyError(thumb)
+            self._request("thumbnail")
+            return png(side, side, (self.rng.randrange(256), 128, 64))
+        if path == "printer/objects/query":
+            return self.handle("printer.objects.query", {"objects": {name: None for name, value in query}})
+        params = dict(query)
+        return self.handle(path.replace("/", "."), params)
+
+    async def serve(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode().strip()
+            if not request_line:
+                writer.close()
+                return
+            verb, target = request_line.split(" ")[:2]
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode().strip()
+                if not line:
+                    break
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+            if headers.get("upgrade", "").lower() == "websocket":
+                await self.serve_websocket(reader, writer, headers)
+                return
+            if "content-length" in headers:
+                await reader.readexactly(int(headers["content-length"]))
+            url = urlsplit(target)
+            try:
+                result = self.route(verb, url.path, parse_qsl(url.query, keep_blank_values=True))
+                if isinstance(result, bytes):
+                    status, kind, body = "200 OK", "image/png", result
+                else:
+                    status, kind, body = "200 OK", "application/json", json.dumps({"result": result}).encode()
+            except KeyError as e:
+                status, kind = "404 Not Found", "application/json"
+                body = json.dumps({"error": {"code": 404, "message": f"Not found: {e}"}}).encode()
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {kind}\r\nContent-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+            self.sent_bytes += len(body)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # Load
+
+    async def motion_loop(self):
+        period = 1 / self.args.motion_hz
+        while True:
+            await asyncio.sleep(period)
+            self.printer.step_motion(time.monotonic())
+            await self.broadcast_status()
+
+    async def status_loop(self):
+        period = 1 / self.args.status_hz
+        store_due = time.monotonic()
+        while True:
+            await asyncio.sleep(period)
+            now = time.monotonic()
+            was = self.printer.state
+            self.printer.step_status(now, period)
+            if was != self.printer.state:
+                self.event(f"print_{self.printer.state}")
+            if now >= store_due:
+                store_due += 1
+                self.printer.step_store()
+            await self.broadcast_status()
+
+    async def scenario_loop(self):
+        scenario = self.args.scenario
+        if scenario == "idle":
+            return
+        files = list(self.printer.files)
+        cycle = 0
+        while True:
+            await asyncio.sleep(self.args.changeover)
+            if self.printer.state != "printing" and self.printer.status["webhooks"]["state"] == "ready":
+                filename = files[cycle % len(files)]
+                cycle += 1
+                logging.info(f"Cycle {cycle}: {filename}")
+                self.printer.start(filename)
+                self.event("print_start")
+            if scenario == "pause":
+                await asyncio.sleep(self.args.cycle_seconds / 2)
+                self.printer.pause()
+                self.event("pause")
+                await asyncio.sleep(self.args.changeover)
+                self.printer.resume()
+                self.event("resume")
+            while self.printer.state in ("printing", "paused"):
+                await asyncio.sleep(0.5)
+
+    async def storm_loop(self):
+        while True:
+            await asyncio.sleep(self.args.storm_interval)
+            if self.rng.random() < 0.5:
+                logging.info("Storm: Klipper disconnect")
+                self.printer.set("webhooks", "state", "startup")
+                await self.notify("notify_klippy_disconnected", [])
+                await asyncio.sleep(1)
+                self.printer.set("webhooks", "state", "ready")
+                await self.notify("notify_klippy_ready", [])
+                self.event("klippy_ready")
+            else:
+                logging.info(f"Storm: dropping {len(self.clients)} websockets")
+                for client in list(self.clients):
+                    self._drop(client)
+                self.event("reconnect")
+
+    def sample(self):
+        elapsed = time.monotonic() - self.started
+        sample = {
+            "elapsed": round(elapsed, 1),
+            "clients": len(self.clients),
+            "notifications": sum(self.sent.values()),
+            "bytes": self.sent_bytes,
+            "requests": sum(self.requests.values()),
+        }
+        if self.args.pid:
+            sample.update(self.process_usage(self.args.pid))
+        return sample
+
+    def process_usage(self, pid):
+        usage = {}
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        usage["rss_kb"] = int(line.split()[1])
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+            now = time.monotonic()
+            if self._cpu is not None:
+                usage["cpu_percent"] = round(100 * (cpu - self._cpu[0]) / (now - self._cpu[1]), 1)
+            self._cpu = (cpu, now)
+        except (OSError, IndexError, ValueError):
+            pass
+        return usage
+
+    async def report_loop(self):
+        last = self.sample()
+        while True:
+            await asyncio.sleep(self.args.report_interval)
+            sample = self.sample()
+            self.samples.append(sample)
+            span = sample["elapsed"] - last["elapsed"]
+            logging.info(
+                f"{(sample['notifications'] - last['notifications']) / span:.0f} msg/s "
+                f"{(sample['bytes'] - last['bytes']) / span / 1024:.0f} KiB/s "
+                f"{(sample['requests'] - last['requests']) / span:.1f} req/s clients {sample['clients']}"
+                + (f" rss {sample['rss_kb'] / 1024:.1f} MiB" if "rss_kb" in sample else "")
+                + (f" cpu {sample['cpu_percent']}%" if "cpu_percent" in sample else "")
+            )
+            last = sample
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        reactions = {
+            name: {"count": len(values), "mean": round(sum(values) / len(values), 4), "max": round(max(values), 4)}
+            for name, values in self.reactions.items() if values
+        }
+        rss = [s["rss_kb"] for s in self.samples if "rss_kb" in s]
+        cpu = [s["cpu_percent"] for s in self.samples if "cpu_percent" in s]
+        return {
+            "scenario": self.args.scenario,
+            "duration": round(elapsed, 1),
+            "notifications": dict(self.sent),
+            "notifications_per_second": round(sum(self.sent.values()) / elapsed, 1),
+            "bytes_per_second": round(self.sent_bytes / elapsed),
+            "requests": dict(self.requests.most_common()),
+            "reaction_seconds": reactions,
+            "rss_kb": {"max": max(rss), "last": rss[-1]} if rss else None,
+            "cpu_percent": {"mean": round(sum(cpu) / len(cpu), 1), "max": max(cpu)} if cpu else None,
+            "samples": self.samples,
+        }
+
+    async def run(self):
+        server = await asyncio.start_server(self.serve, self.args.host, self.args.port)
+        logging.info(
+            f"Moonraker simulator on {self.args.host}:{self.args.port} scenario {self.args.scenario}, "
+            f"{len(self.printer.files)} files, {len(self.printer.sensors)} sensors, motion {self.args.motion_hz} Hz"
+        )
+        tasks = [self.motion_loop(), self.status_loop(), self.scenario_loop(), self.report_loop()]
+        if self.args.scenario == "storm":
+            tasks.append(self.storm_loop())
+        running = [asyncio.ensure_future(task) for task in tasks]
+        try:
+            if self.args.duration:
+                await asyncio.sleep(self.args.duration)
+            else:
+                await asyncio.gather(*running)
+        finally:
+            for task in running:
+                task.cancel()
+            server.close()
+            for client in list(self.clients):
+                self._drop(client)
+        summary = self.summary()
+        if self.args.report:
+            with open(self.args.report, "w") as f:
+                json.dump(summary, f, indent=2)
+        logging.info(f"Summary: {json.dumps({k: v for k, v in summary.items() if k != 'samples'})}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moonraker simulator for KlipperScreen")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7125)
+    parser.add_argument("--scenario", choices=("idle", "print", "pause", "storm"), default="print")
+    parser.add_argument("--files", type=int, default=1000, help="number of gcode files")
+    parser.add_argument("--extruders", type=int, default=2)
+    parser.add_argument("--sensors", type=int, default=8, help="number of temperature sensors")
+    parser.add_argument("--motion-hz", type=float, default=50, help="motion_report update rate")
+    parser.add_argument("--status-hz", type=float, default=4, help="temperature and print progress update rate")
+    parser.add_argument("--cycle-seconds", type=float, default=120, help="duration of a simulated print")
+    parser.add_argument("--changeover", type=float, default=5, help="seconds between scripted prints")
+    parser.add_argument("--storm-interval", type=float, default=20, help="seconds between storm events")
+    parser.add_argument("--duration", type=float, default=0, help="stop after this many seconds, 0 runs forever")
+    parser.add_argument("--report-interval", type=float, default=5)
+    parser.add_argument("--report", help="write a json summary to this file when done")
+    parser.add_argument("--pid", type=int, help="KlipperScreen process to sample memory and cpu from")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    args.motion_hz = max(0.1, min(args.motion_hz, 200))
+    args.status_hz = max(0.1, args.status_hz)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    try:
+        asyncio.run(Simulator(args).run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Replays a capture made with `screen.py --capture <file>` into KlipperScreen
+
+The recorded notifications are fed to KlipperScreen._websocket_callback at the recorded pace, or N times faster,
+the REST and websocket requests made by the screen are answered with the recorded responses.
+Reported: handling time and net allocated memory blocks per message type, and stalls of the GTK main loop.
+
+    python3 scripts/replay_session.py capture.jsonl.gz --speed 4 --report replay.json
+    xvfb-run python3 scripts/replay_session.py capture.jsonl.gz   # without a display
+
+--headless skips the window and only feeds the printer state, to profile the data layer.
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import sys
+import tracemalloc
+from collections import defaultdict
+from time import monotonic, perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib, Gtk
+
+from ks_includes import printer_pool
+from ks_includes.KlippyRest import KlippyRest
+from ks_includes.KlippyWebsocket import KlippyWebsocket
+from ks_includes.printer import Printer
+from ks_includes.session_recorder import read_capture
+
+HEARTBEAT_MS = 10
+SETTLE_SECONDS = 1
+INIT_TIMEOUT = 30
+
+
+class Recording:
+    """The traffic of one printer in a capture"""
+
+    def __init__(self, path, url=None):
+        self.url = url
+        self.rest = {}
+        self.responses = {}
+        self.messages = []
+        pending = {}
+        for t, kind, source, data in read_capture(path):
+            if self.url is None:
+                self.url = source
+            if source != self.url:
+                continue
+            if kind == "rest":
+                self.rest.setdefault(data["path"], data["response"])
+            elif kind == "open":
+                # Request ids start again with each connection
+                pending.clear()
+            elif kind == "out":
+                request = json.loads(data)
+                pending[request["id"]] = (request["method"], self._key(request.get("params")))
+            elif kind == "in":
+                message = json.loads(data)
+                if "id" in message:
+                    if message["id"] in pending:
+                        method, params = pending.pop(message["id"])
+                        self.responses.setdefault((method, params), message)
+                        self.responses.setdefault((method, None), message)
+                elif "method" in message:
+                    params = message.get("params")
+                    self.messages.append((t, message["method"], params[0] if params else {}))
+
+    @staticmethod
+    def _key(params):
+        return json.dumps(params or {}, sort_keys=True)
+
+    def response(self, method, params):
+        found = self.responses.get((method, self._key(params)), self.responses.get((method, None)))
+        return copy.deepcopy(found)
+
+
+class ReplayRest(KlippyRest):
+    recording = None
+
+    def _do_request(self, method, request_method, data=None, json=None, json_response=True, timeout=3):
+        response = self.recording.rest.get(method) if request_method == "get" and json_response else None
+        if response is None:
+            self.status = f"{method} is not in the recording"
+            logging.warning(self.status)
+            return False
+        self.status = ''
+        return copy.deepcopy(response)
+
+
+class ReplayWebsocket(KlippyWebsocket):
+    recording = None
+
+    def initial_connect(self):
+        self.connect()
+
+    def connect(self):
+        self.connected = True
+        self.connecting = False
+        GLib.idle_add(self._callback['on_connect'], priority=GLib.PRIORITY_HIGH_IDLE)
+        return False
+
+    def close(self):
+        self.closing = True
+        self.connected = False
+
+    def send_method(self, method, params=None, callback=None, *args):
+        if not self.connected or self.closing:
+            return False
+        response = self.recording.response(method, params)
+        if callback is not None and response is not None:
+            GLib.idle_add(callback, response, method, params, *args, priority=GLib.PRIORITY_HIGH_IDLE)
+        return True
+
+
+class Player:
+    def __init__(self, recording, speed, stall_ms, dispatch, done):
+        self.messages = recording.messages
+        self.speed = speed
+        self.stall = (HEARTBEAT_MS + stall_ms) / 1000
+        self.dispatch = dispatch
+        self.done = done
+        self.index = 0
+        self.handling = defaultdict(list)
+        self.blocks = defaultdict(int)
+        self.stalls = []
+        self.start = self.t0 = self.last_beat = None
+        self.heartbeat = None
+
+    def run(self):
+        if not self.messages:
+            logging.error("No notifications in the recording")
+            self.done()
+            return False
+        self.t0 = self.messages[0][0]
+        self.start = monotonic()
+        self.last_beat = perf_counter()
+        self.heartbeat = GLib.timeout_add(HEARTBEAT_MS, self._heartbeat, priority=GLib.PRIORITY_HIGH)
+        self._schedule()
+        return False
+
+    def _heartbeat(self):
+        now = perf_counter()
+        gap = now - self.last_beat
+        if gap > self.stall:
+            offset = self.messages[min(self.index, len(self.messages) - 1)][0] - self.t0
+            self.stalls.append((gap, offset))
+        self.last_beat = now
+        return True
+
+    def _schedule(self):
+        if self.index >= len(self.messages):
+            GLib.timeout_add_seconds(SETTLE_SECONDS, self._finish)
+        elif self.speed <= 0:
+            GLib.idle_add(self._feed)
+        else:
+            due = (self.messages[self.index][0] - self.t0) / self.speed - (monotonic() - self.start)
+            GLib.timeout_add(max(0, int(due * 1000)), self._feed)
+
+    def _feed(self):
+        elapsed = (monotonic() - self.start) * self.speed
+        while self.index < len(self.messages):
+            t, action, data = self.messages[self.index]
+            if self.speed > 0 and t - self.t0 > elapsed:
+                break
+            self.index += 1
+            blocks = sys.getallocatedblocks()
+            start = perf_counter()
+            self.dispatch(action, data)
+            self.handling[action].append(perf_counter() - start)
+            self.blocks[action] += sys.getallocatedblocks() - blocks
+            if self.speed <= 0:
+                break
+        self._schedule()
+        return False
+
+    def _finish(self):
+        GLib.source_remove(self.heartbeat)
+        self.done()
+        return False
+
+    @staticmethod
+    def _percentile(values, fraction):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def report(self):
+        handling = {
+            action: {
+                "count": len(times),
+                "total_ms": round(sum(times) * 1000, 2),
+                "mean_ms": round(sum(times) / len(times) * 1000, 3),
+                "p95_ms": round(self._percentile(times, .95) * 1000, 3),
+                "max_ms": round(max(times) * 1000, 3),
+                "net_blocks": self.blocks[action],
+            }
+            for action, times in sorted(self.handling.items(), key=lambda item: -sum(item[1]))
+        }
+        gaps = [gap for gap, offset in self.stalls]
+        stalls = {
+            "count": len(gaps),
+            "total_ms": round(sum(gaps) * 1000, 1),
+            "p95_ms": round(self._percentile(gaps, .95) * 1000, 1) if gaps else 0,
+            "max_ms": round(max(gaps) * 1000, 1) if gaps else 0,
+            "longest": [
+                {"ms": round(gap * 1000, 1), "at_seconds": round(offset, 2)}
+                for gap, offset in sorted(self.stalls, reverse=True)[:10]
+            ],
+        }
+        return {
+            "messages": self.index,
+            "recorded_seconds": round(self.messages[-1][0] - self.t0, 2) if self.messages else 0,
+            "replay_seconds": round(monotonic() - self.start, 2) if self.start else 0,
+            "handling": handling,
+            "stalls": stalls,
+        }
+
+
+def print_report(report, top):
+    print(f"{report['messages']} messages, recorded {report['recorded_seconds']}s, "
+          f"replayed in {report['replay_seconds']}s")
+    print(f"{'message':32} {'count':>7} {'total ms':>10} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9} {'blocks':>9}")
+    for action, stats in report["handling"].items():
+        print(f"{action:32} {stats['count']:>7} {stats['total_ms']:>10} {stats['mean_ms']:>9} "
+              f"{stats['p95_ms']:>9} {stats['max_ms']:>9} {stats['net_blocks']:>9}")
+    stalls = report["stalls"]
+    print(f"Main loop stalls: {stalls['count']}, total {stalls['total_ms']} ms, "
+          f"p95 {stalls['p95_ms']} ms, max {stalls['max_ms']} ms")
+    for stall in stalls["longest"]:
+        print(f"  {stall['ms']} ms at {stall['at_seconds']}s")
+    for line in report.get("allocations", [])[:top]:
+        print(f"  {line}")
+
+
+def headless_target(recording):
+    """Only the printer state, without GTK widgets"""
+    printer = Printer(lambda state, callback: False, {})
+    config = recording.rest.get("printer/objects/query?configfile")
+    if config is None:
+        raise SystemExit("The recording doesn't contain the printer configuration")
+    printer.reinit(recording.rest.get("printer/info", {}).get("result", {}), config["result"]["status"])
+    for path, response in recording.rest.items():
+        if path.startswith("printer/objects/query?") and path != "printer/objects/query?configfile":
+            printer.process_update(response["result"]["status"])
+            break
+
+    def dispatch(action, data):
+        if action == "notify_status_update":
+            printer.process_update(data)
+    return dispatch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a KlipperScreen capture")
+    parser.add_argument("capture", help="file recorded with screen.py --capture")
+    parser.add_argument("-c", "--configfile", default="", help="KlipperScreen configuration file")
+    parser.add_argument("--url", help="printer to replay when the capture has several, host:port")
+    parser.add_argument("--speed", type=float, default=1, help="replay speed multiplier, 0 as fast as possible")
+    parser.add_argument("--stall-ms", type=float, default=50, help="main loop delay reported as a stall")
+    parser.add_argument("--headless", action="store_true", help="no window, only the printer state")
+    parser.add_argument("--tracemalloc", action="store_true", help="report where the memory was allocated")
+    parser.add_argument("--top", type=int, default=15, help="allocation sites to show")
+    parser.add_argument("--report", help="write the report as json to this file")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    recording = Recording(args.capture, args.url)
+    logging.warning(f"Replaying {len(recording.messages)} notifications from {recording.url}")
+    ReplayRest.recording = ReplayWebsocket.recording = recording
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    if args.headless:
+        loop = GLib.MainLoop()
+        player = Player(recording, args.speed, args.stall_ms, headless_target(recording), loop.quit)
+        GLib.idle_add(player.run)
+        loop.run()
+    else:
+        import screen
+
+        for module in (screen, printer_pool):
+            module.KlippyRest = ReplayRest
+            module.KlippyWebsocket = ReplayWebsocket
+        if not Gtk.init_check():
+            raise SystemExit("Failed to initialize Gtk, try xvfb-run or --headless")
+        win = screen.KlipperScreen(argparse.Namespace(configfile=args.configfile, monitor="0"))
+        win.connect("destroy", Gtk.main_quit)
+        win.show_all()
+        player = Player(recording, args.speed, args.stall_ms, win._websocket_callback, win.destroy)
+        waited = monotonic()
+
+        def wait_initialized():
+            if win.initialized:
+                player.run()
+                return False
+            if monotonic() - waited > INIT_TIMEOUT:
+                logging.error("KlipperScreen didn't initialize from the recording")
+                win.destroy()
+                return False
+            return True
+        GLib.timeout_add(100, wait_initialized)
+        Gtk.main()
+
+    report = player.report()
+    if args.tracemalloc:
+        snapshot = tracemalloc.take_snapshot()
+        report["allocations"] = [str(stat) for stat in snapshot.statistics("lineno")[:args.top]]
+    print_report(report, args.top)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 #!/bin/sh
 
 # Update pot
-xgettext --keyword=_ --keyword=ngettext:1,2 --language=Python --no-location --sort-output \
+xgettext --keyword=_ --keyword=ngettext:1,2 --keyword=translatable:2 --language=Python --no-location --sort-output \
     -o ks_includes/locales/KlipperScreen.pot \
     *.py \
     ks_includes/*.py \
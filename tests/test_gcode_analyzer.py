@@ -0,0 +1,41 @@
+from ks_includes.gcode_analyzer import analyze_gcode
+
+
+def write_gcode(tmp_path, text):
+    path = tmp_path / "test.gcode"
+    path.write_text(text)
+    return str(path)
+
+
+def test_relative_extrusion_survives_z_hop(tmp_path):
+    path = write_gcode(tmp_path, "\n".join((
+        "; product: Salmon",
+        "M83",
+        "G1 Z0.2",
+        "G1 X10 E1.5",
+        "G91",
+        "G1 Z0.4",
+        "G90",
+        "G1 X20 E2.5",
+        "T1",
+        "G1 X30 E1",
+        "G91",
+        "G1 Z-0.4",
+        "G90",
+        "G1 X40 E1",
+    )))
+    result = analyze_gcode(path)
+    assert result["extrusion"] == {"T0": 4.0, "T1": 2.0}
+    assert result["product"] == "Salmon"
+
+
+def test_relative_coordinates_make_extrusion_relative(tmp_path):
+    path = write_gcode(tmp_path, "\n".join((
+        "M82",
+        "G1 X10 E2",
+        "G91",
+        "G1 X1 E1",
+        "G90",
+        "G1 X10 E4",
+    )))
+    assert analyze_gcode(path)["extrusion"] == {"T0": 4.0}